@@ -3,15 +3,28 @@ import os
 
 from ui.verified_ui import show_ui_role_based
 from integration.supabase_integration import get_supabase_client, get_user_from_db
+from utils.llm_scheduler import configure_scheduler, set_llm_user
+from utils.tracing import configure_tracing, start_session_tracing, DEFAULT_TRACE_SINK
 
 
-os.environ["LANGCHAIN_TRACING_V2"]="true"
-os.environ["LANGCHAIN_API_KEY"]=st.secrets['LANGCHAIN_API_KEY']
-os.environ["LANGCHAIN_PROJECT"]="Curiculum_GeneratorV2"
-os.environ['LANGCHAIN_ENDPOINT']="https://api.smith.langchain.com"
+# Defaults to LangSmith when a key is configured, which was the previous behaviour.
+configure_tracing(
+    mode=st.secrets.get("TRACING_MODE", "langsmith" if st.secrets.get("LANGCHAIN_API_KEY") else "off"),
+    sample_rate=st.secrets.get("TRACE_SAMPLE_RATE", 1.0),
+    sink=st.secrets.get("TRACE_SINK", DEFAULT_TRACE_SINK),
+    langsmith_api_key=st.secrets.get("LANGCHAIN_API_KEY"),
+    langsmith_project="Curiculum_GeneratorV2",
+)
+start_session_tracing(st.session_state)
+configure_scheduler(
+    tokens_per_minute=st.secrets.get("LLM_TOKENS_PER_MINUTE"),
+    requests_per_minute=st.secrets.get("LLM_REQUESTS_PER_MINUTE"),
+    max_concurrency=st.secrets.get("LLM_MAX_CONCURRENCY"),
+)
 
 def show_ui(user):
     if user and user.get("email_verified", False):
+        set_llm_user(user.get("email"))
         supabase = get_supabase_client()
         if supabase:
             user_record = get_user_from_db(supabase, user['email'])
@@ -0,0 +1,59 @@
+import os
+import sqlite3
+import threading
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+DEFAULT_CHECKPOINT_PATH = os.path.join("data", "checkpoints.sqlite")
+
+_checkpointers = {}
+_owner_dbs = {}
+_lock = threading.Lock()
+
+
+def get_checkpointer(path: str = DEFAULT_CHECKPOINT_PATH) -> SqliteSaver:
+    """Returns the process-wide SQLite checkpointer for ``path``, creating it on first use.
+
+    One connection is shared by all sessions; Streamlit runs each script in its own
+    thread, so the connection is opened with ``check_same_thread=False`` and
+    SqliteSaver serializes access internally.
+    """
+    with _lock:
+        if path not in _checkpointers:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            checkpointer = SqliteSaver(conn)
+            checkpointer.setup()
+            _checkpointers[path] = checkpointer
+        return _checkpointers[path]
+
+
+def _owner_db(path: str) -> sqlite3.Connection:
+    # Called with _lock held. Kept apart from the SqliteSaver connection, whose locking is its own.
+    if path not in _owner_dbs:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        conn.execute("CREATE TABLE IF NOT EXISTS thread_owners (thread_id TEXT PRIMARY KEY, owner TEXT NOT NULL)")
+        conn.commit()
+        _owner_dbs[path] = conn
+    return _owner_dbs[path]
+
+
+def thread_owner(thread_id: str, path: str = DEFAULT_CHECKPOINT_PATH) -> str | None:
+    """Email of the user who started ``thread_id``, or None for threads with no recorded owner."""
+    with _lock:
+        row = _owner_db(path).execute("SELECT owner FROM thread_owners WHERE thread_id = ?", (thread_id,)).fetchone()
+    return row[0] if row else None
+
+
+def claim_thread(thread_id: str, owner: str, path: str = DEFAULT_CHECKPOINT_PATH) -> bool:
+    """Records ``owner`` for a new thread; True if the thread now belongs to ``owner``."""
+    with _lock:
+        conn = _owner_db(path)
+        conn.execute("INSERT OR IGNORE INTO thread_owners (thread_id, owner) VALUES (?, ?)", (thread_id, owner))
+        conn.commit()
+        row = conn.execute("SELECT owner FROM thread_owners WHERE thread_id = ?", (thread_id,)).fetchone()
+    return bool(row) and row[0] == owner
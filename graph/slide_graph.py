@@ -1,13 +1,24 @@
 from langchain_openai import ChatOpenAI
-from typing import TypedDict
+from typing import Annotated, TypedDict
 from langgraph.graph import StateGraph, START, END
-from pydantic import BaseModel
-from langchain_core.messages import BaseMessage, SystemMessage
+from pydantic import BaseModel, ValidationError
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
+from langgraph.graph.message import add_messages
 from utils.prompt_manager import get_prompt
 from langchain_openai import OpenAI
+import contextvars
 import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from integration.slash_command_runner import run_slash_command
+from utils.slide_patch import apply_slide_patch, describe_slide_patch, SlidePatchError
+from utils.slide_deck import Slide, SlideContentBlockCode, SlideContentBlockImage, SlideContentBlockText, SlideDeck, encode_deck, normalize_deck
+from utils.llm_calls import get_chat_model
+from utils.telemetry import record_span, traced
+from utils.history_manager import HistoryManager, DEFAULT_PROMPT_TOKEN_BUDGET, count_tokens, message_text, new_history_state, to_history_dicts
+from utils.code_ingestion import CodeIngestor
 
 def create_llm_msg(system_prompt: str, messageHistory: list[BaseMessage]):
     resp = []
@@ -17,44 +28,92 @@ def create_llm_msg(system_prompt: str, messageHistory: list[BaseMessage]):
 
 
 class AgentState(TypedDict):
-    incremental_response: str
     final_response: str
     expanded_response: str
     category: str
     user_prompt: str
     slide_content: dict
-    message_history: list[BaseMessage]
+    message_history: Annotated[list[BaseMessage], add_messages]
+    history_state: dict
+    speculative_result: dict
 
 class Category(BaseModel):
     category: str
     information: str
 
+# Free-text model calls tagged with this are streamed to the user (stream_mode="messages").
+USER_VISIBLE_TAG = "user_visible"
+
 VALID_CATEGORIES = ["clarification", "generate_slide_content", "update_content", "generate_for_code","slash_command"]
 
-class SlideContentBlockText(BaseModel):
-    type: str = "text"
-    body: str
+class SlidePatchOperation(BaseModel):
+    op: str
+    slide_id: str = ""
+    block_index: int | None = None
+    slide: Slide | None = None
+    block: SlideContentBlockText | SlideContentBlockCode | SlideContentBlockImage | None = None
 
-class SlideContentBlockCode(BaseModel):
-    type: str = "code"
-    language: str = "python"
-    body: str
+class SlidePatch(BaseModel):
+    title: str = ""
+    subtitle: str = ""
+    operations: list[SlidePatchOperation]
+    user_message: str = ""
 
-class SlideContentBlockImage(BaseModel):
-    type: str = "image"
-    query: str
-    caption: str = ""
+_OUTLINE_LINE = re.compile(r"^\s*(#{1,3}\s+\S|slide\s*\d+\s*[:.)-]|\d+[.)]\s+\S|[-*+]\s+\S)", re.IGNORECASE)
 
-class Slide(BaseModel):
-    id: str
-    title: str
-    content_blocks: list[SlideContentBlockText | SlideContentBlockCode | SlideContentBlockImage]
+def likely_category(user_prompt: str, slide_content: dict | None = None) -> str | None:
+    """Cheap guess at the classifier's answer, used only to decide what to speculate on.
 
-class SlideDeck(BaseModel):
-    title: str
-    subtitle: str = ""
-    slides: list[Slide]
-    user_message: str = ""
+    A long prompt made mostly of headings, numbered slides and bullets, with no deck yet,
+    is almost always a request to turn that outline into slides.
+    """
+    if slide_content or user_prompt.startswith("/"):
+        return None
+    lines = [line for line in user_prompt.splitlines() if line.strip()]
+    if len(lines) < 4:
+        return None
+    outline_lines = sum(1 for line in lines if _OUTLINE_LINE.match(line))
+    if outline_lines / len(lines) >= 0.6:
+        return "generate_slide_content"
+    return None
+
+
+class SpeculationStats:
+    """Process-wide counters for speculative generation (shared by all SlideGraph instances)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted_tokens = 0
+
+    def record(self, hit: bool):
+        with self._lock:
+            self.attempts += 1
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def add_wasted(self, tokens: int):
+        with self._lock:
+            self.wasted_tokens += tokens
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "attempts": self.attempts,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / self.attempts, 3) if self.attempts else 0.0,
+                "wasted_tokens": self.wasted_tokens,
+            }
+
+_speculation_stats = SpeculationStats()
+
+def get_speculation_stats() -> dict:
+    return _speculation_stats.stats()
 
 def save_slides(slides: SlideDeck):
     print(f"Saving slides: {slides}")
@@ -78,17 +137,21 @@ def save_slides(slides: SlideDeck):
 
 
 class SlideGraph():
-    def __init__(self, model, api_key):
-        self.model = ChatOpenAI(model=model, api_key=api_key)
+    def __init__(self, model, api_key, checkpointer=None, prompt_token_budget=DEFAULT_PROMPT_TOKEN_BUDGET, base_url=None, speculative=False):
+        self.model = get_chat_model(model, api_key, base_url=base_url)
+        self.history_manager = HistoryManager(prompt_token_budget, summarizer=self.model, code_ingestor=CodeIngestor(self.model, count_tokens))
+        # In speculative mode the likely generation call starts alongside the classifier.
+        self.speculative = speculative
+        self._speculation_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculate") if speculative else None
 
 
         workflow = StateGraph(AgentState)
-        workflow.add_node("classifier", self.initial_classifier)
-        workflow.add_node("clarification", self.clarification)
-        workflow.add_node("generate_slide_content", self.generate_slide_content)
-        workflow.add_node("update_content", self.update_content)
-        workflow.add_node("generate_for_code", self.generate_for_code)
-        workflow.add_node("slash_command", self.slash_command)
+        workflow.add_node("classifier", traced("node.classifier", kind="node")(self.initial_classifier))
+        workflow.add_node("clarification", traced("node.clarification", kind="node")(self.clarification))
+        workflow.add_node("generate_slide_content", traced("node.generate_slide_content", kind="node")(self.generate_slide_content))
+        workflow.add_node("update_content", traced("node.update_content", kind="node")(self.update_content))
+        workflow.add_node("generate_for_code", traced("node.generate_for_code", kind="node")(self.generate_for_code))
+        workflow.add_node("slash_command", traced("node.slash_command", kind="node")(self.slash_command))
 
         workflow.add_conditional_edges("classifier", self.main_router)
         workflow.add_edge(START, "classifier")
@@ -99,7 +162,50 @@ class SlideGraph():
         workflow.add_edge("slash_command", END)
 
 
-        self.graph = workflow.compile()
+        self.graph = workflow.compile(checkpointer=checkpointer)
+
+    def build_llm_messages(self, state: AgentState, system_prompt: str):
+        """Budgeted LLM messages for this turn plus the updated history state to store in the graph."""
+        history_state = dict(state.get('history_state') or new_history_state())
+        history = self.history_manager.build(to_history_dicts(state['message_history']), history_state, system_prompt)
+        return create_llm_msg(system_prompt, history), history_state
+
+    def reply(self, text: str, **updates):
+        """Node update that records the assistant reply in the persisted history."""
+        return {"final_response": text, "message_history": [AIMessage(content=text)], **updates}
+
+    def stream_reply(self, llm_messages, **updates):
+        resp = self.model.invoke(llm_messages, config={"tags": [USER_VISIBLE_TAG]})
+        return self.reply(message_text(resp), **updates)
+
+    def generate_deck(self, llm_messages) -> dict:
+        resp = self.model.with_structured_output(SlideDeck).invoke(llm_messages)
+        # Graph state holds the canonical deck dict so it checkpoints as plain JSON.
+        return normalize_deck(resp).to_dict()
+
+    def _speculate(self, state: AgentState, guess: str):
+        """Starts the guessed generation node's LLM call; returns (future, span, history_state)."""
+        llm_messages, history_state = self.build_llm_messages(state, get_prompt(guess))
+        span_holder = {}
+
+        def run():
+            with record_span(f"speculative.{guess}", kind="speculation") as span:
+                span_holder["span"] = span
+                return self.generate_deck(llm_messages)
+
+        ctx = contextvars.copy_context()
+        return self._speculation_executor.submit(ctx.run, run), span_holder, history_state
+
+    def _discard_speculation(self, future, span_holder):
+        # A call that has not started is cancelled outright; one in flight cannot be
+        # aborted, so its tokens are counted as wasted once it finishes.
+        if future.cancel():
+            return
+        def count_waste(f):
+            span = span_holder.get("span")
+            if span is not None:
+                _speculation_stats.add_wasted(span.prompt_tokens + span.completion_tokens)
+        future.add_done_callback(count_waste)
 
     def initial_classifier(self, state: AgentState):
         print("initial classifier")
@@ -109,14 +215,42 @@ class SlideGraph():
         if user_prompt.startswith("/"):
             print(f"Got a command {user_prompt}, moving up the state graph to Slash-Command")
             return {"category": "slash_command",}
+        speculation = None
+        guess = likely_category(user_prompt, slide_content) if self.speculative else None
+        if guess:
+            future, span_holder, history_state = self._speculate(state, guess)
+            speculation = (future, span_holder)
+            # Reuse the history state the speculative call was built from, so a history
+            # summary is not produced twice for the same turn.
+            state = {**state, "history_state": history_state}
         CLASSIFIER_PROMPT = get_prompt("classifier")
-        llm_messages = create_llm_msg(CLASSIFIER_PROMPT, state['message_history'])
-        llm_response = self.model.with_structured_output(Category).invoke(llm_messages)
+        try:
+            llm_messages, history_state = self.build_llm_messages(state, CLASSIFIER_PROMPT)
+            llm_response = self.model.with_structured_output(Category).invoke(llm_messages)
+        except Exception:
+            if speculation:
+                self._discard_speculation(*speculation)
+            raise
         category = llm_response.category
         print(f"category is {category}")
-        return{
+        update = {
             "category": category,
+            "history_state": history_state,
         }
+        if speculation:
+            future, span_holder = speculation
+            hit = category == guess
+            _speculation_stats.record(hit)
+            print(f"speculation on {guess}: {'hit' if hit else 'miss'}")
+            if not hit:
+                self._discard_speculation(future, span_holder)
+            else:
+                try:
+                    update["speculative_result"] = future.result()
+                except Exception as e:
+                    # The generation node will simply make the call itself.
+                    print(f"speculative {guess} failed: {e}")
+        return update
     
     def main_router(self, state: AgentState):
         my_category = state['category']
@@ -131,37 +265,56 @@ class SlideGraph():
         
     def clarification(self, state: AgentState):
         print("clarification")
-        llm_messages = create_llm_msg(get_prompt("clarification"), state['message_history'])
-        #return {"incremental_response": self.model.stream(llm_messages)}
-        resp = self.model.invoke(llm_messages)
-        return {"final_response": resp.content}
+        llm_messages, history_state = self.build_llm_messages(state, get_prompt("clarification"))
+        return self.stream_reply(llm_messages, history_state=history_state)
     
     def generate_slide_content(self, state: AgentState):
         print("generate_slide+content")
-        llm_messages = create_llm_msg(get_prompt("generate_slide_content"), state['message_history'])
-        resp = self.model.with_structured_output(SlideDeck).invoke(llm_messages)
-        # Convert the Pydantic model to a plain dict for serialization/state
-        resp_dict = resp.model_dump() if hasattr(resp, "model_dump") else resp.dict()
+        if resp_dict := state.get("speculative_result"):
+            history_state = state.get("history_state") or new_history_state()
+        else:
+            llm_messages, history_state = self.build_llm_messages(state, get_prompt("generate_slide_content"))
+            resp_dict = self.generate_deck(llm_messages)
 
-        return {
-            "final_response": resp.user_message,
-            "expanded_response": json.dumps(resp_dict, indent=2),
-            "slide_content": resp_dict,
-        }
+        return self.reply(
+            resp_dict.get("user_message", ""),
+            expanded_response=json.dumps(resp_dict, indent=2),
+            slide_content=resp_dict,
+            history_state=history_state,
+            speculative_result={},
+        )
     
     def update_content(self, state: AgentState):
-        print("update_content TODO TODO TODO")
-        llm_messages = create_llm_msg(get_prompt("update_content"), state['message_history'])
-        return {
-            "incremental_response": self.model.stream(llm_messages)
-        }
+        print("update_content")
+        slide_content = state.get('slide_content')
+        if not slide_content:
+            llm_messages, history_state = self.build_llm_messages(state, get_prompt("update_content"))
+            return self.stream_reply(llm_messages, history_state=history_state)
+        # Ask only for the edit, addressed by slide id and block index, and apply it locally.
+        current_deck = encode_deck(slide_content)
+        system_prompt = f"{get_prompt('update_slide_patch')}\n\nCurrent slide deck JSON:\n{current_deck}"
+        llm_messages, history_state = self.build_llm_messages(state, system_prompt)
+        patch = self.model.with_structured_output(SlidePatch).invoke(llm_messages)
+        try:
+            patched = apply_slide_patch(slide_content, patch)
+            resp_dict = normalize_deck(SlideDeck.model_validate(patched)).to_dict()
+        except (SlidePatchError, ValidationError) as e:
+            print(f"update_content: could not apply patch {patch}: {e}")
+            return self.reply(
+                f"I could not apply that change to the slides ({e}). Could you rephrase which slide and point to change?",
+                history_state=history_state,
+            )
+        return self.reply(
+            f"{patch.user_message}\n\n{describe_slide_patch(patch)}".strip(),
+            expanded_response=json.dumps(resp_dict, indent=2),
+            slide_content=resp_dict,
+            history_state=history_state,
+        )
     
     def generate_for_code(self, state: AgentState):
-        print("generate_for_code TODO TODO TODO")
-        llm_messages = create_llm_msg(get_prompt("generate_for_code"), state['message_history'])
-        return {
-            "incremental_response": self.model.stream(llm_messages)
-        }
+        print("generate_for_code")
+        llm_messages, history_state = self.build_llm_messages(state, get_prompt("generate_for_code"))
+        return self.stream_reply(llm_messages, history_state=history_state)
     
     def slash_command(self, state: AgentState):
         print("slash_command TODO TODO TODO")
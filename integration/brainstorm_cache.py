@@ -0,0 +1,205 @@
+"""Process-wide read-through cache of the ``brainstorms`` table.
+
+Rows are kept in memory and mirrored to SQLite, so a restart starts warm. Reruns read
+from memory. At most every ``min_sync_interval`` seconds the cache asks Supabase for
+rows whose ``updated_at`` is no more than ``WATERMARK_SAFETY_SECONDS`` older than the
+newest one it has seen, which is a delta sync. Deleted rows are reconciled with an
+id-only query every ``reconcile_interval`` seconds. Every read is paged by the storage
+backend, so a table larger than one PostgREST response is never seen truncated. Writes made by this app are applied to the cache right
+away, so the writer sees them on the next rerun.
+
+Delta sync needs an ``updated_at`` column that changes on every update::
+
+    alter table brainstorms add column if not exists updated_at timestamptz not null default now();
+    create or replace function touch_updated_at() returns trigger as $$
+    begin new.updated_at = now(); return new; end $$ language plpgsql;
+    create trigger brainstorms_touch before update on brainstorms
+        for each row execute function touch_updated_at();
+
+Without that column the cache falls back to a full refresh on each sync.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from integration.storage import as_storage
+
+DEFAULT_CACHE_PATH = os.path.join("data", "brainstorm_cache.sqlite")
+# updated_at = now() is the transaction start time, so a slow transaction can commit a
+# row older than the watermark; delta queries look back this far to catch it.
+WATERMARK_SAFETY_SECONDS = 60
+
+
+def _delta_since(watermark: str) -> str:
+    try:
+        return (datetime.fromisoformat(watermark) - timedelta(seconds=WATERMARK_SAFETY_SECONDS)).isoformat()
+    except ValueError:
+        return watermark
+
+
+def _has_slides(row: dict) -> bool:
+    return row.get("slide_json") not in (None, "", "{}")
+
+
+class BrainstormCache:
+    def __init__(self, db_path: str | None = DEFAULT_CACHE_PATH, min_sync_interval: float = 5.0, reconcile_interval: float = 300.0):
+        self.min_sync_interval = min_sync_interval
+        self.reconcile_interval = reconcile_interval
+        self._rows = {}
+        self._lock = threading.RLock()
+        self._last_sync = 0.0
+        self._last_reconcile = 0.0
+        self._watermark = None
+        self._delta_supported = True
+        self.syncs = 0
+        # Bumped on every change to the cached rows; callers fold it into their own cache keys.
+        self.generation = 0
+        self.rows_fetched = 0
+        self._db = None
+        if db_path:
+            if os.path.dirname(db_path):
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS brainstorms (id TEXT PRIMARY KEY, row TEXT)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            for (row,) in self._db.execute("SELECT row FROM brainstorms"):
+                row = json.loads(row)
+                self._rows[row["id"]] = row
+            meta = dict(self._db.execute("SELECT key, value FROM meta"))
+            self._watermark = meta.get("watermark")
+
+    def _persist(self, rows: list[dict], deleted=(), watermark=None):
+        if not self._db:
+            return
+        self._db.executemany("INSERT OR REPLACE INTO brainstorms VALUES (?, ?)", [(str(r["id"]), json.dumps(r, default=str)) for r in rows])
+        self._db.executemany("DELETE FROM brainstorms WHERE id = ?", [(str(i),) for i in deleted])
+        if watermark is not None:
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('watermark', ?)", (watermark,))
+        self._db.commit()
+
+    def _apply(self, rows: list[dict]):
+        changed = []
+        for row in rows:
+            current = self._rows.get(row["id"])
+            merged = {**(current or {}), **row}
+            # The gte delta query re-reads the newest rows; only real changes count.
+            if merged != current:
+                self._rows[row["id"]] = merged
+                changed.append(merged)
+        if changed:
+            self.generation += 1
+            self._persist(changed)
+
+    def sync(self, supabase, force: bool = False):
+        """Pulls changes from Supabase unless the last sync was less than ``min_sync_interval`` ago."""
+        if not supabase:
+            return
+        storage = as_storage(supabase)
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_sync < self.min_sync_interval:
+                return
+            self._last_sync = now
+            self.syncs += 1
+            if self._delta_supported:
+                try:
+                    # Rows inside the safety window are re-read; _apply ignores the unchanged ones.
+                    since = _delta_since(self._watermark) if self._watermark and self._rows else None
+                    rows = storage.select_brainstorms(updated_since=since)
+                except Exception as e:
+                    if "updated_at" not in str(e):
+                        raise
+                    print(f"BRAINSTORM-CACHE: no updated_at column, falling back to full refreshes ({e})")
+                    self._delta_supported = False
+            if not self._delta_supported:
+                rows = storage.select_brainstorms()
+                live = {r["id"] for r in rows}
+                stale = [i for i in self._rows if i not in live]
+                self._apply(rows)
+                self._forget(stale)
+                self.rows_fetched += len(rows)
+                return
+            self.rows_fetched += len(rows)
+            if rows:
+                self._apply(rows)
+                self._watermark = max(str(r.get("updated_at") or "") for r in rows) or self._watermark
+                self._persist([], watermark=self._watermark)
+            if now - self._last_reconcile >= self.reconcile_interval:
+                self._last_reconcile = now
+                live = {r["id"] for r in storage.select_brainstorms('id')}
+                self._forget([i for i in self._rows if i not in live])
+
+    def _forget(self, ids):
+        if ids:
+            self.generation += 1
+        for i in ids:
+            self._rows.pop(i, None)
+        if ids:
+            self._persist([], deleted=ids)
+
+    def record_write(self, row: dict):
+        """Applies a row (or partial row with ``id``) written by this app."""
+        with self._lock:
+            self._apply([row])
+
+    def invalidate(self):
+        """Makes the next read sync regardless of the interval."""
+        with self._lock:
+            self._last_sync = 0.0
+            self.generation += 1
+
+    def all_rows(self) -> list[dict]:
+        with self._lock:
+            return [dict(self._rows[i]) for i in sorted(self._rows)]
+
+    def get(self, row_id) -> dict | None:
+        with self._lock:
+            row = self._rows.get(row_id)
+            return dict(row) if row else None
+
+    def list(self, limit=50, after_id=None, title_filter=None, has_slides=None, columns=("id", "title", "created_at")):
+        """Same contract as ``list_brainstorms``: (page of summary rows, cursor for the next page)."""
+        needle = (title_filter or "").lower()
+        with self._lock:
+            page = []
+            for row_id in sorted(self._rows):
+                if after_id is not None and row_id <= after_id:
+                    continue
+                row = self._rows[row_id]
+                if needle and needle not in (row.get("title") or "").lower():
+                    continue
+                if has_slides is not None and _has_slides(row) != has_slides:
+                    continue
+                page.append(row)
+                if len(page) > limit:
+                    break
+        next_after_id = page[limit - 1]["id"] if len(page) > limit else None
+        return [{**{c: row.get(c) for c in columns}, "has_slides": _has_slides(row)} for row in page[:limit]], next_after_id
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rows": len(self._rows),
+                "syncs": self.syncs,
+                "rows_fetched": self.rows_fetched,
+                "generation": self.generation,
+                "delta_sync": self._delta_supported,
+                "watermark": self._watermark,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_brainstorm_cache(db_path: str | None = DEFAULT_CACHE_PATH) -> BrainstormCache:
+    """Process-wide cache shared by all sessions."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = BrainstormCache(db_path)
+        return _cache
@@ -0,0 +1,417 @@
+"""Storage backends for users, brainstorms and calendar events.
+
+``STORAGE_BACKEND`` in the secrets selects one of:
+
+* ``supabase`` - the hosted Supabase project (the default),
+* ``sqlite``   - a local SQLite file at ``SQLITE_PATH``, for offline development and
+                 benchmarks at local-disk latency.
+
+The functions in ``integration.supabase_integration`` take either a backend or a raw
+Supabase client and go through ``as_storage``. Seed a local database with an
+authorized user before the first offline run::
+
+    python -m integration.storage --add-user you@example.com --role admin
+
+Bulk slide updates on Supabase go through one RPC per batch. Create the function once::
+
+    create or replace function update_brainstorm_slides(updates jsonb)
+    returns setof brainstorms language sql as $$
+        update brainstorms b set slide_json = u.slide_json
+        from jsonb_to_recordset(updates) as u(id bigint, slide_json text)
+        where b.id = u.id
+        returning b.*;
+    $$;
+
+Without it, each distinct deck costs one PATCH request.
+"""
+import argparse
+import itertools
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+DEFAULT_SQLITE_PATH = os.path.join("data", "curriculum.sqlite")
+BRAINSTORM_COLUMNS = ("id", "title", "content", "slide_json", "created_at", "updated_at")
+_HAS_SLIDES_SQL = "(slide_json IS NOT NULL AND slide_json NOT IN ('', '{}'))"
+EMPTY_SLIDES_FILTER = 'slide_json.is.null,slide_json.eq."",slide_json.eq."{}"'
+# Rows per request when reading whole tables; must not exceed the project's max-rows
+# setting (1000 by default), or a capped page would be mistaken for the last one.
+SUPABASE_PAGE_SIZE = 1000
+
+
+class StorageBackend(ABC):
+    """Operations the app needs from its database. Rows are plain dicts."""
+
+    name = "abstract"
+    # Remote backends benefit from the local brainstorm cache; local ones do not.
+    remote = True
+
+    @abstractmethod
+    def get_user(self, email: str) -> dict | None:
+        ...
+
+    @abstractmethod
+    def select_brainstorms(self, columns: str = "*", ids=None, updated_since=None) -> list[dict]:
+        """All matching rows, ordered by id."""
+
+    @abstractmethod
+    def list_brainstorms(self, limit: int = 50, after_id=None, title_filter=None, has_slides=None, columns: str = "id,title,created_at"):
+        """One page ordered by id plus the cursor for the next page (see ``list_brainstorms``)."""
+
+    @abstractmethod
+    def brainstorms_without_slides(self, columns: str = "id,title,content") -> list[dict]:
+        ...
+
+    @abstractmethod
+    def insert_brainstorms(self, rows: list[dict]) -> list[dict]:
+        ...
+
+    @abstractmethod
+    def update_brainstorm(self, row_id, fields: dict) -> dict | None:
+        ...
+
+    @abstractmethod
+    def update_brainstorm_slides(self, updates: list[tuple]) -> list[dict]:
+        """Sets only ``slide_json`` for each (id, slide_json) pair; returns the rows that exist."""
+
+    @abstractmethod
+    def select_calendar_events(self, columns: str = "*") -> list[dict]:
+        ...
+
+    @abstractmethod
+    def upsert_calendar_events(self, rows: list[dict]):
+        ...
+
+    @abstractmethod
+    def delete_calendar_events(self, event_ids: list):
+        ...
+
+
+class SupabaseStorage(StorageBackend):
+    name = "supabase"
+
+    def __init__(self, client, page_size: int = SUPABASE_PAGE_SIZE):
+        self.client = client
+        self.page_size = page_size
+        self._slides_rpc = True
+
+    def _select_all(self, table: str, columns: str, key: str, apply_filters=None) -> list[dict]:
+        """Reads every matching row with keyset paging on ``key``; PostgREST caps single responses."""
+        if columns.strip() != "*" and key not in [c.strip() for c in columns.split(",")]:
+            columns = f"{key},{columns}"
+        rows, last = [], None
+        while True:
+            query = self.client.table(table).select(columns)
+            if apply_filters:
+                query = apply_filters(query)
+            if last is not None:
+                query = query.gt(key, last)
+            page = query.order(key).limit(self.page_size).execute().data
+            rows.extend(page)
+            if len(page) < self.page_size:
+                return rows
+            last = page[-1][key]
+
+    def get_user(self, email):
+        rows = self.client.table('authorized_users').select('*').eq('email', email).execute().data
+        return rows[0] if rows else None
+
+    def select_brainstorms(self, columns="*", ids=None, updated_since=None):
+        def apply_filters(query):
+            if ids is not None:
+                query = query.in_('id', list(ids))
+            if updated_since is not None:
+                query = query.gte('updated_at', updated_since)
+            return query
+        return self._select_all('brainstorms', columns, 'id', apply_filters)
+
+    def list_brainstorms(self, limit=50, after_id=None, title_filter=None, has_slides=None, columns="id,title,created_at"):
+        query = self.client.table('brainstorms').select(columns)
+        if after_id is not None:
+            query = query.gt('id', after_id)
+        if title_filter:
+            query = query.ilike('title', f"%{title_filter}%")
+        if has_slides is True:
+            query = query.not_.is_('slide_json', 'null').neq('slide_json', '').neq('slide_json', '{}')
+        elif has_slides is False:
+            query = query.or_(EMPTY_SLIDES_FILTER)
+        # One extra row tells us whether there is a next page.
+        rows = query.order('id').limit(limit + 1).execute().data
+        next_after_id = rows[limit - 1]['id'] if len(rows) > limit else None
+        rows = rows[:limit]
+        if has_slides is None and rows:
+            with_slides = (
+                self.client.table('brainstorms')
+                .select('id')
+                .in_('id', [row['id'] for row in rows])
+                .not_.is_('slide_json', 'null').neq('slide_json', '').neq('slide_json', '{}')
+                .execute()
+                .data
+            )
+            with_slides = {row['id'] for row in with_slides}
+            for row in rows:
+                row['has_slides'] = row['id'] in with_slides
+        else:
+            for row in rows:
+                row['has_slides'] = bool(has_slides)
+        return rows, next_after_id
+
+    def brainstorms_without_slides(self, columns="id,title,content"):
+        return self._select_all('brainstorms', columns, 'id', lambda query: query.or_(EMPTY_SLIDES_FILTER))
+
+    def insert_brainstorms(self, rows):
+        return self.client.table('brainstorms').insert(rows).execute().data or []
+
+    def update_brainstorm(self, row_id, fields):
+        rows = self.client.table('brainstorms').update(fields).eq('id', row_id).execute().data
+        return rows[0] if rows else None
+
+    def update_brainstorm_slides(self, updates):
+        # An upsert would need every NOT NULL column on its insert side, and writing back
+        # columns read earlier would undo concurrent edits; both paths touch slide_json only.
+        updates = list(updates)
+        if not updates:
+            return []
+        if self._slides_rpc:
+            try:
+                payload = [{'id': row_id, 'slide_json': slide_json} for row_id, slide_json in updates]
+                return self.client.rpc('update_brainstorm_slides', {'updates': payload}).execute().data or []
+            except Exception as e:
+                if 'PGRST202' not in str(e) and 'Could not find the function' not in str(e):
+                    raise
+                print(f"STORAGE: no update_brainstorm_slides function, falling back to one PATCH per deck ({e})")
+                self._slides_rpc = False
+        ids_by_value = {}
+        for row_id, slide_json in updates:
+            ids_by_value.setdefault(slide_json, []).append(row_id)
+        written = []
+        for slide_json, ids in ids_by_value.items():
+            written.extend(self.client.table('brainstorms').update({'slide_json': slide_json}).in_('id', ids).execute().data or [])
+        return written
+
+    def select_calendar_events(self, columns="*"):
+        return self._select_all('calendar_events', columns, 'event_id')
+
+    def upsert_calendar_events(self, rows):
+        self.client.table('calendar_events').upsert(rows, on_conflict='event_id').execute()
+
+    def delete_calendar_events(self, event_ids):
+        self.client.table('calendar_events').delete().in_('event_id', list(event_ids)).execute()
+
+
+class SQLiteStorage(StorageBackend):
+    """Single-file local database; one connection per thread, WAL so readers never block."""
+
+    name = "sqlite"
+    remote = False
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS authorized_users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT NOT NULL,
+        name TEXT,
+        role TEXT NOT NULL DEFAULT 'guest'
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS authorized_users_email ON authorized_users (email);
+    CREATE TABLE IF NOT EXISTS brainstorms (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        content TEXT,
+        slide_json TEXT,
+        created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+        updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+    );
+    CREATE INDEX IF NOT EXISTS brainstorms_updated_at ON brainstorms (updated_at);
+    CREATE TRIGGER IF NOT EXISTS brainstorms_touch AFTER UPDATE ON brainstorms
+    WHEN NEW.updated_at = OLD.updated_at
+    BEGIN
+        UPDATE brainstorms SET updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') WHERE id = NEW.id;
+    END;
+    CREATE TABLE IF NOT EXISTS calendar_events (
+        event_id TEXT PRIMARY KEY,
+        summary TEXT,
+        start_time TEXT,
+        end_time TEXT
+    );
+    """
+
+    _memory_ids = itertools.count()
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        self.path = path
+        self._uri = False
+        self._memory_anchor = None
+        if path == ":memory:":
+            # A plain ":memory:" connection is a private, empty database, so every thread
+            # would see its own. A named shared-cache database is one per instance, kept
+            # alive by an anchor connection for as long as the backend exists.
+            self.path = f"file:curriculum-{os.getpid()}-{next(self._memory_ids)}?mode=memory&cache=shared"
+            self._uri = True
+            self._memory_anchor = sqlite3.connect(self.path, uri=True, check_same_thread=False)
+        elif os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, uri=self._uri)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _query(self, sql: str, params=()) -> list[dict]:
+        return [dict(row) for row in self._conn().execute(sql, params)]
+
+    @staticmethod
+    def _columns(columns: str) -> str:
+        if columns.strip() == "*":
+            return "*"
+        names = [c.strip() for c in columns.split(",")]
+        unknown = [c for c in names if c not in BRAINSTORM_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown brainstorm columns: {unknown}")
+        return ", ".join(names)
+
+    def add_user(self, email: str, role: str = "guest", name: str | None = None):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO authorized_users (email, name, role) VALUES (?, ?, ?) "
+                "ON CONFLICT (email) DO UPDATE SET role = excluded.role, name = COALESCE(excluded.name, name)",
+                (email, name, role),
+            )
+
+    def get_user(self, email):
+        rows = self._query("SELECT * FROM authorized_users WHERE email = ?", (email,))
+        return rows[0] if rows else None
+
+    def select_brainstorms(self, columns="*", ids=None, updated_since=None):
+        sql, params, where = f"SELECT {self._columns(columns)} FROM brainstorms", [], []
+        if ids is not None:
+            ids = list(ids)
+            if not ids:
+                return []
+            where.append(f"id IN ({', '.join('?' * len(ids))})")
+            params.extend(ids)
+        if updated_since is not None:
+            where.append("updated_at >= ?")
+            params.append(updated_since)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self._query(sql + " ORDER BY id", params)
+
+    def list_brainstorms(self, limit=50, after_id=None, title_filter=None, has_slides=None, columns="id,title,created_at"):
+        sql = f"SELECT {self._columns(columns)}, {_HAS_SLIDES_SQL} AS has_slides FROM brainstorms WHERE 1 = 1"
+        params = []
+        if after_id is not None:
+            sql += " AND id > ?"
+            params.append(after_id)
+        if title_filter:
+            sql += " AND title LIKE ? ESCAPE '\\'"
+            params.append("%" + title_filter.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        if has_slides is not None:
+            sql += f" AND {_HAS_SLIDES_SQL} = ?"
+            params.append(int(bool(has_slides)))
+        sql += " ORDER BY id LIMIT ?"
+        params.append(limit + 1)
+        rows = self._query(sql, params)
+        for row in rows:
+            row["has_slides"] = bool(row["has_slides"])
+        next_after_id = rows[limit - 1]["id"] if len(rows) > limit else None
+        return rows[:limit], next_after_id
+
+    def brainstorms_without_slides(self, columns="id,title,content"):
+        return self._query(f"SELECT {self._columns(columns)} FROM brainstorms WHERE NOT {_HAS_SLIDES_SQL} ORDER BY id")
+
+    def _write_brainstorms(self, verb: str, rows: list[dict]) -> list[dict]:
+        ids = []
+        with self._conn() as conn:
+            for row in rows:
+                names = [self._columns(c) for c in row]
+                cursor = conn.execute(
+                    f"{verb} INTO brainstorms ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                    list(row.values()),
+                )
+                ids.append(row.get("id", cursor.lastrowid))
+        by_id = {row["id"]: row for row in self.select_brainstorms(ids=ids)}
+        return [by_id[i] for i in ids if i in by_id]
+
+    def insert_brainstorms(self, rows):
+        return self._write_brainstorms("INSERT", rows)
+
+    def update_brainstorm_slides(self, updates):
+        updates = list(updates)
+        with self._conn() as conn:
+            conn.executemany("UPDATE brainstorms SET slide_json = ? WHERE id = ?", [(slide_json, row_id) for row_id, slide_json in updates])
+        return self.select_brainstorms(ids=[row_id for row_id, _ in updates])
+
+    def update_brainstorm(self, row_id, fields):
+        if not fields:
+            return None
+        assignments = ", ".join(f"{self._columns(c)} = ?" for c in fields)
+        with self._conn() as conn:
+            conn.execute(f"UPDATE brainstorms SET {assignments} WHERE id = ?", [*fields.values(), row_id])
+        rows = self.select_brainstorms(ids=[row_id])
+        return rows[0] if rows else None
+
+    def select_calendar_events(self, columns="*"):
+        if columns.strip() != "*":
+            allowed = ("event_id", "summary", "start_time", "end_time")
+            names = [c.strip() for c in columns.split(",")]
+            if any(c not in allowed for c in names):
+                raise ValueError(f"Unknown calendar event columns: {columns}")
+            columns = ", ".join(names)
+        return self._query(f"SELECT {columns} FROM calendar_events")
+
+    def upsert_calendar_events(self, rows):
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO calendar_events (event_id, summary, start_time, end_time) VALUES (?, ?, ?, ?)",
+                [(r['event_id'], r.get('summary'), r.get('start_time'), r.get('end_time')) for r in rows],
+            )
+
+    def delete_calendar_events(self, event_ids):
+        with self._conn() as conn:
+            conn.executemany("DELETE FROM calendar_events WHERE event_id = ?", [(i,) for i in event_ids])
+
+
+def as_storage(backend_or_client) -> StorageBackend | None:
+    """Wraps a raw Supabase client; backends and None pass through."""
+    if backend_or_client is None or isinstance(backend_or_client, StorageBackend):
+        return backend_or_client
+    return SupabaseStorage(backend_or_client)
+
+
+_sqlite = {}
+_sqlite_lock = threading.Lock()
+
+
+def get_sqlite_storage(path: str = DEFAULT_SQLITE_PATH) -> SQLiteStorage:
+    """Process-wide SQLite backend per database file."""
+    with _sqlite_lock:
+        if path not in _sqlite:
+            _sqlite[path] = SQLiteStorage(path)
+        return _sqlite[path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local SQLite storage backend.")
+    parser.add_argument("--path", default=DEFAULT_SQLITE_PATH)
+    parser.add_argument("--add-user", metavar="EMAIL", help="Authorize an email address.")
+    parser.add_argument("--role", default="guest")
+    args = parser.parse_args()
+
+    storage = get_sqlite_storage(args.path)
+    if args.add_user:
+        storage.add_user(args.add_user, args.role)
+        print(f"STORAGE: {args.add_user} authorized as {args.role} in {args.path}")
+    counts = {table: storage._query(f"SELECT COUNT(*) AS n FROM {table}")[0]["n"] for table in ("authorized_users", "brainstorms", "calendar_events")}
+    print(f"STORAGE: {args.path}: {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Batched brainstorm writes that do not depend on Streamlit.
+
+Rows are written in chunks of ``chunk_size``, one request per chunk instead of one
+per row. Slide updates write nothing but ``slide_json``; on Supabase a chunk is one
+call to the ``update_brainstorm_slides`` SQL function (see ``integration.storage``),
+or one request per distinct deck where that function has not been created. Each function returns one ``RowResult`` per input row, in input order. When a
+chunk fails, its rows are retried one at a time so each error is reported against the
+row that caused it. Rows that were written go into the shared brainstorm cache. These
+functions never touch ``st``, so batch jobs and command-line workers can call them.
+"""
+from dataclasses import dataclass
+
+from integration.brainstorm_cache import get_brainstorm_cache
+from integration.storage import as_storage
+from utils.search_index import index_saved_brainstorm
+from utils.slide_deck import encode_deck_for_storage
+from utils.telemetry import traced
+
+DEFAULT_CHUNK_SIZE = 200
+
+
+@dataclass
+class RowResult:
+    index: int
+    id: object = None
+    ok: bool = True
+    error: str | None = None
+
+
+def _chunks(items: list, size: int):
+    size = max(1, size)
+    for start in range(0, len(items), size):
+        yield start, items[start:start + size]
+
+
+@traced("supabase.bulk_insert_brainstorms", kind="db")
+def bulk_insert_brainstorms(supabase, rows: list[dict], chunk_size: int = DEFAULT_CHUNK_SIZE) -> list[RowResult]:
+    """Inserts brainstorm rows (``title``, ``content`` and optionally ``slide_json``).
+
+    A ``slide_json`` value may be any deck shape; it is stored as by ``encode_deck_for_storage``.
+    """
+    storage = as_storage(supabase)
+    rows = [{**row, 'slide_json': encode_deck_for_storage(row['slide_json'])} if row.get('slide_json') else dict(row) for row in rows]
+    results = []
+    cache = get_brainstorm_cache()
+    for start, chunk in _chunks(rows, chunk_size):
+        try:
+            written = storage.insert_brainstorms(chunk)
+        except Exception as e:
+            print(f"SUPABASE-BULK: insert of rows {start}-{start + len(chunk) - 1} failed, retrying one by one: {e}")
+            written = None
+        if written is not None and len(written) == len(chunk):
+            # PostgREST returns inserted rows in request order.
+            for offset, row in enumerate(written):
+                cache.record_write(row)
+                index_saved_brainstorm(row)
+                results.append(RowResult(start + offset, row.get('id')))
+            continue
+        if written is not None:
+            # Rows were written but cannot be matched to the request; let the next read resync.
+            cache.invalidate()
+            results.extend(RowResult(start + offset) for offset in range(len(chunk)))
+            continue
+        for offset, row in enumerate(chunk):
+            try:
+                written = storage.insert_brainstorms([row])
+                for w in written:
+                    cache.record_write(w)
+                    index_saved_brainstorm(w)
+                results.append(RowResult(start + offset, written[0].get('id') if written else None))
+            except Exception as e:
+                results.append(RowResult(start + offset, ok=False, error=str(e)))
+    return results
+
+
+@traced("supabase.bulk_update_brainstorm_slides", kind="db")
+def bulk_update_brainstorm_slides(supabase, updates, chunk_size: int = DEFAULT_CHUNK_SIZE) -> list[RowResult]:
+    """Sets ``slide_json`` on many brainstorms; ``updates`` is (row_id, deck) pairs or a dict.
+
+    Only ``slide_json`` is written, so titles and content edited while the decks were
+    being generated are kept. Each chunk is one batched write. Ids that do not exist
+    are reported as failures and are never created.
+    """
+    storage = as_storage(supabase)
+    pairs = list(updates.items()) if isinstance(updates, dict) else list(updates)
+    pairs = [(row_id, encode_deck_for_storage(deck)) for row_id, deck in pairs]
+    results = []
+    cache = get_brainstorm_cache()
+    for start, chunk in _chunks(pairs, chunk_size):
+        try:
+            written = storage.update_brainstorm_slides(chunk)
+            for row in written:
+                cache.record_write(row)
+                index_saved_brainstorm(row)
+            existing = {row['id'] for row in written}
+            for offset, (row_id, _) in enumerate(chunk):
+                if row_id in existing:
+                    results.append(RowResult(start + offset, row_id))
+                else:
+                    results.append(RowResult(start + offset, row_id, ok=False, error="brainstorm not found"))
+        except Exception as e:
+            print(f"SUPABASE-BULK: slide update of rows {start}-{start + len(chunk) - 1} failed, retrying one by one: {e}")
+            for offset, (row_id, slide_json) in enumerate(chunk):
+                try:
+                    written = storage.update_brainstorm(row_id, {'slide_json': slide_json})
+                    if written is None:
+                        results.append(RowResult(start + offset, row_id, ok=False, error="brainstorm not found"))
+                        continue
+                    cache.record_write(written)
+                    index_saved_brainstorm(written)
+                    results.append(RowResult(start + offset, row_id))
+                except Exception as row_error:
+                    results.append(RowResult(start + offset, row_id, ok=False, error=str(row_error)))
+    return results
@@ -1,25 +1,67 @@
+import hashlib
+import json
+import time
+from datetime import datetime, timezone
+
 import streamlit as st
-from supabase import create_client, Client
+from supabase import Client
+
+from integration.brainstorm_cache import get_brainstorm_cache
+from integration.storage import DEFAULT_SQLITE_PATH, SupabaseStorage, as_storage, get_sqlite_storage
+from integration.supabase_pool import get_pool, DEFAULT_POOL_SIZE
+from utils.search_index import index_saved_brainstorm
+from utils.slide_deck import encode_deck_for_storage
+from utils.telemetry import traced
+
+# Columns shown in brainstorm pickers; content and slide_json are fetched per row on selection.
+BRAINSTORM_LIST_COLUMNS = "id,title,created_at"
 
+@traced("supabase.get_supabase_client", kind="db")
 def get_supabase_client():
-    """Creates and returns a Supabase client."""
+    """Returns the configured storage backend (see ``integration.storage``).
+
+    With the default ``STORAGE_BACKEND = "supabase"`` it wraps a client from the
+    process-wide pool (see ``integration.supabase_pool``).
+    """
+    if st.secrets.get("STORAGE_BACKEND", "supabase") == "sqlite":
+        return get_sqlite_storage(st.secrets.get("SQLITE_PATH", DEFAULT_SQLITE_PATH))
     SUPABASE_URL = st.secrets.get("SUPABASE_URL")
     SUPABASE_KEY = st.secrets.get("SUPABASE_KEY")
     try:
-        supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        return supabase
+        supabase: Client = get_pool(SUPABASE_URL, SUPABASE_KEY, int(st.secrets.get("SUPABASE_POOL_SIZE", DEFAULT_POOL_SIZE))).get()
+        return SupabaseStorage(supabase)
     except Exception as e:
         st.error(f"Error connecting to Supabase: {e}")
         print(f"Error connecting to Supabase: {e}")
         return None
 
+def _synced_brainstorm_cache(supabase):
+    """The shared brainstorm cache, brought up to date, or None when BRAINSTORM_CACHE is off.
+
+    Local backends are read directly; the cache only pays off over the network.
+    """
+    if not as_storage(supabase).remote or not st.secrets.get("BRAINSTORM_CACHE", True):
+        return None
+    cache = get_brainstorm_cache()
+    cache.sync(supabase)
+    return cache
+
+def brainstorm_generation(supabase):
+    """A number that changes whenever brainstorm data may have changed; use it in cache keys.
+
+    It moves on every write made through this module or the bulk writers and, for remote
+    backends, whenever a sync pulls in someone else's change.
+    """
+    _synced_brainstorm_cache(supabase)
+    return get_brainstorm_cache().generation
+
+@traced("supabase.get_calendar_events", kind="db")
 def get_calendar_events_from_db(supabase):
     """Gets calendar events from the 'calendar_events' table in Supabase."""
     if not supabase:
         return []
     try:
-        response = supabase.table('calendar_events').select('*').execute()
-        return response.data
+        return as_storage(supabase).select_calendar_events()
     except Exception as e:
         # If the table doesn't exist, return an empty list
         if "relation \"calendar_events\" does not exist" in str(e):
@@ -28,50 +70,115 @@ def get_calendar_events_from_db(supabase):
         print(f"Error getting calendar events from database: {e}")
         return []
 
+CALENDAR_EVENT_FIELDS = ('summary', 'start_time', 'end_time')
+CALENDAR_TIME_FIELDS = ('start_time', 'end_time')
+CALENDAR_BATCH_SIZE = 500
+
+def _calendar_row(event):
+    """Maps a Google Calendar event to a calendar_events row."""
+    return {
+        'event_id': event['id'],
+        'summary': event.get('summary', ''),
+        'start_time': event['start'].get('dateTime', event['start'].get('date')),
+        'end_time': event['end'].get('dateTime', event['end'].get('date')),
+    }
+
+def _normalize_calendar_time(value):
+    """UTC ISO form of a timestamp, so Google's offsets and Postgres' +00:00 hash alike.
+
+    Naive values and all-day dates are taken as UTC, which is how a UTC database stores them.
+    """
+    if not isinstance(value, str) or not value:
+        return value
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return value
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+def _calendar_row_hash(row):
+    values = [_normalize_calendar_time(row.get(field)) if field in CALENDAR_TIME_FIELDS else row.get(field) for field in CALENDAR_EVENT_FIELDS]
+    payload = json.dumps(values, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def diff_calendar_events(existing_rows, rows):
+    """Splits ``rows`` against ``existing_rows`` by event_id and content hash.
+
+    Returns (inserted rows, updated rows, event_ids to delete).
+    """
+    existing = {row['event_id']: _calendar_row_hash(row) for row in existing_rows}
+    desired = {row['event_id']: row for row in rows}
+    inserted = [row for event_id, row in desired.items() if event_id not in existing]
+    updated = [row for event_id, row in desired.items() if event_id in existing and existing[event_id] != _calendar_row_hash(row)]
+    deleted = [event_id for event_id in existing if event_id not in desired]
+    return inserted, updated, deleted
+
+@traced("supabase.update_calendar_events", kind="db")
 def update_calendar_events_in_db(supabase, events):
-    """Updates the 'calendar_events' table in Supabase with the given events."""
+    """Syncs the 'calendar_events' table in Supabase to the given events.
+
+    Only changed rows are written: new and modified events are upserted on event_id and
+    vanished events are deleted, both in batches of ``CALENDAR_BATCH_SIZE``. Returns
+    the inserted/updated/deleted/unchanged counts and the elapsed milliseconds.
+    """
     if not supabase:
-        return
+        return None
     try:
-        # Clear the table first.
-        supabase.table('calendar_events').delete().neq('event_id', 'dummy_id_to_delete_all').execute()
-
-        # Insert new events
-        if events:
-            data_to_insert = []
-            for event in events:
-                start = event['start'].get('dateTime', event['start'].get('date'))
-                end = event['end'].get('dateTime', event['end'].get('date'))
-                data_to_insert.append({
-                    'event_id': event['id'],
-                    'summary': event['summary'],
-                    'start_time': start,
-                    'end_time': end,
-                })
-            supabase.table('calendar_events').insert(data_to_insert).execute()
-        st.success("Calendar events updated in the database.")
+        start = time.monotonic()
+        storage = as_storage(supabase)
+        existing = storage.select_calendar_events('event_id,' + ','.join(CALENDAR_EVENT_FIELDS))
+        rows = [_calendar_row(event) for event in events or []]
+        inserted, updated, deleted = diff_calendar_events(existing, rows)
+        upserts = inserted + updated
+        for i in range(0, len(upserts), CALENDAR_BATCH_SIZE):
+            storage.upsert_calendar_events(upserts[i:i + CALENDAR_BATCH_SIZE])
+        for i in range(0, len(deleted), CALENDAR_BATCH_SIZE):
+            storage.delete_calendar_events(deleted[i:i + CALENDAR_BATCH_SIZE])
+        result = {
+            'inserted': len(inserted),
+            'updated': len(updated),
+            'deleted': len(deleted),
+            'unchanged': len(rows) - len(upserts),
+            'ms': round((time.monotonic() - start) * 1000, 1),
+        }
+        st.success(
+            f"Calendar events synced: {result['inserted']} added, {result['updated']} updated, "
+            f"{result['deleted']} removed, {result['unchanged']} unchanged ({result['ms']:.0f} ms)."
+        )
+        return result
     except Exception as e:
         st.error(f"Error updating calendar events in database: {e}")
         print(f"Error updating calendar events in database: {e}")
-        
+        return None
+
+@traced("supabase.add_brainstorm", kind="db")
 def add_brainstorm_to_db(supabase, title, content):
     """Adds a new brainstorm entry to the 'brainstorms' table in Supabase."""
     if not supabase:
         return
     try:
-        supabase.table('brainstorms').insert({'title': title, 'content': content}).execute()
+        rows = as_storage(supabase).insert_brainstorms([{'title': title, 'content': content}])
+        for row in rows or []:
+            get_brainstorm_cache().record_write(row)
+            index_saved_brainstorm(row)
+        if not rows:
+            get_brainstorm_cache().invalidate()
         st.success("Brainstorm entry added to the database.")
     except Exception as e:
         st.error(f"Error adding brainstorm entry to database: {e}")
         print(f"Error adding brainstorm entry to database: {e}")
         
+@traced("supabase.get_all_brainstorms", kind="db")
 def get_all_brainstorms_from_db(supabase):
     """Fetches all brainstorm entries from the 'brainstorms' table in Supabase."""
     if not supabase:
         return []
     try:
-        response = supabase.table('brainstorms').select('*').execute()
-        return response.data
+        if cache := _synced_brainstorm_cache(supabase):
+            return cache.all_rows()
+        return as_storage(supabase).select_brainstorms()
     except Exception as e:
         # If the table doesn't exist, return an empty list
         if "relation \"brainstorms\" does not exist" in str(e):
@@ -79,29 +186,102 @@ def get_all_brainstorms_from_db(supabase):
         st.error(f"Error fetching brainstorms from database: {e}")
         print(f"Error fetching brainstorms from database: {e}")
         return []
-    
+
+@traced("supabase.get_brainstorms_without_slides", kind="db")
+def get_brainstorms_without_slides_from_db(supabase):
+    """Fetches id, title and content of brainstorms whose slide_json is still empty."""
+    if not supabase:
+        return []
+    try:
+        if cache := _synced_brainstorm_cache(supabase):
+            return [
+                {'id': row['id'], 'title': row.get('title'), 'content': row.get('content')}
+                for row in cache.all_rows()
+                if row.get('slide_json') in (None, '', '{}')
+            ]
+        return as_storage(supabase).brainstorms_without_slides('id,title,content')
+    except Exception as e:
+        if "relation \"brainstorms\" does not exist" in str(e):
+            return []
+        st.error(f"Error fetching brainstorms without slides from database: {e}")
+        print(f"Error fetching brainstorms without slides from database: {e}")
+        return []
+
+def fetch_brainstorm_page(supabase, limit=50, after_id=None, title_filter=None, has_slides=None):
+    """``list_brainstorms`` without its error handling; failures raise."""
+    if cache := _synced_brainstorm_cache(supabase):
+        return cache.list(limit, after_id, title_filter, has_slides, columns=BRAINSTORM_LIST_COLUMNS.split(','))
+    return as_storage(supabase).list_brainstorms(limit, after_id, title_filter, has_slides, BRAINSTORM_LIST_COLUMNS)
+
+def fetch_brainstorm_detail(supabase, row_id):
+    """``get_brainstorm_detail`` without its error handling; failures raise."""
+    if (cache := _synced_brainstorm_cache(supabase)) and (row := cache.get(row_id)):
+        return row
+    rows = as_storage(supabase).select_brainstorms(ids=[row_id])
+    return rows[0] if rows else None
+
+@traced("supabase.list_brainstorms", kind="db")
+def list_brainstorms(supabase, limit=50, after_id=None, title_filter=None, has_slides=None):
+    """Returns one page of brainstorm summaries and the cursor for the next page.
+
+    Served from the shared brainstorm cache unless BRAINSTORM_CACHE is off. Rows carry
+    ``BRAINSTORM_LIST_COLUMNS`` plus a ``has_slides`` flag and are ordered
+    by id; pass the returned cursor as ``after_id`` to get the next page (``None``
+    when there is none). ``title_filter`` is a case-insensitive substring match and
+    ``has_slides`` restricts the page to brainstorms with (or without) slides.
+    """
+    if not supabase:
+        return [], None
+    try:
+        return fetch_brainstorm_page(supabase, limit, after_id, title_filter, has_slides)
+    except Exception as e:
+        if "relation \"brainstorms\" does not exist" in str(e):
+            return [], None
+        st.error(f"Error listing brainstorms from database: {e}")
+        print(f"Error listing brainstorms from database: {e}")
+        return [], None
+
+@traced("supabase.get_brainstorm_detail", kind="db")
+def get_brainstorm_detail(supabase, row_id):
+    """Fetches one brainstorm with its content and slide_json, or None."""
+    if not supabase:
+        return None
+    try:
+        return fetch_brainstorm_detail(supabase, row_id)
+    except Exception as e:
+        st.error(f"Error fetching brainstorm {row_id} from database: {e}")
+        print(f"Error fetching brainstorm {row_id} from database: {e}")
+        return None
+
+@traced("supabase.update_brainstorm_slides", kind="db")
 def update_brainstorm_slides_in_db(supabase, row_id, slide_json):
-    """Updates the slides_json field of a brainstorm entry in the 'brainstorms' table."""
+    """Updates the slides_json field of a brainstorm entry in the 'brainstorms' table.
+
+    ``slide_json`` may be a Deck, a SlideDeck model, a dict or JSON text; it is stored
+    as compact canonical JSON, compressed when large (see ``encode_deck_for_storage``).
+    """
     if not supabase:
         return
     try:
-        supabase.table('brainstorms').update({'slide_json': slide_json}).eq('id', row_id).execute()
+        slide_json = encode_deck_for_storage(slide_json)
+        row = as_storage(supabase).update_brainstorm(row_id, {'slide_json': slide_json})
+        row = row or {'id': row_id, 'slide_json': slide_json}
+        get_brainstorm_cache().record_write(row)
+        index_saved_brainstorm(row)
         st.success("Brainstorm slides updated in the database.")
     except Exception as e:
         st.error(f"Error updating brainstorm slides in database: {e}")
         print(f"Error updating brainstorm slides in database: {e}")
 
 @st.cache_data(ttl=600)
+@traced("supabase.get_user", kind="db")
 def get_user_from_db(_supabase, email):
     """Fetches user details from the 'users' table based on email."""
     supabase=_supabase
     if not supabase:
         return None
     try:
-        response = supabase.table('authorized_users').select('*').eq('email', email).execute()
-        if response.data:
-            return response.data[0]
-        return None
+        return as_storage(supabase).get_user(email)
     except Exception as e:
         st.error(f"Error fetching user from database: {e}")
         print(f"Error fetching user from database: {e}")
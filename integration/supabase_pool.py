@@ -0,0 +1,74 @@
+"""Process-wide pool of Supabase clients shared by all Streamlit sessions.
+
+Creating a client builds new HTTP sessions and auth state. A reused client keeps its
+keep-alive connections, so the pool creates at most ``size`` clients per project and
+hands them out round-robin. The app signs in with the project key only (never as an
+end user), so one client can safely serve every session. Each client's HTTP session is
+thread-safe, so concurrent callers may share a client.
+"""
+import threading
+import time
+
+from supabase import create_client
+
+DEFAULT_POOL_SIZE = 4
+
+
+class SupabasePool:
+    def __init__(self, url: str, key: str, size: int = DEFAULT_POOL_SIZE, factory=create_client):
+        self.url = url
+        self.key = key
+        self.size = max(1, size)
+        self._factory = factory
+        self._clients = []
+        self._next = 0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.created = 0
+        self.create_ms = 0.0
+
+    def get(self):
+        """Returns the next client round-robin; the first ``size`` calls fill the pool."""
+        with self._lock:
+            self.requests += 1
+            if len(self._clients) < self.size:
+                start = time.monotonic()
+                client = self._factory(self.url, self.key)
+                self.create_ms += (time.monotonic() - start) * 1000
+                self.created += 1
+                self._clients.append(client)
+                return client
+            client = self._clients[self._next]
+            self._next = (self._next + 1) % len(self._clients)
+            return client
+
+    def stats(self) -> dict:
+        with self._lock:
+            reused = self.requests - self.created
+            return {
+                "size": self.size,
+                "clients": len(self._clients),
+                "requests": self.requests,
+                "created": self.created,
+                "reused": reused,
+                "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+                "avg_create_ms": round(self.create_ms / self.created, 1) if self.created else 0.0,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(url: str, key: str, size: int = DEFAULT_POOL_SIZE) -> SupabasePool:
+    with _pools_lock:
+        pool = _pools.get((url, key))
+        if pool is None:
+            pool = _pools[(url, key)] = SupabasePool(url, key, size)
+        return pool
+
+
+def get_pool_stats() -> list[dict]:
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [{"url": pool.url, **pool.stats()} for pool in pools]
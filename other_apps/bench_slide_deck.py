@@ -0,0 +1,73 @@
+"""Measures parse/serialize cost of slide decks: legacy pretty JSON + pydantic vs the deck IR.
+
+    python other_apps/bench_slide_deck.py --slides 300 --blocks 6 --repeat 20
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import time
+
+from utils.slide_deck import SlideDeck, decode_deck, decode_deck_binary, encode_deck, encode_deck_binary, encode_deck_for_storage, msgpack, orjson
+
+
+def make_deck(n_slides: int, n_blocks: int) -> dict:
+    slides = []
+    for i in range(1, n_slides + 1):
+        blocks = []
+        for j in range(n_blocks):
+            if j % 5 == 3:
+                blocks.append({"type": "code", "language": "python", "body": f"def step_{i}_{j}(x):\n    return x * {j} + {i}\n"})
+            elif j % 5 == 4:
+                blocks.append({"type": "image", "query": f"diagram of concept {i}.{j}", "caption": f"Figure {i}.{j}"})
+            else:
+                blocks.append({"type": "text", "body": f"Point {j} of slide {i}: loops repeat a block of code while a condition holds."})
+        slides.append({"id": f"slide{i}", "title": f"Slide {i}: Topic {i}", "content_blocks": blocks})
+    return {"title": "Benchmark deck", "subtitle": "Synthetic", "slides": slides, "user_message": "Generated for benchmarking."}
+
+
+def timed(fn, repeat: int) -> float:
+    """Best-of-``repeat`` wall time in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slide deck parse/serialize benchmark.")
+    parser.add_argument("--slides", type=int, default=300)
+    parser.add_argument("--blocks", type=int, default=6, help="Content blocks per slide.")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    raw = make_deck(args.slides, args.blocks)
+    legacy_text = json.dumps(raw, indent=2)
+    model = SlideDeck.model_validate(raw)
+    deck = decode_deck(encode_deck(raw))
+    compact = encode_deck(deck)
+    binary = encode_deck_binary(deck)
+    stored = encode_deck_for_storage(deck)
+
+    rows = [
+        ("legacy parse (json.loads + pydantic)", timed(lambda: SlideDeck.model_validate(json.loads(legacy_text)), args.repeat), len(legacy_text)),
+        ("legacy serialize (model_dump + indent=2)", timed(lambda: json.dumps(model.model_dump(), indent=2), args.repeat), len(legacy_text)),
+        ("IR decode (current schema)", timed(lambda: decode_deck(compact), args.repeat), len(compact)),
+        ("IR decode (legacy text, normalized)", timed(lambda: decode_deck(legacy_text), args.repeat), len(legacy_text)),
+        ("IR encode", timed(lambda: encode_deck(deck), args.repeat), len(compact)),
+        ("IR storage decode (compressed when large)", timed(lambda: decode_deck(stored), args.repeat), len(stored)),
+        ("IR storage encode", timed(lambda: encode_deck_for_storage(deck), args.repeat), len(stored)),
+        ("IR binary decode", timed(lambda: decode_deck_binary(binary), args.repeat), len(binary)),
+        ("IR binary encode", timed(lambda: encode_deck_binary(deck), args.repeat), len(binary)),
+    ]
+    print(f"{args.slides} slides x {args.blocks} blocks, best of {args.repeat}; orjson={'yes' if orjson else 'no'}, msgpack={'yes' if msgpack else 'no'}\n")
+    print(f"{'operation':<44}{'ms':>10}{'bytes':>12}")
+    for name, ms, size in rows:
+        print(f"{name:<44}{ms:>10.2f}{size:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Simulates concurrent teachers running brainstorm -> slide JSON -> PPTX against an OpenAI-compatible endpoint.
+
+    python other_apps/load_test.py --teachers 20 --iterations 3 --start-mock --ttft-ms 400
+
+Without ``--start-mock`` point ``--base-url`` at an already running mock (or any
+compatible server). Reports throughput and p50/p95/p99 latency per stage.
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage
+
+from utils.slide_deck import SlideDeck
+from utils.bulk_generation import build_slide_messages
+from utils.llm_calls import create_llm_msg, get_chat_model, run_model
+from utils.ppt_generator import create_one_presentation
+from utils.prompt_manager import get_prompt
+
+TOPICS = [
+    "Intro to Python loops for grade 7",
+    "Fractions with visual models for grade 4",
+    "Photosynthesis basics for middle school",
+    "Variables and types in JavaScript",
+    "The water cycle for elementary students",
+    "Recursion explained with examples",
+]
+
+STAGES = ("brainstorm", "json", "pptx", "flow")
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+class Results:
+    def __init__(self):
+        self.latencies = {stage: [] for stage in STAGES}
+        self.errors = {stage: 0 for stage in STAGES}
+        self.lock = threading.Lock()
+
+    def add(self, stage, seconds=None, error=False):
+        with self.lock:
+            if error:
+                self.errors[stage] += 1
+            else:
+                self.latencies[stage].append(seconds)
+
+
+def run_flow(teacher, iteration, args, results):
+    model = get_chat_model(args.model, args.api_key, base_url=args.base_url)
+    topic = random.choice(TOPICS)
+    flow_start = time.perf_counter()
+
+    start = time.perf_counter()
+    try:
+        llm_messages = create_llm_msg(get_prompt("brainstorm_content"), [HumanMessage(content=f"Create a short slide-by-slide lesson: {topic}")])
+        brainstorm, _ = run_model(model, llm_messages)
+        results.add("brainstorm", time.perf_counter() - start)
+    except Exception as e:
+        print(f"teacher {teacher}: brainstorm failed: {e}")
+        results.add("brainstorm", error=True)
+        results.add("flow", error=True)
+        return
+
+    start = time.perf_counter()
+    try:
+        deck = model.with_structured_output(SlideDeck).invoke(build_slide_messages(topic, brainstorm))
+        results.add("json", time.perf_counter() - start)
+    except Exception as e:
+        print(f"teacher {teacher}: JSON generation failed: {e}")
+        results.add("json", error=True)
+        results.add("flow", error=True)
+        return
+
+    start = time.perf_counter()
+    output_fname = f"loadtest_{teacher}_{iteration}.pptx"
+    try:
+        create_one_presentation(deck.model_dump(), "Not used", output_fname)
+        results.add("pptx", time.perf_counter() - start)
+    except Exception as e:
+        print(f"teacher {teacher}: PPTX rendering failed: {e}")
+        results.add("pptx", error=True)
+        results.add("flow", error=True)
+        return
+    finally:
+        path = os.path.join("output", output_fname)
+        if os.path.exists(path) and not args.keep_files:
+            os.remove(path)
+
+    results.add("flow", time.perf_counter() - flow_start)
+
+
+def teacher_loop(teacher, args, results):
+    for iteration in range(args.iterations):
+        run_flow(teacher, iteration, args, results)
+        if args.think_time:
+            time.sleep(random.uniform(0, args.think_time))
+
+
+def print_report(results, elapsed):
+    print(f"\n{'stage':<12}{'ok':>6}{'err':>6}{'thru/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage in STAGES:
+        values = results.latencies[stage]
+        print(
+            f"{stage:<12}{len(values):>6}{results.errors[stage]:>6}{len(values) / elapsed:>9.2f}"
+            f"{percentile(values, 0.50) * 1000:>10.0f}{percentile(values, 0.95) * 1000:>10.0f}{percentile(values, 0.99) * 1000:>10.0f}"
+        )
+    print(f"\nwall time {elapsed:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent brainstorm -> JSON -> PPTX load test.")
+    parser.add_argument("--teachers", type=int, default=10, help="Concurrent simulated teachers.")
+    parser.add_argument("--iterations", type=int, default=3, help="Flows per teacher.")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Max random pause between flows (s).")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000/v1")
+    parser.add_argument("--model", default="mock-gpt")
+    parser.add_argument("--api-key", default="not-needed")
+    parser.add_argument("--keep-files", action="store_true", help="Keep the generated PPTX files in output/.")
+    parser.add_argument("--start-mock", action="store_true", help="Start the mock server in-process on --base-url's port.")
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=80.0)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = None
+    if args.start_mock:
+        from other_apps.mock_llm_server import LatencyShape, start_server
+        port = int(args.base_url.rsplit(":", 1)[-1].split("/")[0])
+        server = start_server(port=port, shape=LatencyShape(args.ttft_ms, args.tokens_per_sec, args.jitter, args.error_rate))
+
+    os.makedirs("output", exist_ok=True)
+    results = Results()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.teachers) as executor:
+        for teacher in range(args.teachers):
+            executor.submit(teacher_loop, teacher, args, results)
+    print_report(results, time.perf_counter() - start)
+    if server:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""Local OpenAI-compatible stand-in for load tests and offline development.
+
+Serves ``/v1/chat/completions`` (plain, streamed, tool-calling and ``json_schema``
+structured output) and ``/v1/responses``. Structured requests get a schema-valid
+instance of whatever schema the client sent, so ``Category``, ``SlideDeck`` and
+``SlidePatch`` calls all work without canned fixtures.
+
+    python other_apps/mock_llm_server.py --port 8000 --ttft-ms 300 --tokens-per-sec 80
+
+then set ``OPENAI_BASE_URL = "http://localhost:8000/v1"`` in the secrets.
+"""
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "students learn loops variables functions data lists practice example concept "
+    "review project design test debug explain compare build simple clear step idea"
+).split()
+
+CANNED_REPLY = (
+    "Here is a slide-by-slide outline.\n\n"
+    "Slide 1: Introduction\n- Why the topic matters\n- What we will build today\n\n"
+    "Slide 2: Core idea\n- Definition in plain words\n- A small worked example\n\n"
+    "Slide 3: Practice\n- Guided exercise\n- Common mistakes to avoid\n"
+)
+
+
+class LatencyShape:
+    """Time to first token plus a per-token rate, with multiplicative jitter."""
+
+    def __init__(self, ttft_ms=300.0, tokens_per_sec=80.0, jitter=0.2, error_rate=0.0):
+        self.ttft_ms = ttft_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.jitter = jitter
+        self.error_rate = error_rate
+
+    def _scale(self):
+        return max(0.0, random.gauss(1.0, self.jitter)) if self.jitter else 1.0
+
+    def first_token_delay(self):
+        return self.ttft_ms / 1000.0 * self._scale()
+
+    def token_delay(self, tokens):
+        if not self.tokens_per_sec:
+            return 0.0
+        return tokens / self.tokens_per_sec * self._scale()
+
+
+def count_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _sentence(n=8):
+    return " ".join(random.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def _resolve(schema, root):
+    while "$ref" in schema:
+        name = schema["$ref"].split("/")[-1]
+        schema = (root.get("$defs") or root.get("definitions") or {})[name]
+    return schema
+
+
+def instance_for_schema(schema, root=None, name="", depth=0):
+    """Builds a value that validates against ``schema`` (the subset pydantic emits)."""
+    root = root if root is not None else schema
+    schema = _resolve(schema, root)
+    if "default" in schema and schema["default"] not in (None, ""):
+        return schema["default"]
+    if "enum" in schema:
+        return random.choice(schema["enum"])
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            options = [s for s in schema[key] if _resolve(s, root).get("type") != "null"]
+            return instance_for_schema(random.choice(options or schema[key]), root, name, depth)
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object" or "properties" in schema:
+        return {
+            prop: instance_for_schema(sub, root, prop, depth + 1)
+            for prop, sub in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        count = 8 if name == "slides" else random.randint(2, 4)
+        if depth > 4:
+            count = 1
+        return [instance_for_schema(schema.get("items", {}), root, name, depth + 1) for _ in range(count)]
+    if kind == "integer":
+        return random.randint(0, 2)
+    if kind == "number":
+        return round(random.random(), 3)
+    if kind == "boolean":
+        return random.random() < 0.5
+    if kind == "null":
+        return None
+    return _string_for(name)
+
+
+def _string_for(name):
+    if name == "id":
+        return f"slide{random.randint(1, 99)}"
+    if name == "op":
+        return "replace"
+    if name in ("title", "subtitle"):
+        return _sentence(4)[:-1]
+    if name == "language":
+        return "python"
+    if name == "body":
+        if random.random() < 0.2:
+            return "for i in range(3):\n    print(i)"
+        return _sentence(10)
+    return _sentence(6)
+
+
+def structured_reply(name, schema, messages):
+    """Schema-valid JSON for a structured-output request, with sensible values for known schemas."""
+    value = instance_for_schema(schema)
+    if name == "Category":
+        last_user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        text = last_user if isinstance(last_user, str) else json.dumps(last_user)
+        value = {"category": "generate_slide_content" if ("Slide" in text or "\n-" in text) else "clarification", "information": _sentence(8)}
+    if name == "SlidePatch":
+        value["operations"] = []
+    if isinstance(value, dict) and isinstance(value.get("slides"), list):
+        for n, slide in enumerate(value["slides"], 1):
+            slide["id"] = f"slide{n}"
+    if isinstance(value, dict) and "user_message" in value:
+        value["user_message"] = "Here are your slides."
+    return json.dumps(value)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    shape = LatencyShape()
+    model = "mock-gpt"
+    stats = {"requests": 0, "errors_injected": 0}
+    stats_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._json(200, {"object": "list", "data": [{"id": self.model, "object": "model"}]})
+        elif self.path == "/stats":
+            self._json(200, self.stats)
+        else:
+            self._json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with self.stats_lock:
+            self.stats["requests"] += 1
+        if self.shape.error_rate and random.random() < self.shape.error_rate:
+            with self.stats_lock:
+                self.stats["errors_injected"] += 1
+            self._json(429, {"error": {"message": "Rate limit reached (injected by mock)", "type": "rate_limit_error", "code": "rate_limit_exceeded"}})
+            return
+        if self.path.rstrip("/").endswith("/chat/completions"):
+            self._chat_completions(request)
+        elif self.path.rstrip("/").endswith("/responses"):
+            self._responses(request)
+        else:
+            self._json(404, {"error": {"message": f"unsupported path {self.path}"}})
+
+    def _reply_for(self, request):
+        """(text, tool_call) for a chat completions request."""
+        messages = request.get("messages", [])
+        response_format = request.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            spec = response_format["json_schema"]
+            return structured_reply(spec.get("name", ""), spec.get("schema", {}), messages), None
+        tools = request.get("tools") or []
+        if tools:
+            function = tools[0]["function"]
+            choice = request.get("tool_choice")
+            if isinstance(choice, dict):
+                wanted = choice.get("function", {}).get("name")
+                function = next((t["function"] for t in tools if t["function"]["name"] == wanted), function)
+            arguments = structured_reply(function["name"], function.get("parameters", {}), messages)
+            return None, {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function", "function": {"name": function["name"], "arguments": arguments}}
+        return CANNED_REPLY, None
+
+    def _usage(self, request, completion_text):
+        prompt_tokens = count_tokens(json.dumps(request.get("messages", request.get("input", ""))))
+        completion_tokens = count_tokens(completion_text)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+    def _chat_completions(self, request):
+        text, tool_call = self._reply_for(request)
+        completion_text = text if text is not None else tool_call["function"]["arguments"]
+        usage = self._usage(request, completion_text)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        time.sleep(self.shape.first_token_delay())
+        if request.get("stream"):
+            self._stream_chat(request, completion_id, text, tool_call, usage)
+            return
+        time.sleep(self.shape.token_delay(usage["completion_tokens"]))
+        message = {"role": "assistant", "content": text}
+        if tool_call:
+            message["tool_calls"] = [tool_call]
+        self._json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", self.model),
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_call else "stop"}],
+            "usage": usage,
+        })
+
+    def _stream_chat(self, request, completion_id, text, tool_call, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        base = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": request.get("model", self.model)}
+
+        def send(choices, **extra):
+            self.wfile.write(f"data: {json.dumps({**base, 'choices': choices, **extra})}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        payload = text if text is not None else tool_call["function"]["arguments"]
+        pieces = [payload[i:i + 16] for i in range(0, len(payload), 16)] or [""]
+        for n, piece in enumerate(pieces):
+            time.sleep(self.shape.token_delay(count_tokens(piece)))
+            if tool_call:
+                call = {"index": 0, "function": {"arguments": piece}}
+                if n == 0:
+                    call.update({"id": tool_call["id"], "type": "function"})
+                    call["function"]["name"] = tool_call["function"]["name"]
+                delta = {"tool_calls": [call]}
+            else:
+                delta = {"content": piece}
+            if n == 0:
+                delta["role"] = "assistant"
+            send([{"index": 0, "delta": delta, "finish_reason": None}])
+        send([{"index": 0, "delta": {}, "finish_reason": "tool_calls" if tool_call else "stop"}])
+        if (request.get("stream_options") or {}).get("include_usage"):
+            send([], usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _responses(self, request):
+        text_format = ((request.get("text") or {}).get("format")) or {}
+        if text_format.get("type") == "json_schema":
+            text = structured_reply(text_format.get("name", ""), text_format.get("schema", {}), [])
+        else:
+            text = CANNED_REPLY
+        usage = self._usage(request, text)
+        time.sleep(self.shape.first_token_delay() + self.shape.token_delay(usage["completion_tokens"]))
+        self._json(200, {
+            "id": f"resp_{uuid.uuid4().hex[:12]}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "status": "completed",
+            "model": request.get("model", self.model),
+            "output": [{
+                "type": "message",
+                "id": f"msg_{uuid.uuid4().hex[:12]}",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }],
+            "usage": {
+                "input_tokens": usage["prompt_tokens"],
+                "output_tokens": usage["completion_tokens"],
+                "total_tokens": usage["total_tokens"],
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens_details": {"reasoning_tokens": 0},
+            },
+        })
+
+
+def start_server(host="127.0.0.1", port=8000, shape: LatencyShape | None = None) -> ThreadingHTTPServer:
+    """Starts the mock in a daemon thread and returns the server (call ``shutdown()`` to stop)."""
+    handler = type("ConfiguredMockLLMHandler", (MockLLMHandler,), {
+        "shape": shape or LatencyShape(),
+        "stats": {"requests": 0, "errors_injected": 0},
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--ttft-ms", type=float, default=300.0, help="Time to first token.")
+    parser.add_argument("--tokens-per-sec", type=float, default=80.0, help="Completion token rate (0 = instant).")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative standard deviation of all delays.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 429.")
+    args = parser.parse_args()
+    shape = LatencyShape(args.ttft_ms, args.tokens_per_sec, args.jitter, args.error_rate)
+    server = start_server(args.host, args.port, shape)
+    print(f"Mock LLM listening on http://{args.host}:{args.port}/v1")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
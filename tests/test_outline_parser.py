@@ -0,0 +1,22 @@
+from utils.outline_parser import parse_outline
+
+
+def test_multi_line_code_block_counts_toward_coverage():
+    outline = "\n".join([
+        "Title: Loops in Python",
+        "Slide 1: For loops",
+        "- Repeat a block for each item",
+        "```python",
+        "for item in items:",
+        "    print(item)",
+        "```",
+        "Slide 2: While loops",
+        "- Repeat until a condition is false",
+    ])
+    deck = parse_outline(outline)
+    assert deck is not None
+    assert deck["slides"][0]["content_blocks"][-1] == {
+        "type": "code",
+        "language": "python",
+        "body": "for item in items:\n    print(item)",
+    }
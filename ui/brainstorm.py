@@ -3,13 +3,13 @@ from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, Base
 from langchain_openai import ChatOpenAI
 
 from utils.prompt_manager import get_prompt
-from integration.supabase_integration import get_supabase_client, add_brainstorm_to_db
-from utils.llm_calls import run_model
+from integration.supabase_integration import get_supabase_client, add_brainstorm_to_db, get_all_brainstorms_from_db
+from utils.llm_calls import run_model, get_chat_model
+from utils.history_manager import HistoryManager, DEFAULT_PROMPT_TOKEN_BUDGET, count_tokens, new_history_state, read_attachments
+from utils.code_ingestion import CodeIngestor
+from utils.similarity_index import get_similarity_index, DEFAULT_OFFER_THRESHOLD
+from ui.chat_history import show_chat_history, show_message
 
-def get_file_contents(uploaded_file):
-        file_contents = uploaded_file.read()
-        return file_contents
-    
 def create_llm_msg(system_prompt: str, messageHistory: list[BaseMessage]):
     resp = []
     resp.append(SystemMessage(content=system_prompt))
@@ -37,14 +37,12 @@ def run_slash_command(command, arg_msg, msg_history, slide_content):
         # run_slash_command(command, args, st.session_state.brainstormmessages, st.session_state.get("slide_content", {}))
     return  
 
-def get_message_history(messages):
-    message_history = []
-    for m in messages:
-        if m["role"] == "user":
-            message_history.append(HumanMessage(content=m["content"]))
-        elif m["role"] == "assistant":
-            message_history.append(AIMessage(content=m["content"]))
-    return message_history
+def get_message_history(messages, model, system_prompt):
+    if "brainstorm_history_state" not in st.session_state:
+        st.session_state.brainstorm_history_state = new_history_state()
+    budget = int(st.secrets.get("PROMPT_TOKEN_BUDGET", DEFAULT_PROMPT_TOKEN_BUDGET))
+    history_manager = HistoryManager(budget, summarizer=model, code_ingestor=CodeIngestor(model, count_tokens))
+    return history_manager.build(messages, st.session_state.brainstorm_history_state, system_prompt)
 
 def show_sidebar_save_info():
     command="/save"
@@ -58,28 +56,73 @@ def show_sidebar_save_info():
         if st.button("Save"):
             save_brainstorm(command, bname, last_assistant_msg)
 
+def find_similar_brainstorms(user_prompt):
+    """Saved brainstorms close enough to the opening prompt to offer instead of starting over."""
+    rows = get_all_brainstorms_from_db(get_supabase_client())
+    index = get_similarity_index()
+    index.sync(rows)
+    threshold = float(st.secrets.get("SIMILARITY_OFFER_THRESHOLD", DEFAULT_OFFER_THRESHOLD))
+    by_id = {row.get("id"): row for row in rows}
+    return [
+        {"id": m.doc_id, "title": m.title, "score": m.score, "content": by_id[m.doc_id].get("content", "")}
+        for m in index.search(user_prompt, k=3, threshold=threshold)
+        if m.doc_id in by_id
+    ]
+
+def show_similar_offer():
+    """Offers saved brainstorms as a starting point; returns True while the user has not chosen."""
+    offer = st.session_state.get("brainstorm_similar")
+    if not offer:
+        return False
+    with st.chat_message("assistant"):
+        st.markdown("These saved brainstorms look close to what you asked for. Start from one of them, or brainstorm from scratch.")
+        for match in offer:
+            with st.expander(f"{match['title']} (similarity {match['score']:.2f})"):
+                st.markdown(match["content"])
+            if st.button(f"Start from \"{match['title']}\"", key=f"similar_{match['id']}"):
+                st.session_state.brainstormmessages.append({"role": "assistant", "content": match["content"]})
+                st.session_state.brainstorm_similar = None
+                st.rerun()
+        if st.button("Brainstorm from scratch"):
+            st.session_state.brainstorm_similar = None
+            st.session_state.brainstorm_respond = True
+            st.rerun()
+    return True
+
+def respond():
+    with st.spinner("Thinking ...", show_time=True):
+        reasoning = {"effort":"low","summary":None}
+        model = get_chat_model(st.secrets['OPENAI_MODEL_NAME'], st.secrets['OPENAI_API_KEY'], base_url=st.secrets.get('OPENAI_BASE_URL'), reasoning=reasoning)
+        system_prompt = get_prompt("brainstorm_content")
+        llm_messages = create_llm_msg(system_prompt, get_message_history(st.session_state.brainstormmessages, model, system_prompt))
+        returned_string,full_response_from_llm = run_model(model, llm_messages)
+        with st.chat_message("assistant"):
+            st.markdown(returned_string)
+        st.session_state.brainstormmessages.append({"role": "assistant", "content": returned_string})
+
 def show_chat_ui():
     if "brainstormmessages" not in st.session_state:
         st.session_state.brainstormmessages = []
 
-    for message in st.session_state.brainstormmessages:
-        if message["role"] != "system":
-            with st.chat_message(message["role"]):
-                st.markdown(message["content"])
+    show_chat_history(st.session_state.brainstormmessages, "brainstorm")
     
     show_sidebar_save_info()
-    
-    if prompt := st.chat_input("What content do you want to brainstorm today?", accept_file=True, file_type=["py", "js", "md", "txt"]):
-        if prompt and prompt["files"]:
-            uploaded_file=prompt["files"][0]
-            file_contents = get_file_contents(uploaded_file)
-            prompt.text += f"\n\nHere is the content of the uploaded file {uploaded_file.name}:\n```\n{file_contents.decode('utf-8')}\n```"
-    
+
+    if show_similar_offer():
+        return
+    if st.session_state.pop("brainstorm_respond", False):
+        respond()
+        return
+
+    if prompt := st.chat_input("What content do you want to brainstorm today?", accept_file="multiple", file_type=["py", "js", "md", "txt"]):
         user_prompt = prompt.text
-        st.session_state.brainstormmessages.append({"role": "user", "content": user_prompt})
+        user_message = {"role": "user", "content": user_prompt}
+        if prompt.files:
+            user_message["attachments"] = read_attachments(prompt.files)
+        st.session_state.brainstormmessages.append(user_message)
         
         with st.chat_message("user"):
-            st.write(user_prompt)
+            show_message(user_message)
         
         print(f"USER PROMPT: {user_prompt=}, That is all.")    
         if user_prompt.startswith("/"):
@@ -89,14 +132,11 @@ def show_chat_ui():
             run_slash_command(command, args, st.session_state.brainstormmessages, st.session_state.get("slide_content", {}))
             return
 
-        with st.spinner("Thinking ...", show_time=True):
-            reasoning = {"effort":"low","summary":None}
-            model = ChatOpenAI(model=st.secrets['OPENAI_MODEL_NAME'], api_key=st.secrets['OPENAI_API_KEY'], reasoning=reasoning)
-            llm_messages = create_llm_msg(get_prompt("brainstorm_content"), get_message_history(st.session_state.brainstormmessages))
-            returned_string,full_response_from_llm = run_model(model, llm_messages)
-            with st.chat_message("assistant"):
-                st.markdown(returned_string)
-            st.session_state.brainstormmessages.append({"role": "assistant", "content": returned_string})
+        # Before paying for a fresh brainstorm, check whether a near-identical one was already saved.
+        if len(st.session_state.brainstormmessages) == 1 and (similar := find_similar_brainstorms(user_prompt)):
+            st.session_state.brainstorm_similar = similar
+            st.rerun()
+        respond()
 
 if __name__ == "__main__":
     show_chat_ui()
\ No newline at end of file
@@ -0,0 +1,36 @@
+import streamlit as st
+
+from ui.data_access import brainstorm_detail, brainstorm_page
+
+PAGE_SIZE = 50
+
+def pick_brainstorm(key, has_slides=None, page_size=PAGE_SIZE):
+    """Paged, filterable brainstorm picker; returns the selected row with content and slide_json, or None.
+
+    Only one page of ids and titles is loaded, and the full row is fetched when a row is
+    selected; both are cached across reruns and pages (see ``ui.data_access``).
+    """
+    cursors_key = f"{key}_cursors"
+    filter_key = f"{key}_filter"
+    title_filter = st.text_input("Filter by title", key=filter_key)
+    if st.session_state.get(f"{filter_key}_applied") != title_filter:
+        st.session_state[f"{filter_key}_applied"] = title_filter
+        st.session_state[cursors_key] = [None]
+    cursors = st.session_state.setdefault(cursors_key, [None])
+
+    rows, next_after_id = brainstorm_page(limit=page_size, after_id=cursors[-1], title_filter=title_filter or None, has_slides=has_slides)
+
+    selection = st.dataframe(rows, selection_mode="single-row", on_select="rerun", key=f"{key}_table_{len(cursors)}")
+    previous_col, page_col, next_col = st.columns([1, 2, 1])
+    if previous_col.button("Previous", key=f"{key}_previous", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    page_col.caption(f"Page {len(cursors)}")
+    if next_col.button("Next", key=f"{key}_next", disabled=next_after_id is None):
+        cursors.append(next_after_id)
+        st.rerun()
+
+    selected_rows = (selection or {}).get("selection", {}).get("rows") or []
+    if not selected_rows:
+        return None
+    return brainstorm_detail(rows[selected_rows[0]]["id"])
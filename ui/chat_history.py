@@ -0,0 +1,46 @@
+import functools
+
+import streamlit as st
+
+# Turns (a user message and its replies) rendered on every rerun; older turns load on demand.
+DEFAULT_VISIBLE_TURNS = 10
+
+@functools.lru_cache(maxsize=2048)
+def _message_markdown(content, attachment_names):
+    """One markdown block per message: the text plus a line per attachment."""
+    lines = [content] if content else []
+    lines.extend(f"📎 {name}" for name in attachment_names)
+    return "\n\n".join(lines)
+
+def show_message(message):
+    content = message.get("content") or ""
+    names = tuple(attachment["name"] for attachment in message.get("attachments", []))
+    st.markdown(_message_markdown(content if isinstance(content, str) else str(content), names))
+
+def _turn_starts(messages):
+    return [i for i, message in enumerate(messages) if message["role"] == "user"] or [0]
+
+def show_chat_history(messages, key, visible_turns=DEFAULT_VISIBLE_TURNS):
+    """Renders the last ``visible_turns`` turns of ``messages``; earlier turns load a page at a time.
+
+    Rerun cost then depends on the window, not on the length of the conversation.
+    """
+    messages = [message for message in messages if message["role"] != "system"]
+    loaded_key = f"{key}_loaded_turns"
+    starts = _turn_starts(messages)
+    shown_turns = visible_turns + st.session_state.get(loaded_key, 0)
+    first = starts[-shown_turns] if shown_turns < len(starts) else 0
+    hidden_turns = len(starts) - shown_turns if first else 0
+
+    if hidden_turns or st.session_state.get(loaded_key):
+        more_col, less_col = st.columns([3, 1])
+        if hidden_turns and more_col.button(f"Show earlier messages ({hidden_turns} more turn{'s' if hidden_turns != 1 else ''})", key=f"{key}_load_more"):
+            st.session_state[loaded_key] = st.session_state.get(loaded_key, 0) + visible_turns
+            st.rerun()
+        if st.session_state.get(loaded_key) and less_col.button("Collapse", key=f"{key}_collapse"):
+            st.session_state[loaded_key] = 0
+            st.rerun()
+
+    for message in messages[first:]:
+        with st.chat_message(message["role"]):
+            show_message(message)
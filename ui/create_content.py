@@ -1,85 +1,147 @@
 import streamlit as st
-import random
+import uuid
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 
-from graph.slide_graph import SlideGraph
+from graph.slide_graph import SlideGraph, USER_VISIBLE_TAG
+from graph.checkpointer import get_checkpointer, claim_thread, thread_owner, DEFAULT_CHECKPOINT_PATH
 from integration.slash_command_runner import run_slash_command
+from utils.history_manager import DEFAULT_PROMPT_TOKEN_BUDGET, message_text, read_attachments, to_history_dicts
+from utils.job_queue import get_job_queue
+from ui.job_status import track_job, get_tracked_job, clear_tracked_job, show_job_progress, show_job_outcome
+from ui.chat_history import show_chat_history
 
 st.title("Create Content")
 
-def get_file_contents(uploaded_file):
-        file_contents = uploaded_file.read()
-        return file_contents
+def checkpoint_path():
+    return st.secrets.get('CHECKPOINT_PATH', DEFAULT_CHECKPOINT_PATH)
 
-def get_message_history(messages):
-    message_history = []
-    for m in messages:
-        if m["role"] == "user":
-            message_history.append(HumanMessage(content=m["content"]))
-        elif m["role"] == "assistant":
-            message_history.append(AIMessage(content=m["content"]))
-    return message_history
+def current_user_email():
+    return st.user.get("email")
+
+def new_thread_id():
+    """A fresh thread id owned by the signed-in user."""
+    thread_id = uuid.uuid4().hex
+    if email := current_user_email():
+        claim_thread(thread_id, email, checkpoint_path())
+    return thread_id
+
+def get_thread_id():
+    # The thread id lives in the URL so a conversation survives reruns, reloads and restarts.
+    # Checkpoints are shared by all users, so only threads the signed-in user started are restored;
+    # any other id (someone else's link, or a thread with no recorded owner) starts a new one.
+    email = current_user_email()
+    if "thread_id" not in st.session_state:
+        requested = st.query_params.get("thread")
+        owned = requested and email and thread_owner(requested, checkpoint_path()) == email
+        st.session_state.thread_id = requested if owned else new_thread_id()
+    elif email and thread_owner(st.session_state.thread_id, checkpoint_path()) != email:
+        # A different user signed in on this session.
+        for key in ("messages", "slide_content", "expanded_response", "slides_loaded_turns"):
+            st.session_state.pop(key, None)
+        st.session_state.thread_id = new_thread_id()
+    st.query_params["thread"] = st.session_state.thread_id
+    return st.session_state.thread_id
+
+@st.cache_resource
+def get_slide_graph(model_name, api_key, prompt_token_budget, base_url, speculative=False):
+    return SlideGraph(model_name, api_key, checkpointer=get_checkpointer(checkpoint_path()), prompt_token_budget=prompt_token_budget, base_url=base_url, speculative=speculative)
+
+def restore_from_checkpoint(run_graph, config):
+    """Reloads the chat and slides of a persisted thread into a fresh session."""
+    state = run_graph.graph.get_state(config)
+    if not state or not state.values:
+        return
+    st.session_state.messages = to_history_dicts(state.values.get("message_history", []))
+    if state.values.get("slide_content"):
+        st.session_state["slide_content"] = state.values["slide_content"]
+
+def run_graph_job(job, run_graph, params, config):
+    """Runs one graph turn off the script thread; streamed text goes to job.partial, final updates to the result."""
+    streamed = ""
+    result = {}
+    for mode, s in run_graph.graph.stream(params, config, stream_mode=["messages", "updates"]):
+        job.raise_if_cancelled()
+        if mode == "messages":
+            chunk, metadata = s
+            if USER_VISIBLE_TAG in metadata.get("tags", []):
+                streamed += message_text(chunk)
+                job.update(partial=streamed)
+            continue
+        for k,v in s.items():
+            print(f"\n\nDEBUG DEBUG Key: {k}, Value: {v}")
+            if not v:
+                continue
+            for field in ("final_response", "expanded_response", "slide_content"):
+                if resp := v.get(field):
+                    result[field] = resp
+        if "final_response" in result:
+            job.update(partial=result["final_response"])
+    return result
+
+def apply_graph_result(result):
+    if resp := result.get("final_response"):
+        print(f"\n\nDEBUG DDEBUG DEBUG. Final full response: {resp}")
+        st.session_state.messages.append({"role": "assistant", "content": resp})
+    if resp := result.get("expanded_response"):
+        st.session_state["expanded_response"] = resp
+    if resp := result.get("slide_content"):
+        print(f"\n\nDEBUG DE. Adding to Session State the Slide content: {resp}")
+        st.session_state["slide_content"] = resp
 
 def show_chat_ui():
+    thread_id = get_thread_id()
+    config = {"configurable": {"thread_id": thread_id}}
+    runGraph = get_slide_graph(
+        st.secrets['OPENAI_MODEL_NAME'],
+        st.secrets['OPENAI_API_KEY'],
+        int(st.secrets.get("PROMPT_TOKEN_BUDGET", DEFAULT_PROMPT_TOKEN_BUDGET)),
+        st.secrets.get('OPENAI_BASE_URL'),
+        bool(st.secrets.get("SPECULATIVE_CLASSIFICATION", False)),
+    )
+
     if "messages" not in st.session_state:
         st.session_state.messages = []
+        restore_from_checkpoint(runGraph, config)
 
-    if "thread-id" not in st.session_state:
-        st.session_state.thread_id = random.randint(1000, 9999)
-    thread_id = st.session_state.thread_id
-
-    for message in st.session_state.messages:
-        if message["role"] != "system":
-            with st.chat_message(message["role"]):
-                st.markdown(message["content"])
-    
-    if prompt := st.chat_input("What slides do you want to generate today?", accept_file=True, file_type=["py", "js", "md", "txt"]):
-        if prompt and prompt["files"]:
-            uploaded_file=prompt["files"][0]
-            file_contents = get_file_contents(uploaded_file)
-            prompt.text += f"\n\nHere is the content of the uploaded file {uploaded_file.name}:\n```\n{file_contents.decode('utf-8')}\n```"
-    
+    with st.sidebar:
+        if st.button("New conversation"):
+            if job := get_tracked_job("graph"):
+                get_job_queue().cancel(job.id)
+                clear_tracked_job("graph")
+            for key in ("messages", "slide_content", "expanded_response", "slides_loaded_turns"):
+                st.session_state.pop(key, None)
+            st.session_state.thread_id = new_thread_id()
+            st.rerun()
+
+    job = get_tracked_job("graph")
+    if job and job.done:
+        clear_tracked_job("graph")
+        if show_job_outcome(job):
+            apply_graph_result(job.result or {})
+
+    if resp := st.session_state.get("expanded_response"):
+        with st.sidebar.expander("Detailed output"):
+            st.markdown(f"{resp}")
+
+    show_chat_history(st.session_state.messages, "slides")
+
+    job = get_tracked_job("graph")
+    if job and not job.done:
+        with st.chat_message("assistant"):
+            show_job_progress("graph", label="Thinking", show_partial=True)
+
+    if prompt := st.chat_input("What slides do you want to generate today?", accept_file="multiple", file_type=["py", "js", "md", "txt"], disabled=bool(job and not job.done)):
         user_prompt = prompt.text
-        st.session_state.messages.append({"role": "user", "content": user_prompt})
-        
-        with st.chat_message("user"):
-            st.write(user_prompt)
-
-        runGraph = SlideGraph(st.secrets['OPENAI_MODEL_NAME'],st.secrets['OPENAI_API_KEY'])
-        with st.spinner("Thinking ...", show_time=True):
-            full_response = ""
-            params={'message_history': get_message_history(st.session_state.messages),"user_prompt":user_prompt}
-            if st.session_state.get("slide_content"):
-                params['slide_content'] = st.session_state.get("slide_content")
-            
-            for s in runGraph.graph.stream(params, {"configurable":{"thread_id":thread_id}}):
-                #print(f"GRAPH RUN: {s}")
-                for k,v in s.items():
-                    print(f"\n\nDEBUG DEBUG Key: {k}, Value: {v}")
-                
-                    if resp := v.get("incremental_response"):
-                        with st.chat_message("assistant"):
-                            placeholder = st.empty()
-                            for response in resp:
-                                if isinstance(response, dict) and "content" in response:    
-                                    full_response = full_response + response["content"]
-                                else:
-                                    full_response = full_response + getattr(response, 'content', str(response))
-                                placeholder.markdown(full_response)
-                        st.session_state.messages.append({"role": "assistant", "content": full_response})
-                    if resp := v.get("final_response"):
-                        full_response = resp
-                        print(f"\n\nDEBUG DDEBUG DEBUG. Final full response: {full_response}")
-                        with st.chat_message("assistant"):
-                            st.markdown(full_response)
-                        st.session_state.messages.append({"role": "assistant", "content": full_response})
-                    if resp := v.get("expanded_response"):
-                        print(f"\n\nDEBUG DE. Expanded response: {resp}")
-                        with st.sidebar.expander("Detailed output"):
-                            st.markdown(f"{resp}")
-                    if resp := v.get("slide_content"):
-                        print(f"\n\nDEBUG DE. Adding to Session State the Slide content: {resp}")
-                        st.session_state["slide_content"] = resp
+        user_message = {"role": "user", "content": user_prompt}
+        if prompt.files:
+            user_message["attachments"] = read_attachments(prompt.files)
+        st.session_state.messages.append(user_message)
+
+        # Only the new turn is sent; earlier turns and slide_content come from the checkpoint.
+        new_turn = HumanMessage(content=user_prompt, additional_kwargs={"attachments": user_message.get("attachments", [])})
+        params = {'message_history': [new_turn], "user_prompt": user_prompt}
+        track_job("graph", get_job_queue().submit("graph", run_graph_job, runGraph, params, config))
+        st.rerun()
 
 if __name__ == "__main__":
     show_chat_ui()
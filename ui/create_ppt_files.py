@@ -1,56 +1,88 @@
 import streamlit as st
-import json
+import hashlib
 import os
 
-from integration.supabase_integration import get_supabase_client, get_all_brainstorms_from_db
-from utils.ppt_generator import create_one_presentation
+from integration.supabase_integration import get_supabase_client
+from ui.brainstorm_picker import pick_brainstorm
+from ui.data_access import brainstorm_deck
+from utils.artifact_store import DEFAULT_ARTIFACT_BUCKET, DEFAULT_ARTIFACT_DIR, artifact_key, get_artifact_store
+from utils.job_queue import get_job_queue
+from utils.ppt_generator import RENDERER_VERSION, create_one_presentation
+from utils.slide_deck import Deck, encode_deck
+from ui.job_status import track_job, get_tracked_job, show_job_progress, show_job_outcome
+
+PPTX_MIME = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+def get_pptx_store():
+    kind = st.secrets.get("ARTIFACT_STORE", "local")
+    storage = get_supabase_client() if kind == "supabase" else None
+    return get_artifact_store(
+        kind,
+        root=st.secrets.get("ARTIFACT_DIR", DEFAULT_ARTIFACT_DIR),
+        client=getattr(storage, "client", None),
+        bucket=st.secrets.get("ARTIFACT_BUCKET", DEFAULT_ARTIFACT_BUCKET),
+    )
 
 def parse_slide_json(raw_slide_json):
-    if isinstance(raw_slide_json, dict):
-        return raw_slide_json
-    elif isinstance(raw_slide_json, str):
-        try:
-            return json.loads(raw_slide_json)
-        except json.JSONDecodeError:
-            st.error("Error parsing slide JSON string. Using empty dict instead.")
-            return {}
-    elif isinstance(raw_slide_json, bytes):
+    """Decodes stored slide JSON (compact, compressed or legacy) into a Deck, parsed once per value."""
+    try:
+        return brainstorm_deck(raw_slide_json)
+    except (ValueError, UnicodeDecodeError):
+        st.error("Error parsing slide JSON. Using an empty deck instead.")
+        return Deck()
+
+def render_pptx_job(job, slide_json, output_fname, store=None, store_key=None):
+    job.update(message=f"Rendering {output_fname}")
+    create_one_presentation(slide_json, "Not used", output_fname)
+    output_path = os.path.join("output", output_fname)
+    if store is not None and store_key:
+        job.update(message=f"Storing {output_fname}")
         try:
-            return json.loads(raw_slide_json.decode('utf-8'))
-        except (UnicodeDecodeError, json.JSONDecodeError):
-            st.error("Error decoding/parsing slide JSON bytes. Using empty dict instead.")
-            return {}
-    else:
-        st.warning("Slide JSON is not in a recognized format. Using empty dict instead.")
-        return {}
+            with open(output_path, "rb") as f:
+                store.put(store_key, f.read(), suffix=".pptx")
+        except Exception as e:
+            # The file is rendered either way; only the next download misses the store.
+            print(f"PPTX: could not store {output_fname}: {e}")
+    return {"output_path": output_path, "output_fname": output_fname}
 
 def create_ppt_files():
-    supabase = get_supabase_client()
-    brainstorms = get_all_brainstorms_from_db(supabase)    
-    selection=st.dataframe(brainstorms, selection_mode="single-row", on_select="rerun")
-    print(f"\n\n DEBUG. SELECTION: {selection=}")
-    if selection and selection.get("selection") and selection["selection"].get("rows"):
-        selected_row_array = selection["selection"]["rows"]
-        if not selected_row_array or len(selected_row_array) == 0:
-            return
-        selected_row_id = selection["selection"]["rows"][0]
-        selected_row = brainstorms[selected_row_id]
+    selected_row = pick_brainstorm("ppt", has_slides=True)
+    if selected_row:
         title = selected_row.get("title", "No Title")
         content = selected_row.get("content", "No Content")
         slide_json = parse_slide_json(selected_row.get("slide_json", "{}"))
         with st.sidebar.expander(f"Title: {title}"):
             st.markdown(content)
         st.sidebar.markdown(f"### Slides JSON")
-        st.sidebar.json(slide_json, expanded=False)
+        st.sidebar.json(slide_json.to_dict(), expanded=False)
         title_safe = title.replace(" ", "_").replace("/", "_")
         title_safe = st.text_input("Filename to use (without extension)", value=title_safe)
                     
-        if st.button("Generate PPTX"):
+        output_fname = f"{title_safe}.pptx"
+        encoded_deck = encode_deck(slide_json)
+        # Rendered bytes depend only on the deck and the renderer, not on the file name.
+        store = get_pptx_store()
+        store_key = artifact_key("pptx", RENDERER_VERSION, encoded_deck)
+        stored = store.get(store_key, suffix=".pptx") if store else None
+        if stored is not None:
+            st.caption("This deck was rendered before; downloading the stored file.")
+            st.download_button("📥 Download Presentation", stored, output_fname, PPTX_MIME)
+            return
 
-            output_fname = f"{title_safe}.pptx"
-            create_one_presentation(slide_json,"Not used", output_fname)
+        # The same deck rendered to the same file name is the same job; a finished one is reused.
+        deck_hash = hashlib.sha256(encoded_deck.encode()).hexdigest()[:16]
+        job_name = f"pptx:{output_fname}:{deck_hash}"
+        if st.button("Generate PPTX"):
+            if not os.path.exists(os.path.join("output", output_fname)):
+                get_job_queue().forget(job_name)
+            job = get_job_queue().submit("pptx", render_pptx_job, slide_json, output_fname, store, store_key, key=job_name)
+            track_job(job_name, job)
 
-            output_path = os.path.join("output", output_fname)
+        job = get_tracked_job(job_name)
+        if job and not job.done:
+            show_job_progress(job_name, label="Rendering")
+        elif job and show_job_outcome(job) and os.path.exists(job.result["output_path"]):
+            output_path = job.result["output_path"]
             st.success(f"PPTX file created: {output_path}")
 
             with open(output_path, 'rb') as f:
@@ -60,7 +92,7 @@ def create_ppt_files():
                 "📥 Download Presentation",
                 presentation_bytes,
                 output_fname,
-                "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+                PPTX_MIME,
             )
                     
         
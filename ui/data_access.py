@@ -0,0 +1,67 @@
+"""Cached brainstorm reads shared by the View, Generate Content and Create PPT pages.
+
+Pages and details are cached with ``st.cache_data`` per user and query. Every key
+also includes ``brainstorm_generation``, which moves whenever this app writes a
+brainstorm (from any page, job or bulk worker) or a sync pulls in a remote change. So
+a write invalidates the cached reads without clearing any cache by hand. Decoded decks
+are cached with ``st.cache_resource`` by their stored text and are shared, so treat
+them as read-only. Failed reads raise inside the cached functions and are reported by
+the public wrappers, so an error is never cached and the next rerun tries again.
+"""
+import streamlit as st
+
+from integration.supabase_integration import brainstorm_generation, fetch_brainstorm_detail, fetch_brainstorm_page, get_supabase_client
+from utils.slide_deck import Deck, decode_deck
+
+# Backstop for changes the generation cannot see, e.g. another process writing a local SQLite file.
+CACHE_TTL_SECONDS = 60
+
+def _current_user():
+    try:
+        return st.user.get("email")
+    except Exception:
+        return None
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=500, show_spinner=False)
+def _brainstorm_page(user, generation, limit, after_id, title_filter, has_slides):
+    return fetch_brainstorm_page(get_supabase_client(), limit=limit, after_id=after_id, title_filter=title_filter, has_slides=has_slides)
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=200, show_spinner=False)
+def _brainstorm_detail(user, generation, row_id):
+    return fetch_brainstorm_detail(get_supabase_client(), row_id)
+
+def brainstorm_page(limit=50, after_id=None, title_filter=None, has_slides=None):
+    """Cached ``list_brainstorms``: (rows, cursor for the next page)."""
+    supabase = get_supabase_client()
+    if not supabase:
+        return [], None
+    try:
+        return _brainstorm_page(_current_user(), brainstorm_generation(supabase), limit, after_id, title_filter, has_slides)
+    except Exception as e:
+        if "relation \"brainstorms\" does not exist" in str(e):
+            return [], None
+        st.error(f"Error listing brainstorms from database: {e}")
+        print(f"Error listing brainstorms from database: {e}")
+        return [], None
+
+def brainstorm_detail(row_id):
+    """Cached ``get_brainstorm_detail``: the full row, or None."""
+    supabase = get_supabase_client()
+    if not supabase:
+        return None
+    try:
+        return _brainstorm_detail(_current_user(), brainstorm_generation(supabase), row_id)
+    except Exception as e:
+        st.error(f"Error fetching brainstorm {row_id} from database: {e}")
+        print(f"Error fetching brainstorm {row_id} from database: {e}")
+        return None
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _decoded_deck(slide_json: str) -> Deck:
+    return decode_deck(slide_json)
+
+def brainstorm_deck(slide_json) -> Deck:
+    """Decoded deck for stored slide JSON; each distinct value is parsed once per process."""
+    if isinstance(slide_json, str) and slide_json:
+        return _decoded_deck(slide_json)
+    return decode_deck(slide_json)
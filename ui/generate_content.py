@@ -1,60 +1,123 @@
 import streamlit as st
+import json
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
-from pydantic import BaseModel
-
-import time
 
 from integration.supabase_integration import get_supabase_client, get_all_brainstorms_from_db, update_brainstorm_slides_in_db
-from utils.llm_calls import create_llm_msg
+from utils.bulk_generation import generate_all_missing_slides
+from utils.job_queue import get_job_queue
+from utils.llm_calls import create_llm_msg, get_chat_model
+from utils.llm_scheduler import BATCH, INTERACTIVE
+from utils.outline_parser import parse_outline
 from utils.prompt_manager import get_prompt
+from utils.slide_deck import SlideDeck, encode_deck
+from utils.similarity_index import get_similarity_index, DEFAULT_REUSE_THRESHOLD
+from utils.telemetry import record_span
+from ui.brainstorm_picker import pick_brainstorm
+from ui.data_access import brainstorm_deck, brainstorm_detail
+from ui.job_status import track_job, get_tracked_job, clear_tracked_job, show_job_progress, show_job_outcome
 
-class SlideContentBlockText(BaseModel):
-    type: str = "text"
-    body: str
-
-class SlideContentBlockCode(BaseModel):
-    type: str = "code"
-    language: str = "python"
-    body: str
-
-class SlideContentBlockImage(BaseModel):
-    type: str = "image"
-    query: str
-    caption: str = ""
-
-class Slide(BaseModel):
-    id: str
-    title: str
-    content_blocks: list[SlideContentBlockText | SlideContentBlockCode | SlideContentBlockImage]
+def get_slide_model(priority=INTERACTIVE):
+    return get_chat_model(
+        st.secrets['OPENAI_MODEL_NAME'],
+        st.secrets['OPENAI_API_KEY'],
+        base_url=st.secrets.get('OPENAI_BASE_URL'),
+        priority=priority,
+    ).with_structured_output(SlideDeck)
 
-class SlideDeck(BaseModel):
-    title: str
-    subtitle: str = ""
-    slides: list[Slide]
-    user_message: str = ""
-
-def generate_json_for_slides(row_id, title, content):
+def generate_json_for_slides(row_id, title, content, model=None):
     print(f"\n\nTO-DO TO-DO \n\nGenerating JSON for slides for {row_id=}, {title=}, {content[:50]=}...")
-    model = ChatOpenAI(model=st.secrets['OPENAI_MODEL_NAME'], api_key=st.secrets['OPENAI_API_KEY']).with_structured_output(SlideDeck)
+    supabase=get_supabase_client()
+    # Brainstorms that are already a slide-by-slide outline are converted without an LLM call.
+    with record_span("generate_json_for_slides.outline", kind="parse"):
+        outline = parse_outline(content, default_title=title)
+    if outline is not None:
+        update_brainstorm_slides_in_db(supabase, row_id, encode_deck(outline))
+        return
+    model = model or get_slide_model()
     llm_messages = create_llm_msg(get_prompt("generate_slide_content"), [HumanMessage(content=f"Title: {title}\n\nContent: {content}")])
     #print(f"\n\nLLM Messages: {llm_messages}:XXXXXX\n\n")
-    resp = model.invoke(llm_messages)
-    supabase=get_supabase_client()
-    update_brainstorm_slides_in_db(supabase, row_id, resp.model_dump_json())
+    with record_span("generate_json_for_slides", kind="llm_call"):
+        resp = model.invoke(llm_messages)
+    update_brainstorm_slides_in_db(supabase, row_id, encode_deck(resp))
     return
 
-def generate_content():
-    supabase = get_supabase_client()
-    brainstorms = get_all_brainstorms_from_db(supabase)    
-    selection=st.dataframe(brainstorms, selection_mode="single-row", on_select="rerun")
-    print(f"\n\n DEBUG. SELECTION: {selection=}")
-    if selection and selection.get("selection") and selection["selection"].get("rows"):
-        selected_row_array = selection["selection"]["rows"]
-        if not selected_row_array or len(selected_row_array) == 0:
+def generate_json_job(job, row_id, title, content, model):
+    job.update(message="Generating slides")
+    generate_json_for_slides(row_id, title, content, model)
+    return {"row_id": row_id}
+
+def bulk_generation_job(job, supabase, model, concurrency, tokens_per_minute):
+    def report_progress(progress):
+        fraction = progress.done / progress.total if progress.total else 1.0
+        job.update(progress=fraction, message=f"{progress.done}/{progress.total} generated, {progress.failed} failed, {progress.written} saved ({progress.elapsed:.0f}s)")
+
+    job.update(message="Finding brainstorms without slides...")
+    progress = generate_all_missing_slides(
+        supabase,
+        model,
+        concurrency=concurrency,
+        tokens_per_minute=tokens_per_minute,
+        progress_callback=report_progress,
+        # Cancelling drops rows not yet sent to the model; decks already generated are saved first.
+        should_stop=lambda: job.cancelled,
+    )
+    job.raise_if_cancelled()
+    return {"total": progress.total, "completed": progress.completed, "failed": progress.failed, "errors": progress.errors}
+
+def show_bulk_generation():
+    with st.sidebar.expander("Bulk generation"):
+        concurrency = st.number_input("Concurrent requests", min_value=1, max_value=32, value=int(st.secrets.get("BULK_CONCURRENCY", 4)))
+        tokens_per_minute = st.number_input("Tokens per minute (0 = unlimited)", min_value=0, value=int(st.secrets.get("BULK_TOKENS_PER_MINUTE", 0)), step=10000)
+        job = get_tracked_job("bulk_slides")
+        if job and not job.done:
+            show_job_progress("bulk_slides", label="Bulk generation")
             return
-        selected_row_id = selection["selection"]["rows"][0]
-        selected_row = brainstorms[selected_row_id]
+        if job:
+            if show_job_outcome(job):
+                result = job.result or {}
+                if result.get("failed"):
+                    st.warning(f"{result['failed']} brainstorm(s) failed: {result.get('errors')}")
+                st.success(f"Generated slides for {result.get('completed', 0)} of {result.get('total', 0)} brainstorms.")
+        if st.button("Generate JSON for all"):
+            job = get_job_queue().submit(
+                "bulk_slides",
+                bulk_generation_job,
+                get_supabase_client(),
+                get_slide_model(priority=BATCH),
+                concurrency,
+                tokens_per_minute or None,
+                key="bulk_slides",
+                reuse_succeeded=False,
+            )
+            track_job("bulk_slides", job)
+            st.rerun()
+
+@st.cache_resource(ttl=600)
+def refresh_similarity_index():
+    """Re-syncs the near-duplicate index at most every ten minutes per process."""
+    return get_similarity_index().sync(get_all_brainstorms_from_db(get_supabase_client()))
+
+def show_reusable_slides(row_id, title, content):
+    """Offers the slides of a near-identical brainstorm instead of generating new ones."""
+    threshold = float(st.secrets.get("SIMILARITY_REUSE_THRESHOLD", DEFAULT_REUSE_THRESHOLD))
+    matches = get_similarity_index().search(f"{title}\n{content}", k=1, threshold=threshold, require_slides=True, exclude_id=row_id)
+    if not matches:
+        return
+    match = matches[0]
+    source = brainstorm_detail(match.doc_id)
+    if not source or not source.get("slide_json"):
+        return
+    st.info(f"\"{match.title}\" is a near match (similarity {match.score:.2f}) and already has slides.")
+    if st.button(f"Copy slides from \"{match.title}\""):
+        update_brainstorm_slides_in_db(get_supabase_client(), row_id, source.get("slide_json"))
+        st.rerun()
+
+def generate_content():
+    show_bulk_generation()
+    refresh_similarity_index()
+    selected_row = pick_brainstorm("generate")
+    if selected_row:
         row_id = selected_row.get("id")
         title = selected_row.get("title", "No Title")
         content = selected_row.get("content", "No Content")
@@ -62,16 +125,29 @@ def generate_content():
         with st.expander(f"Title: {title}"):
            st.markdown(content)
         if slide_json and slide_json != "{}":
+            try:
+                # Stored compact; pretty-printed only for display.
+                slide_json = json.dumps(brainstorm_deck(slide_json).to_dict(), indent=2)
+            except ValueError:
+                pass
             st.text_area("Slides JSON", slide_json, height=300)
             if st.button("Render Slides"):
                 st.markdown("### TO-DO TO-DO TO-DO: Slides Preview")
         else:
+            job_name = f"slides:{row_id}"
+            job = get_tracked_job(job_name)
+            if job and not job.done:
+                show_job_progress(job_name, label="Generating slides")
+                return
+            if job:
+                clear_tracked_job(job_name)
+                if show_job_outcome(job):
+                    st.success(f"Slide generation: ({job.finished_at - job.started_at:.1f}s elapsed)")
+            show_reusable_slides(row_id, title, content)
             if st.button("Generate JSON"):
-                start_time = time.time()
-                with st.spinner("Generating slides...", show_time=True):
-                    generate_json_for_slides(row_id, title, content)
-                    elapsed = time.time() - start_time
-                    st.markdown(f"Slide generation: ({elapsed:.1f}s elapsed)")
+                job = get_job_queue().submit("slides", generate_json_job, row_id, title, content, get_slide_model(), key=job_name, reuse_succeeded=False)
+                track_job(job_name, job)
+                st.rerun()
         
     
 st.title("Generate Content")   
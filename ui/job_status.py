@@ -0,0 +1,41 @@
+import streamlit as st
+
+from utils.job_queue import get_job_queue, SUCCEEDED
+
+POLL_INTERVAL_SECONDS = 2
+
+def track_job(name, job):
+    """Remembers a job id in session state under ``name``; only the id survives reruns."""
+    st.session_state.setdefault("jobs", {})[name] = job.id
+
+def get_tracked_job(name):
+    job_id = st.session_state.get("jobs", {}).get(name)
+    return get_job_queue().get(job_id) if job_id else None
+
+def clear_tracked_job(name):
+    st.session_state.get("jobs", {}).pop(name, None)
+
+@st.fragment(run_every=POLL_INTERVAL_SECONDS)
+def show_job_progress(name, label="Working", show_partial=False):
+    """Polls a running job without rerunning the page; reruns the page once the job is done."""
+    job = get_tracked_job(name)
+    if job is None:
+        return
+    if job.done:
+        st.rerun()
+    if show_partial and job.partial:
+        st.markdown(job.partial)
+    st.progress(job.progress, text=f"{label}: {job.message or job.status}")
+    if st.button("Cancel", key=f"cancel_{name}"):
+        get_job_queue().cancel(job.id)
+        st.rerun()
+
+def show_job_outcome(job):
+    """Shows a one-line result for a finished job; returns True if it succeeded."""
+    if job.status == SUCCEEDED:
+        return True
+    if job.error:
+        st.error(f"Job {job.status}: {job.error}")
+    else:
+        st.warning(f"Job {job.status}.")
+    return False
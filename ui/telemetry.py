@@ -0,0 +1,55 @@
+import streamlit as st
+
+from graph.slide_graph import get_speculation_stats
+from integration.brainstorm_cache import get_brainstorm_cache
+from integration.supabase_pool import get_pool_stats
+from utils.job_queue import get_job_queue
+from utils.llm_calls import get_llm_single_flight
+from utils.llm_scheduler import get_scheduler
+from utils.telemetry import get_telemetry
+from utils.tracing import get_exporter_stats
+
+st.title("Telemetry")
+
+def show_telemetry():
+    telemetry = get_telemetry()
+    st.caption(f"Rolling window of the last {telemetry.window} spans per name in this process. All spans are appended to {telemetry.sink_path}.")
+    if st.button("Refresh"):
+        st.rerun()
+
+    st.markdown("### LLM scheduler")
+    st.dataframe([get_scheduler().stats()], hide_index=True)
+    st.markdown("### Coalesced LLM calls")
+    st.dataframe([get_llm_single_flight().stats()], hide_index=True)
+    st.markdown("### Speculative generation")
+    st.dataframe([get_speculation_stats()], hide_index=True)
+    if pool_stats := get_pool_stats():
+        st.markdown("### Supabase client pool")
+        st.dataframe(pool_stats, hide_index=True)
+        if db_rows := [row for row in telemetry.summary() if row["kind"] == "db"]:
+            st.caption("Per-call latency of Supabase operations")
+            st.dataframe(db_rows, hide_index=True)
+    st.markdown("### Brainstorm cache")
+    st.dataframe([get_brainstorm_cache().stats()], hide_index=True)
+    st.markdown("### Background jobs")
+    st.dataframe([get_job_queue().stats()], hide_index=True)
+    if exporter_stats := get_exporter_stats():
+        st.markdown("### Trace exporter")
+        st.dataframe([exporter_stats], hide_index=True)
+
+    summary = telemetry.summary()
+    if not summary:
+        st.info("No spans recorded yet.")
+        return
+
+    st.markdown("### Latency, tokens and cost by span")
+    st.dataframe(summary, hide_index=True)
+    st.metric("Estimated cost in window (USD)", f"{sum(row['cost_usd'] for row in summary if row['kind'] == 'llm'):.4f}")
+
+    st.markdown("### Recent spans")
+    kinds = sorted({row["kind"] for row in summary})
+    selected = st.multiselect("Kinds", kinds, default=kinds)
+    recent = [span for span in telemetry.recent(200) if span["kind"] in selected]
+    st.dataframe(recent, hide_index=True)
+
+show_telemetry()
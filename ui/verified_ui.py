@@ -17,8 +17,19 @@ def show_sidebar(user, role):
             st.image(picture, width=100)
         if st.button("Log out"):
             st.logout()
-        with st.expander("Session State"):
-            st.json(st.session_state)
+        if role == "admin":
+            show_session_state()
+
+def show_session_state():
+    """Admin debug view; builds nothing until asked, then shows one key at a time."""
+    with st.expander("Session State"):
+        if not st.checkbox("Inspect session state", key="inspect_session_state"):
+            return
+        sizes = {str(k): len(v) if hasattr(v, "__len__") else None for k, v in st.session_state.items()}
+        st.dataframe([{"key": k, "type": type(st.session_state[k]).__name__, "len": n} for k, n in sorted(sizes.items())], hide_index=True)
+        key = st.selectbox("Show value of", sorted(sizes), index=None, key="inspect_session_state_key")
+        if key is not None:
+            st.json(st.session_state[key], expanded=False)
 
 def show_ui_core(user,role):
 
@@ -43,6 +54,7 @@ def show_ui_core(user,role):
     if role == "admin":
         pages["Admin"] = [
             st.Page("ui/manage_users.py", title="Users"),
+            st.Page("ui/telemetry.py", title="Telemetry"),
         ]
 
     pg = st.navigation(pages, position="top")
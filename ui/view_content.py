@@ -1,27 +1,53 @@
+import time
+
 import streamlit as st
 
 from integration.supabase_integration import get_supabase_client, get_all_brainstorms_from_db
+from ui.brainstorm_picker import pick_brainstorm
+from ui.data_access import brainstorm_deck, brainstorm_detail
+from utils.search_index import get_search_index
+
+SEARCH_LIMIT = 50
+
+@st.cache_resource(ttl=600)
+def refresh_search_index():
+    """Catches the search index up with rows saved elsewhere; our own saves are indexed as they happen."""
+    return get_search_index().sync(get_all_brainstorms_from_db(get_supabase_client()))
+
+def show_brainstorm(selected_row):
+    title = selected_row.get("title", "No Title")
+    content = selected_row.get("content", "No Content")
+    slides_json = selected_row.get("slide_json") or "{}"
+    st.markdown(f"## Title: {title}")
+    st.markdown(f"### Content")
+    st.markdown(content)
+    st.markdown(f"### Slides JSON")
+    st.json(brainstorm_deck(slides_json).to_dict())
+
+def show_search_results(query):
+    refresh_search_index()
+    start = time.monotonic()
+    hits = get_search_index().search(query, limit=SEARCH_LIMIT)
+    st.caption(f"{len(hits)} result{'s' if len(hits) != 1 else ''} in {(time.monotonic() - start) * 1000:.0f} ms")
+    if not hits:
+        return
+    rows = [{"id": hit.doc_id, "title": hit.title, "match": hit.snippet, "score": round(hit.score, 2)} for hit in hits]
+    selection = st.dataframe(rows, selection_mode="single-row", on_select="rerun", hide_index=True, key=f"view_search_{query}")
+    selected_rows = (selection or {}).get("selection", {}).get("rows") or []
+    if selected_rows:
+        selected_row = brainstorm_detail(rows[selected_rows[0]]["id"])
+        if selected_row:
+            show_brainstorm(selected_row)
 
 def show_brainstorms():
-    supabase = get_supabase_client()
-    brainstorms = get_all_brainstorms_from_db(supabase)    
-    selection=st.dataframe(brainstorms, selection_mode="single-row", on_select="rerun")
-    print(f"\n\n DEBUG. SELECTION: {selection=}")
-    if selection and selection.get("selection") and selection["selection"].get("rows"):
-        selected_row_array = selection["selection"]["rows"]
-        if not selected_row_array or len(selected_row_array) == 0:
-            return
-        selected_row_id = selection["selection"]["rows"][0]
-        selected_row = brainstorms[selected_row_id]
-        title = selected_row.get("title", "No Title")
-        content = selected_row.get("content", "No Content")
-        slides_json = selected_row.get("slides_json", "{}")
-        st.markdown(f"## Title: {title}")
-        st.markdown(f"### Content")
-        st.markdown(content)
-        st.markdown(f"### Slides JSON")
-        st.json(slides_json)
-        
-    
-st.title("Brainstormed Content")    
-show_brainstorms()
\ No newline at end of file
+    selected_row = pick_brainstorm("view")
+    if selected_row:
+        show_brainstorm(selected_row)
+
+
+st.title("Brainstormed Content")
+query = st.text_input("Search titles, content and slides", placeholder="e.g. recursion base case")
+if query.strip():
+    show_search_results(query.strip())
+else:
+    show_brainstorms()
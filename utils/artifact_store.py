@@ -0,0 +1,109 @@
+"""Content-addressed store for rendered files, so repeated downloads skip rendering.
+
+``ARTIFACT_STORE`` in the secrets selects one of:
+
+* ``local``    - files under ``ARTIFACT_DIR`` (default ``data/artifacts``),
+* ``supabase`` - a Supabase Storage bucket (``ARTIFACT_BUCKET``) for deployments
+                 whose local disk does not survive restarts,
+* ``off``      - no store; every download renders again.
+
+Keys are content hashes. An artifact never changes once written, so there is no
+invalidation. A changed deck or renderer produces a new key.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from utils.telemetry import traced
+
+DEFAULT_ARTIFACT_DIR = os.path.join("data", "artifacts")
+DEFAULT_ARTIFACT_BUCKET = "artifacts"
+
+
+def artifact_key(*parts) -> str:
+    """Stable key for the inputs that determine an artifact's bytes."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LocalArtifactStore:
+    def __init__(self, root: str = DEFAULT_ARTIFACT_DIR):
+        self.root = root
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}{suffix}")
+
+    @traced("artifacts.get", kind="storage")
+    def get(self, key: str, suffix: str = "") -> bytes | None:
+        try:
+            with open(self._path(key, suffix), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    @traced("artifacts.put", kind="storage")
+    def put(self, key: str, data: bytes, suffix: str = ""):
+        path = self._path(key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+class SupabaseArtifactStore:
+    """Supabase Storage bucket with a small in-process LRU, so reruns do not download again."""
+
+    def __init__(self, client, bucket: str = DEFAULT_ARTIFACT_BUCKET, memory_items: int = 16):
+        self.client = client
+        self.bucket = bucket
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, name: str, data: bytes):
+        with self._lock:
+            self._memory[name] = data
+            self._memory.move_to_end(name)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    @traced("artifacts.get", kind="storage")
+    def get(self, key: str, suffix: str = "") -> bytes | None:
+        name = f"{key[:2]}/{key}{suffix}"
+        with self._lock:
+            if name in self._memory:
+                self._memory.move_to_end(name)
+                return self._memory[name]
+        try:
+            data = self.client.storage.from_(self.bucket).download(name)
+        except Exception:
+            # The client raises on a missing object; treat that as a miss.
+            return None
+        self._remember(name, data)
+        return data
+
+    @traced("artifacts.put", kind="storage")
+    def put(self, key: str, data: bytes, suffix: str = ""):
+        name = f"{key[:2]}/{key}{suffix}"
+        self.client.storage.from_(self.bucket).upload(name, data, {"upsert": "true"})
+        self._remember(name, data)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_artifact_store(kind: str = "local", root: str = DEFAULT_ARTIFACT_DIR, client=None, bucket: str = DEFAULT_ARTIFACT_BUCKET):
+    """Process-wide store for ``kind``; None when the store is off (or Supabase has no client)."""
+    if kind == "off" or (kind == "supabase" and client is None):
+        return None
+    with _stores_lock:
+        key = (kind, root, bucket)
+        if key not in _stores:
+            _stores[key] = SupabaseArtifactStore(client, bucket) if kind == "supabase" else LocalArtifactStore(root)
+        return _stores[key]
@@ -0,0 +1,225 @@
+"""Headless bulk generation of slide JSON for every brainstorm that does not have one yet.
+
+Run from the repository root so ``.streamlit/secrets.toml`` is picked up::
+
+    python -m utils.bulk_generation --concurrency 4 --tokens-per-minute 200000
+
+Point ``OPENAI_BASE_URL`` in the secrets (or ``--base-url``) at a local mock server to
+exercise the whole pipeline without calling OpenAI.
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from langchain_core.messages import HumanMessage
+
+from integration.supabase_bulk import bulk_update_brainstorm_slides
+from integration.supabase_integration import get_brainstorms_without_slides_from_db
+from utils.llm_calls import create_llm_msg, estimate_tokens, get_chat_model
+from utils.outline_parser import parse_outline
+from utils.prompt_manager import get_prompt
+from utils.slide_deck import SlideDeck, encode_deck
+from utils.llm_scheduler import BATCH
+from utils.rate_limiter import RateLimiter
+from utils.telemetry import record_span
+
+# Output budget reserved per call on top of the prompt estimate.
+EXPECTED_COMPLETION_TOKENS = 2000
+
+
+class GenerationStopped(Exception):
+    """A row was abandoned because the run is stopping; not counted as a failure."""
+
+
+@dataclass
+class BulkProgress:
+    total: int
+    completed: int = 0
+    failed: int = 0
+    written: int = 0
+    retries: int = 0
+    stopped: bool = False
+    started_at: float = field(default_factory=time.monotonic)
+    errors: dict = field(default_factory=dict)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def done(self) -> int:
+        return self.completed + self.failed
+
+
+def build_slide_messages(title, content):
+    return create_llm_msg(get_prompt("generate_slide_content"), [HumanMessage(content=f"Title: {title}\n\nContent: {content}")])
+
+
+def _generate_with_retries(model, row, limiter, max_retries, backoff_base, progress, lock, should_stop=None):
+    # Brainstorms that are already an outline are parsed locally; no LLM call or rate-limit slot needed.
+    if (outline := parse_outline(row.get("content", ""), default_title=row.get("title"))) is not None:
+        return SlideDeck.model_validate(outline)
+    llm_messages = build_slide_messages(row.get("title", ""), row.get("content", ""))
+    tokens = estimate_tokens(llm_messages) + EXPECTED_COMPLETION_TOKENS
+    attempt = 0
+    while True:
+        if should_stop and should_stop():
+            raise GenerationStopped()
+        if limiter:
+            limiter.acquire(tokens)
+        try:
+            with record_span("bulk_generation.row", kind="llm_call", row_id=row.get("id"), attempt=attempt):
+                return model.invoke(llm_messages)
+        except Exception as e:
+            attempt += 1
+            if attempt > max_retries:
+                raise
+            delay = backoff_base * (2 ** (attempt - 1)) * (1 + random.random())
+            print(f"BULK: row {row.get('id')} failed ({e}), retry {attempt}/{max_retries} in {delay:.1f}s")
+            with lock:
+                progress.retries += 1
+            time.sleep(delay)
+
+
+def generate_all_missing_slides(
+    supabase,
+    model,
+    concurrency: int = 4,
+    tokens_per_minute: int | None = None,
+    requests_per_minute: int | None = None,
+    max_retries: int = 3,
+    backoff_base: float = 2.0,
+    batch_size: int = 10,
+    progress_callback=None,
+    rows=None,
+    should_stop=None,
+) -> BulkProgress:
+    """Generates slide JSON for all brainstorms with an empty ``slide_json``.
+
+    ``model`` is a chat model bound with ``with_structured_output(SlideDeck)``. At most
+    ``concurrency`` calls are in flight at once. Finished decks are written back with
+    ``bulk_update_brainstorm_slides`` in batches of ``batch_size`` rows: one request per
+    batch on Supabase once its ``update_brainstorm_slides`` function exists, one request
+    per deck until then (see ``integration.storage``). ``progress_callback`` is called
+    with a ``BulkProgress`` after every finished row and every write.
+
+    When ``should_stop()`` turns true, rows not yet started are dropped without calling
+    the model. Calls already in flight finish, and every deck generated so far is
+    written before the function returns with ``progress.stopped`` set.
+    """
+    if rows is None:
+        rows = get_brainstorms_without_slides_from_db(supabase)
+    progress = BulkProgress(total=len(rows))
+    limiter = RateLimiter(tokens_per_minute, requests_per_minute) if (tokens_per_minute or requests_per_minute) else None
+    lock = threading.Lock()
+    pending = []
+
+    def report():
+        if progress_callback:
+            progress_callback(progress)
+
+    def flush():
+        for result in bulk_update_brainstorm_slides(supabase, pending, chunk_size=batch_size):
+            if result.ok:
+                progress.written += 1
+            else:
+                progress.errors[result.id] = f"write failed: {result.error}"
+        pending.clear()
+        report()
+
+    if not rows:
+        report()
+        return progress
+
+    def collect(future, row):
+        try:
+            deck = future.result()
+        except GenerationStopped:
+            return
+        except Exception as e:
+            print(f"BULK: giving up on row {row.get('id')}: {e}")
+            with lock:
+                progress.failed += 1
+                progress.errors[row.get("id")] = str(e)
+            report()
+            return
+        with lock:
+            progress.completed += 1
+        pending.append((row.get("id"), encode_deck(deck)))
+        if len(pending) >= batch_size:
+            flush()
+        else:
+            report()
+
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    futures = {
+        executor.submit(_generate_with_retries, model, row, limiter, max_retries, backoff_base, progress, lock, should_stop): row
+        for row in rows
+    }
+    collected = set()
+    try:
+        for future in as_completed(futures):
+            collect(future, futures[future])
+            collected.add(future)
+            if should_stop and should_stop():
+                progress.stopped = True
+                break
+    finally:
+        # Queued rows are cancelled before they reach the model; running calls are awaited.
+        executor.shutdown(wait=True, cancel_futures=True)
+    if progress.stopped:
+        for future, row in futures.items():
+            if future not in collected and future.done() and not future.cancelled():
+                collect(future, row)
+    if pending:
+        flush()
+    return progress
+
+
+def print_progress(progress: BulkProgress):
+    print(
+        f"BULK: {progress.done}/{progress.total} done, {progress.failed} failed, "
+        f"{progress.written} written, {progress.retries} retries ({progress.elapsed:.1f}s)"
+    )
+
+
+def main():
+    import streamlit as st
+    from integration.supabase_integration import get_supabase_client
+
+    parser = argparse.ArgumentParser(description="Generate slide JSON for all brainstorms that do not have it yet.")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--tokens-per-minute", type=int, default=None)
+    parser.add_argument("--requests-per-minute", type=int, default=None)
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--model", default=None, help="Defaults to OPENAI_MODEL_NAME from the secrets.")
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible endpoint, e.g. a local mock server.")
+    args = parser.parse_args()
+
+    model = get_chat_model(
+        args.model or st.secrets['OPENAI_MODEL_NAME'],
+        st.secrets.get('OPENAI_API_KEY', 'not-needed'),
+        base_url=args.base_url or st.secrets.get('OPENAI_BASE_URL'),
+        priority=BATCH,
+    ).with_structured_output(SlideDeck)
+    progress = generate_all_missing_slides(
+        get_supabase_client(),
+        model,
+        concurrency=args.concurrency,
+        tokens_per_minute=args.tokens_per_minute,
+        requests_per_minute=args.requests_per_minute,
+        max_retries=args.max_retries,
+        batch_size=args.batch_size,
+        progress_callback=print_progress,
+    )
+    print_progress(progress)
+    for row_id, err in progress.errors.items():
+        print(f"BULK: row {row_id} failed: {err}")
+
+
+if __name__ == "__main__":
+    main()
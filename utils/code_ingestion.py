@@ -0,0 +1,263 @@
+"""Turns uploaded source files into a compact, prompt-sized digest.
+
+Large uploads are not inlined whole. Each file is split into syntax-aware chunks:
+top-level functions and classes via ``ast`` for Python, and declaration boundaries
+for JavaScript. Other text is split into line windows. Chunks are summarized
+concurrently by the chat model. Summaries are cached on disk by file hash, so the same
+file uploaded again (or re-read on the next turn) costs nothing.
+
+The digest lists every chunk with its one-line summary and then adds the full text of
+the chunks most relevant to the user's message, up to the token budget. Small files
+are still inlined as they are.
+"""
+import ast
+import contextvars
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from utils.prompt_manager import get_prompt
+from utils.similarity_index import tokenize
+from utils.telemetry import record_span
+
+DEFAULT_SUMMARY_CACHE_PATH = os.path.join("data", "code_summaries.json")
+# Files up to this size are inlined unchanged.
+INLINE_FILE_TOKENS = 1500
+MAX_CHUNK_LINES = 150
+WINDOW_LINES = 80
+# Summaries are requested for at most this many characters of a chunk.
+MAX_SUMMARY_INPUT_CHARS = 6000
+
+_JS_BOUNDARY = re.compile(
+    r"^(?:export\s+(?:default\s+)?)?(?:async\s+)?(?:function\*?\s+(\w+)|class\s+(\w+)|(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*=>|\w+\s*=>))"
+)
+
+
+@dataclass
+class Chunk:
+    file: str
+    name: str
+    start_line: int
+    end_line: int
+    text: str
+
+    @property
+    def label(self) -> str:
+        return f"{self.name} (lines {self.start_line}-{self.end_line})"
+
+
+def _windows(file: str, lines: list[str], start: int, end: int, name: str) -> list[Chunk]:
+    """Splits lines[start:end] (0-based) into fixed windows."""
+    chunks = []
+    for s in range(start, end, WINDOW_LINES):
+        e = min(s + WINDOW_LINES, end)
+        text = "\n".join(lines[s:e])
+        if text.strip():
+            suffix = f" part {s // WINDOW_LINES + 1}" if end - start > WINDOW_LINES else ""
+            chunks.append(Chunk(file, f"{name}{suffix}", s + 1, e, text))
+    return chunks
+
+
+def _python_chunks(file: str, content: str, lines: list[str]) -> list[Chunk] | None:
+    try:
+        tree = ast.parse(content)
+    except SyntaxError:
+        return None
+    chunks = []
+    covered = 0
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        start = min([d.lineno for d in node.decorator_list] + [node.lineno]) - 1
+        end = node.end_lineno
+        if start > covered:
+            chunks.extend(_windows(file, lines, covered, start, "module code"))
+        kind = "class" if isinstance(node, ast.ClassDef) else "def"
+        if isinstance(node, ast.ClassDef) and end - start > MAX_CHUNK_LINES:
+            # Big classes are split per method so each chunk stays summarizable.
+            # Class-level statements before, between and after methods go in "class" chunks.
+            methods = [n for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+            class_covered = start
+            for method in methods:
+                m_start = min([d.lineno for d in method.decorator_list] + [method.lineno]) - 1
+                if m_start > class_covered:
+                    chunks.extend(_windows(file, lines, class_covered, m_start, f"class {node.name}"))
+                chunks.extend(_windows(file, lines, m_start, method.end_lineno, f"{node.name}.{method.name}"))
+                class_covered = method.end_lineno
+            if end > class_covered:
+                chunks.extend(_windows(file, lines, class_covered, end, f"class {node.name}"))
+        elif end - start > MAX_CHUNK_LINES:
+            chunks.extend(_windows(file, lines, start, end, f"{kind} {node.name}"))
+        else:
+            chunks.append(Chunk(file, f"{kind} {node.name}", start + 1, end, "\n".join(lines[start:end])))
+        covered = end
+    if covered < len(lines):
+        chunks.extend(_windows(file, lines, covered, len(lines), "module code"))
+    return chunks
+
+
+def _javascript_chunks(file: str, lines: list[str]) -> list[Chunk]:
+    starts = []
+    for i, line in enumerate(lines):
+        if match := _JS_BOUNDARY.match(line):
+            starts.append((i, next(g for g in match.groups() if g)))
+    if not starts:
+        return _windows(file, lines, 0, len(lines), "code")
+    chunks = []
+    if starts[0][0] > 0:
+        chunks.extend(_windows(file, lines, 0, starts[0][0], "module code"))
+    for (start, name), (end, _) in zip(starts, starts[1:] + [(len(lines), None)]):
+        if end - start > MAX_CHUNK_LINES:
+            chunks.extend(_windows(file, lines, start, end, name))
+        else:
+            chunks.append(Chunk(file, name, start + 1, end, "\n".join(lines[start:end])))
+    return chunks
+
+
+def split_code(name: str, content: str) -> list[Chunk]:
+    """Splits a file into chunks along function/class boundaries where the language allows."""
+    lines = content.splitlines()
+    ext = os.path.splitext(name)[1].lower()
+    if ext == ".py":
+        if (chunks := _python_chunks(name, content, lines)) is not None:
+            return chunks
+    elif ext in (".js", ".jsx", ".ts", ".tsx", ".mjs"):
+        return _javascript_chunks(name, lines)
+    return _windows(name, lines, 0, len(lines), "section")
+
+
+class SummaryCache:
+    """Chunk summaries keyed by file hash and chunk position, persisted as JSON."""
+
+    def __init__(self, path: str | None = DEFAULT_SUMMARY_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._summaries = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self._summaries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"CODE-INGESTION: ignoring unreadable summary cache {path}: {e}")
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            return self._summaries.get(key)
+
+    def put_many(self, items: dict):
+        if not items:
+            return
+        with self._lock:
+            self._summaries.update(items)
+            data = dict(self._summaries)
+        if not self.path:
+            return
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_summary_cache(path: str | None = DEFAULT_SUMMARY_CACHE_PATH) -> SummaryCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SummaryCache(path)
+        return _cache
+
+
+def _file_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8", errors="replace")).hexdigest()[:24]
+
+
+class CodeIngestor:
+    def __init__(self, summarizer, count_tokens, max_workers: int = 4, cache: SummaryCache | None = None):
+        """``summarizer`` is a chat model; ``count_tokens`` measures text against the prompt budget."""
+        self.summarizer = summarizer
+        self.count_tokens = count_tokens
+        self.max_workers = max_workers
+        self.cache = cache or get_summary_cache()
+
+    def _summarize(self, chunk: Chunk) -> str:
+        request = f"File: {chunk.file}\nChunk: {chunk.label}\n\n```\n{chunk.text[:MAX_SUMMARY_INPUT_CHARS]}\n```"
+        resp = self.summarizer.invoke([SystemMessage(content=get_prompt("summarize_code_chunk")), HumanMessage(content=request)])
+        content = resp.content if isinstance(resp.content, str) else str(resp.content)
+        return " ".join(content.split())
+
+    def summarize(self, attachment: dict) -> list[tuple[Chunk, str]]:
+        """Chunks one file and returns (chunk, summary) pairs; only uncached chunks hit the model."""
+        file_hash = _file_hash(attachment["content"])
+        chunks = split_code(attachment["name"], attachment["content"])
+        keys = [f"{file_hash}:{c.start_line}-{c.end_line}" for c in chunks]
+        summaries = {key: self.cache.get(key) for key in keys}
+        missing = [(key, chunk) for key, chunk in zip(keys, chunks) if summaries[key] is None]
+        if missing and self.summarizer is not None:
+            with record_span("code_ingestion.summarize", kind="llm_call", file=attachment["name"], chunks=len(missing)):
+                with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="code-summary") as executor:
+                    futures = {
+                        key: executor.submit(contextvars.copy_context().run, self._summarize, chunk)
+                        for key, chunk in missing
+                    }
+                    fresh = {}
+                    for key, future in futures.items():
+                        try:
+                            fresh[key] = future.result()
+                        except Exception as e:
+                            print(f"CODE-INGESTION: could not summarize {key} of {attachment['name']}: {e}")
+            self.cache.put_many(fresh)
+            summaries.update(fresh)
+        return [(chunk, summaries[key] or "") for key, chunk in zip(keys, chunks)]
+
+    def digest(self, attachments: list[dict], query: str, budget_tokens: int) -> str:
+        """Prompt text for ``attachments``: small files inline, large ones as summaries plus relevant snippets."""
+        inline, large = [], []
+        for attachment in attachments:
+            (inline if self.count_tokens(attachment["content"]) <= INLINE_FILE_TOKENS else large).append(attachment)
+
+        parts = [f"\n\nHere is the content of the uploaded file {a['name']}:\n```\n{a['content']}\n```" for a in inline]
+        if not large:
+            return "".join(parts)
+
+        ctx = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=len(large), thread_name_prefix="code-ingest") as executor:
+            futures = [executor.submit(ctx.copy().run, self.summarize, a) for a in large]
+            per_file = [f.result() for f in futures]
+
+        ranked = []
+        query_terms = Counter(tokenize(query))
+        for attachment, summarized in zip(large, per_file):
+            lines = [f"\n\nUploaded file {attachment['name']} ({attachment['content'].count(chr(10)) + 1} lines), summarized by section:"]
+            for chunk, summary in summarized:
+                lines.append(f"- {chunk.label}: {summary or '(no summary)'}")
+                terms = Counter(tokenize(f"{chunk.name} {summary} {chunk.text}"))
+                score = sum(min(count, terms[term]) for term, count in query_terms.items())
+                ranked.append((score, chunk))
+            parts.append("\n".join(lines))
+
+        used = sum(self.count_tokens(p) for p in parts)
+        snippets = []
+        for score, chunk in sorted(ranked, key=lambda item: item[0], reverse=True):
+            if score == 0:
+                break
+            snippet = f"\n\n{chunk.file}, {chunk.label}:\n```\n{chunk.text}\n```"
+            cost = self.count_tokens(snippet)
+            if used + cost > budget_tokens:
+                continue
+            snippets.append(snippet)
+            used += cost
+        if snippets:
+            parts.append("\n\nMost relevant sections in full:" + "".join(snippets))
+        return "".join(parts)
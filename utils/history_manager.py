@@ -0,0 +1,176 @@
+"""Token-budgeted conversation history for the chat pages.
+
+Chat messages are stored in session state as dicts with ``role``, ``content`` and an
+optional ``attachments`` list (``{"name": ..., "content": ...}``). ``HistoryManager``
+turns them into LangChain messages that always fit a prompt token budget:
+
+* uploaded files are inlined only in the turn where they were uploaded and are
+  replaced by a one-line reference afterwards; with a ``CodeIngestor`` large files
+  are replaced by a digest of chunk summaries and the most relevant snippets,
+* turns that no longer fit are folded into a rolling summary that is kept in a
+  small state dict next to the messages, so every older turn is summarized once.
+"""
+from functools import lru_cache
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from utils.llm_calls import estimate_tokens
+from utils.prompt_manager import get_prompt
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken ships with langchain_openai, but keep the estimate as a fallback
+    tiktoken = None
+
+DEFAULT_PROMPT_TOKEN_BUDGET = 8000
+TRUNCATION_MARKER = "\n... [truncated to fit the prompt budget]"
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Counts tokens with tiktoken when available, otherwise estimates them."""
+    enc = _encoding()
+    if enc is None:
+        return estimate_tokens(text)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    keep = max(max_tokens - count_tokens(TRUNCATION_MARKER), 0)
+    enc = _encoding()
+    if enc is None:
+        return text[: keep * 4] + TRUNCATION_MARKER
+    return enc.decode(enc.encode(text, disallowed_special=())[:keep]) + TRUNCATION_MARKER
+
+
+def format_attachment(attachment: dict) -> str:
+    return f"\n\nHere is the content of the uploaded file {attachment['name']}:\n```\n{attachment['content']}\n```"
+
+
+def attachment_reference(attachment: dict) -> str:
+    lines = attachment["content"].count("\n") + 1
+    return f"\n\n[Uploaded file {attachment['name']} ({lines} lines) was shared earlier in the conversation.]"
+
+
+def read_attachments(uploaded_files) -> list[dict]:
+    """Reads Streamlit uploaded files into attachment dicts."""
+    return [
+        {"name": f.name, "content": f.read().decode("utf-8", errors="replace")}
+        for f in uploaded_files
+    ]
+
+
+def message_text(message) -> str:
+    """Plain text of a LangChain message whose content may be a list of content blocks."""
+    if isinstance(message.content, list):
+        return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in message.content)
+    return str(message.content)
+
+
+def to_history_dicts(messages) -> list[dict]:
+    """Converts LangChain messages (e.g. from graph state) into the dict form used here.
+
+    Attachments travel in ``additional_kwargs["attachments"]`` of a HumanMessage.
+    """
+    result = []
+    for m in messages:
+        if isinstance(m, dict):
+            result.append(m)
+        elif isinstance(m, HumanMessage):
+            result.append({"role": "user", "content": message_text(m), "attachments": m.additional_kwargs.get("attachments", [])})
+        elif isinstance(m, AIMessage):
+            result.append({"role": "assistant", "content": message_text(m)})
+    return result
+
+
+def new_history_state() -> dict:
+    return {"summary": "", "summarized_upto": 0}
+
+
+class HistoryManager:
+    def __init__(self, budget_tokens: int = DEFAULT_PROMPT_TOKEN_BUDGET, summarizer=None, summary_share: float = 0.2, code_ingestor=None, attachment_share: float = 0.5):
+        """``summarizer`` is a chat model used for the rolling summary; without one older turns are clipped.
+
+        ``code_ingestor`` (a ``utils.code_ingestion.CodeIngestor``) digests uploaded files
+        into at most ``attachment_share`` of the budget instead of inlining them whole.
+        """
+        self.budget_tokens = budget_tokens
+        self.summarizer = summarizer
+        self.summary_tokens = int(budget_tokens * summary_share)
+        self.code_ingestor = code_ingestor
+        self.attachment_tokens = int(budget_tokens * attachment_share)
+
+    def _message_text(self, message: dict, inline_attachments: bool) -> str:
+        text = message["content"]
+        if inline_attachments and self.code_ingestor is not None and message.get("attachments"):
+            return text + self.code_ingestor.digest(message["attachments"], text, self.attachment_tokens)
+        for attachment in message.get("attachments", []):
+            text += format_attachment(attachment) if inline_attachments else attachment_reference(attachment)
+        return text
+
+    def _to_langchain(self, role: str, text: str):
+        return HumanMessage(content=text) if role == "user" else AIMessage(content=text)
+
+    def _summarize(self, summary: str, messages: list[dict]) -> str:
+        transcript = "\n\n".join(f"{m['role'].upper()}: {self._message_text(m, False)}" for m in messages)
+        if self.summarizer is None:
+            merged = f"{summary}\n\n{transcript}".strip()
+            return truncate_to_tokens(merged, self.summary_tokens)
+        request = f"Existing summary:\n{summary or '(none)'}\n\nNew turns to fold in:\n{transcript}"
+        resp = self.summarizer.invoke([SystemMessage(content=get_prompt("summarize_history")), HumanMessage(content=request)])
+        content = resp.content if isinstance(resp.content, str) else str(resp.content)
+        return truncate_to_tokens(content, self.summary_tokens)
+
+    def build(self, messages: list[dict], state: dict, system_prompt: str = "") -> list:
+        """Returns LangChain messages for ``messages`` that fit the budget, updating ``state`` in place.
+
+        ``system_prompt`` is only counted against the budget; callers still prepend it
+        themselves (e.g. with ``create_llm_msg``).
+        """
+        chat = [m for m in messages if m["role"] in ("user", "assistant")]
+        last_user = max((i for i, m in enumerate(chat) if m["role"] == "user"), default=-1)
+        texts = [self._message_text(m, i == last_user) for i, m in enumerate(chat)]
+        tokens = [count_tokens(t) for t in texts]
+        budget = self.budget_tokens - count_tokens(system_prompt)
+
+        summarized_upto = min(state.get("summarized_upto", 0), max(len(chat) - 1, 0))
+        start = summarized_upto
+        summary = state.get("summary", "")
+        summary_cost = count_tokens(summary) if summary else 0
+        if sum(tokens[start:]) + summary_cost > budget:
+            # Fold whole turns into the summary until we are comfortably under budget, so
+            # the summary is refreshed every few turns instead of on every call.
+            target = budget - self.summary_tokens
+            while start < len(chat) - 1 and sum(tokens[start:]) > target * 0.75:
+                start += 1
+            if start > summarized_upto:
+                summary = self._summarize(summary, chat[summarized_upto:start])
+                state["summary"] = summary
+                state["summarized_upto"] = start
+                summary_cost = count_tokens(summary) if summary else 0
+
+        # Whatever remains over budget (a single huge turn) gets truncated, newest text wins.
+        remaining = budget - summary_cost - sum(tokens[start:-1] if len(chat) > 1 else [])
+        if chat and tokens[-1] > remaining:
+            texts[-1] = truncate_to_tokens(texts[-1], max(remaining, 0))
+
+        history = []
+        if summary:
+            history.append(SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"))
+        for m, text in zip(chat[start:], texts[start:]):
+            history.append(self._to_langchain(m["role"], text))
+        return history
@@ -0,0 +1,284 @@
+"""Local background job queue for long work (slide JSON generation, graph runs, rendering).
+
+Jobs run on worker threads owned by the process, not by a Streamlit script run, so a
+widget interaction that reruns the page neither abandons nor repeats them. The page
+keeps only the job id in session state and polls ``get``.
+
+A job function is called as ``fn(job, *args, **kwargs)``. It can report progress with
+``job.update(...)``, should call ``job.raise_if_cancelled()`` between steps, and returns
+a JSON-serializable result. Jobs submitted with a ``key`` are deduplicated: while a job
+with that key is queued or running (or has succeeded, unless ``reuse_succeeded=False``)
+the existing job is returned. Jobs run in a copy of the submitter's context, so the
+LLM user, tracing and telemetry context of the page carry over.
+Job status and results are persisted to SQLite so they survive process restarts.
+Finished jobs stay in memory for ``finished_ttl`` seconds (at most ``max_finished_jobs``
+of them); after that ``get`` reads them back from SQLite. Each row records the process
+that owns it, and on startup only active rows whose owner process is gone are marked
+interrupted, so processes sharing the database do not clobber each other's jobs.
+"""
+import contextvars
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+DEFAULT_JOB_DB_PATH = os.path.join("data", "jobs.sqlite")
+DEFAULT_FINISHED_TTL = 3600.0
+DEFAULT_MAX_FINISHED_JOBS = 200
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+INTERRUPTED = "interrupted"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED, INTERRUPTED)
+_COLUMNS = "id, kind, key, status, progress, message, result, error, created_at, started_at, finished_at, owner"
+
+
+def _process_owner(pid: int | None = None) -> str:
+    return f"{socket.gethostname()}:{pid or os.getpid()}"
+
+
+def _owner_gone(owner: str | None) -> bool:
+    """True when ``owner`` is a process on this host that is no longer running (or is a reused pid)."""
+    if not owner:
+        # Rows written before owners were recorded.
+        return True
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    if int(pid) == os.getpid():
+        # This process has only just started, so the row is from an earlier one with the same pid.
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function when the job has been cancelled."""
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    key: str | None = None
+    status: str = QUEUED
+    progress: float = 0.0
+    message: str = ""
+    partial: str = ""
+    result: object = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def raise_if_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def update(self, progress: float | None = None, message: str | None = None, partial: str | None = None):
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+        if message is not None:
+            self.message = message
+        if partial is not None:
+            self.partial = partial
+
+
+class JobQueue:
+    def __init__(self, max_workers: int = 4, db_path: str | None = DEFAULT_JOB_DB_PATH,
+                 finished_ttl: float = DEFAULT_FINISHED_TTL, max_finished_jobs: int = DEFAULT_MAX_FINISHED_JOBS):
+        self.finished_ttl = finished_ttl
+        self.max_finished_jobs = max_finished_jobs
+        self.owner = _process_owner()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._db = None
+        if db_path:
+            if os.path.dirname(db_path):
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT, key TEXT, status TEXT, "
+                "progress REAL, message TEXT, result TEXT, error TEXT, created_at REAL, started_at REAL, finished_at REAL)"
+            )
+            if "owner" not in {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}:
+                self._db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs(key)")
+            # Active rows whose process is gone will never finish; other live processes keep theirs.
+            active = self._db.execute(
+                f"SELECT DISTINCT owner FROM jobs WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))})", ACTIVE_STATUSES
+            ).fetchall()
+            for (owner,) in active:
+                if _owner_gone(owner):
+                    self._db.execute(
+                        f"UPDATE jobs SET status = ? WHERE owner IS ? AND status IN ({','.join('?' * len(ACTIVE_STATUSES))})",
+                        (INTERRUPTED, owner, *ACTIVE_STATUSES),
+                    )
+            self._db.commit()
+
+    def _persist(self, job: Job):
+        if not self._db:
+            return
+        try:
+            result = json.dumps(job.result, default=str)
+        except (TypeError, ValueError):
+            result = json.dumps(str(job.result))
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO jobs ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.kind, job.key, job.status, job.progress, job.message, result, job.error, job.created_at, job.started_at, job.finished_at, self.owner),
+            )
+            self._db.commit()
+
+    def _load(self, where: str, params) -> Job | None:
+        if not self._db:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE {where} ORDER BY created_at DESC LIMIT 1",
+                params,
+            ).fetchone()
+        if not row:
+            return None
+        return Job(
+            id=row[0], kind=row[1], key=row[2], status=row[3], progress=row[4] or 0.0, message=row[5] or "",
+            result=json.loads(row[6]) if row[6] else None, error=row[7],
+            created_at=row[8], started_at=row[9], finished_at=row[10],
+        )
+
+    def _evict_finished(self):
+        """Drops finished jobs past ``finished_ttl`` or beyond ``max_finished_jobs``; ``get`` reloads them from SQLite."""
+        cutoff = time.time() - self.finished_ttl
+        with self._lock:
+            finished = sorted((job for job in self._jobs.values() if job.done), key=lambda job: job.finished_at or 0.0)
+            excess = len(finished) - self.max_finished_jobs
+            for i, job in enumerate(finished):
+                if i < excess or (job.finished_at or 0.0) < cutoff:
+                    del self._jobs[job.id]
+
+    def _find_by_key(self, key: str, reuse_succeeded: bool) -> Job | None:
+        with self._lock:
+            for job in self._jobs.values():
+                if job.key == key and (job.status in ACTIVE_STATUSES or (reuse_succeeded and job.status == SUCCEEDED)):
+                    return job
+        if not reuse_succeeded:
+            return None
+        return self._load("key = ? AND status = ?", (key, SUCCEEDED))
+
+    def submit(self, kind: str, fn, *args, key: str | None = None, reuse_succeeded: bool = True, **kwargs) -> Job:
+        with self._submit_lock:
+            if key:
+                if existing := self._find_by_key(key, reuse_succeeded):
+                    return existing
+            job = Job(id=uuid.uuid4().hex, kind=kind, key=key)
+            with self._lock:
+                self._jobs[job.id] = job
+            self._persist(job)
+            ctx = contextvars.copy_context()
+            self._futures[job.id] = self._executor.submit(ctx.run, self._run, job, fn, args, kwargs)
+            return job
+
+    def _run(self, job: Job, fn, args, kwargs):
+        if job.cancelled:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            self._persist(job)
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        self._persist(job)
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = CANCELLED if job.cancelled else SUCCEEDED
+            job.progress = 1.0 if job.status == SUCCEEDED else job.progress
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            print(f"JOB {job.kind} {job.id} failed: {e}\n{traceback.format_exc()}")
+            job.status = FAILED
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            job.finished_at = time.time()
+            self._persist(job)
+            self._futures.pop(job.id, None)
+            self._evict_finished()
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job or self._load("id = ?", (job_id,))
+
+    def cancel(self, job_id: str) -> bool:
+        """Requests cancellation. Queued jobs never start; running jobs stop at their next check."""
+        job = self.get(job_id)
+        if not job or job.done:
+            return False
+        job._cancel.set()
+        future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            self._persist(job)
+            self._futures.pop(job_id, None)
+            self._evict_finished()
+        return True
+
+    def forget(self, key: str):
+        """Drops the dedup entry for ``key`` so the same work can be submitted again (e.g. 'regenerate')."""
+        with self._lock:
+            for job in list(self._jobs.values()):
+                if job.key == key and job.done:
+                    job.key = None
+            if self._db:
+                self._db.execute("UPDATE jobs SET key = NULL WHERE key = ? AND status != ?", (key, RUNNING))
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue(max_workers: int = 4, db_path: str | None = DEFAULT_JOB_DB_PATH) -> JobQueue:
+    """Process-wide job queue, created on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(max_workers=max_workers, db_path=db_path)
+        return _queue
@@ -1,6 +1,102 @@
+import copy
+import hashlib
+import json
+
 from langchain_core.messages import BaseMessage, SystemMessage
 from langchain_openai import ChatOpenAI
 
+from utils.llm_scheduler import INTERACTIVE, get_scheduler
+from utils.single_flight import SingleFlight
+from utils.telemetry import current_span, get_telemetry_callback, record_span
+
+# Completion budget reserved with the scheduler when the call sets no max_tokens.
+EXPECTED_COMPLETION_TOKENS = 1000
+
+# Identical concurrent requests (same model settings, endpoint, messages and schema/tools) share one call.
+_llm_single_flight = SingleFlight()
+
+
+def get_llm_single_flight() -> SingleFlight:
+    return _llm_single_flight
+
+
+def request_key(model_params, messages, stop, kwargs) -> str:
+    """Hash of everything that determines the response: model settings, full history, stop words and bound schema/tools."""
+    payload = {
+        "model": model_params,
+        "messages": [(m.type, m.content, m.additional_kwargs) for m in messages],
+        "stop": stop,
+        "kwargs": kwargs,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class ScheduledChatOpenAI(ChatOpenAI):
+    """ChatOpenAI whose requests wait for a slot from the process-wide LLM scheduler.
+
+    Scheduling happens below ``invoke``/``stream``, so structured output, tool binding
+    and LangGraph streaming all go through it unchanged.
+    """
+
+    priority: int = INTERACTIVE
+    coalesce: bool = True
+
+    def _acquire(self, messages):
+        tokens = estimate_tokens(messages) + (self.max_tokens or EXPECTED_COMPLETION_TOKENS)
+        ticket = get_scheduler().acquire(self.priority, tokens=tokens)
+        if span := current_span():
+            span.queue_ms += (ticket.admitted_at - ticket.enqueued_at) * 1000
+        return ticket
+
+    def _request_params(self) -> dict:
+        """Model settings plus endpoint and credentials; two clients differing in any of them must not share a call."""
+        api_key = getattr(self, "openai_api_key", None)
+        return {
+            **self._identifying_params,
+            "base_url": getattr(self, "openai_api_base", None),
+            "organization": getattr(self, "openai_organization", None),
+            # Only a digest of the key goes into the request key.
+            "api_key": hashlib.sha256(api_key.get_secret_value().encode("utf-8")).hexdigest() if api_key else None,
+        }
+
+    def _scheduled_generate(self, messages, stop, run_manager, kwargs):
+        ticket = self._acquire(messages)
+        actual_tokens = None
+        try:
+            result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            actual_tokens = ((result.llm_output or {}).get("token_usage") or {}).get("total_tokens")
+            return result
+        finally:
+            get_scheduler().release(ticket, actual_tokens)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if not self.coalesce:
+            return self._scheduled_generate(messages, stop, run_manager, kwargs)
+        key = request_key(self._request_params(), messages, stop, kwargs)
+        result, shared = _llm_single_flight.do(key, lambda: self._scheduled_generate(messages, stop, run_manager, kwargs))
+        if shared:
+            if span := current_span():
+                span.attributes["coalesced"] = True
+            # Followers get their own copy so callers can't mutate each other's result. Usage is
+            # cleared on the copy so telemetry does not bill the shared call's tokens twice.
+            result = copy.deepcopy(result)
+            result.llm_output = {**(result.llm_output or {}), "token_usage": {}}
+            for generation in result.generations:
+                generation.message.usage_metadata = None
+        return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        ticket = self._acquire(messages)
+        actual_tokens = None
+        try:
+            for chunk in super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                usage = getattr(chunk.message, "usage_metadata", None)
+                if usage:
+                    actual_tokens = usage.get("total_tokens")
+                yield chunk
+        finally:
+            get_scheduler().release(ticket, actual_tokens)
+
 
 def create_llm_msg(system_prompt: str, messageHistory: list[BaseMessage]):
     resp = []
@@ -8,8 +104,13 @@ def create_llm_msg(system_prompt: str, messageHistory: list[BaseMessage]):
     resp.extend(messageHistory)
     return resp
 
+def get_chat_model(model, api_key, base_url=None, priority=INTERACTIVE, **kwargs):
+    """Scheduled ChatOpenAI with the telemetry callback attached; use this instead of constructing ChatOpenAI directly."""
+    return ScheduledChatOpenAI(model=model, api_key=api_key, base_url=base_url, priority=priority, callbacks=[get_telemetry_callback()], **kwargs)
+
 def run_model(model,llm_messages):
-    response = model.invoke(llm_messages)
+    with record_span("run_model", kind="llm_call"):
+        response = model.invoke(llm_messages)
 
     # Extract text from response.content if it's a list of dicts
     if isinstance(response.content, list):
@@ -19,4 +120,14 @@ def run_model(model,llm_messages):
         )
     else:
         returned_string = str(response.content)
-    return returned_string, response
\ No newline at end of file
+    return returned_string, response
+
+def estimate_tokens(content) -> int:
+    """Rough token estimate (~4 characters per token) for a string or a list of messages."""
+    if isinstance(content, str):
+        return len(content) // 4 + 1
+    total = 0
+    for m in content:
+        text = getattr(m, "content", m)
+        total += estimate_tokens(text if isinstance(text, str) else str(text))
+    return total
@@ -0,0 +1,134 @@
+"""Process-wide admission control for LLM calls.
+
+Every model call made through ``get_chat_model`` asks the scheduler for a slot before
+it is sent. The scheduler admits waiting calls
+
+* by priority class first (interactive chat turns before batch jobs),
+* round-robin across users within a class, so one user's burst cannot starve others,
+* only while the token-per-minute, request-per-minute and concurrency budgets allow.
+
+Queue depth, in-flight calls and wait times are exposed through ``stats()``.
+"""
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+from utils.rate_limiter import RateLimiter
+
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+_current_user = contextvars.ContextVar("llm_user", default="anonymous")
+
+
+def set_llm_user(user: str):
+    """Attributes LLM calls made from the current context (e.g. a Streamlit script run) to ``user``."""
+    _current_user.set(user or "anonymous")
+
+
+def get_llm_user() -> str:
+    return _current_user.get()
+
+
+@dataclass
+class Ticket:
+    priority: int
+    user: str
+    tokens: int
+    enqueued_at: float = field(default_factory=time.monotonic)
+    admitted_at: float | None = None
+
+
+class LLMScheduler:
+    def __init__(self, tokens_per_minute: int | None = None, requests_per_minute: int | None = None, max_concurrency: int | None = None):
+        self.limiter = RateLimiter(tokens_per_minute, requests_per_minute)
+        self.max_concurrency = max_concurrency
+        self._cond = threading.Condition()
+        # priority -> user -> deque of waiting tickets; user order is the round-robin order.
+        self._queues = {INTERACTIVE: OrderedDict(), BATCH: OrderedDict()}
+        self._in_flight = 0
+        self._admitted = {INTERACTIVE: 0, BATCH: 0}
+        self._waits = {INTERACTIVE: deque(maxlen=500), BATCH: deque(maxlen=500)}
+
+    def configure(self, tokens_per_minute=None, requests_per_minute=None, max_concurrency=None):
+        with self._cond:
+            self.limiter = RateLimiter(tokens_per_minute, requests_per_minute)
+            self.max_concurrency = max_concurrency
+            self._cond.notify_all()
+
+    def _next_ticket(self) -> Ticket | None:
+        for priority in sorted(self._queues):
+            users = self._queues[priority]
+            for user, waiting in users.items():
+                if waiting:
+                    return waiting[0]
+        return None
+
+    def _admit(self, ticket: Ticket):
+        users = self._queues[ticket.priority]
+        waiting = users[ticket.user]
+        waiting.popleft()
+        # Move this user to the back of the round-robin order.
+        users.move_to_end(ticket.user)
+        if not waiting:
+            del users[ticket.user]
+        ticket.admitted_at = time.monotonic()
+        self._in_flight += 1
+        self._admitted[ticket.priority] += 1
+        self._waits[ticket.priority].append(ticket.admitted_at - ticket.enqueued_at)
+
+    def acquire(self, priority: int = INTERACTIVE, user: str | None = None, tokens: int = 0) -> Ticket:
+        """Blocks until the call may be sent and returns its ticket; pass it to ``release`` afterwards."""
+        priority = priority if priority in self._queues else BATCH
+        ticket = Ticket(priority, user or get_llm_user(), tokens)
+        with self._cond:
+            self._queues[priority].setdefault(ticket.user, deque()).append(ticket)
+            while True:
+                wait = None
+                if self._next_ticket() is ticket:
+                    if self.max_concurrency and self._in_flight >= self.max_concurrency:
+                        wait = None
+                    else:
+                        wait = self.limiter.try_acquire(tokens)
+                        if wait == 0:
+                            self._admit(ticket)
+                            self._cond.notify_all()
+                            return ticket
+                self._cond.wait(timeout=wait)
+
+    def release(self, ticket: Ticket, actual_tokens: int | None = None):
+        with self._cond:
+            self._in_flight -= 1
+            if actual_tokens is not None and actual_tokens < ticket.tokens:
+                self.limiter.refund(ticket.tokens - actual_tokens)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            result = {"in_flight": self._in_flight, "max_concurrency": self.max_concurrency}
+            for priority, name in PRIORITY_NAMES.items():
+                users = self._queues[priority]
+                waits = sorted(self._waits[priority])
+                result[f"{name}_queued"] = sum(len(w) for w in users.values())
+                result[f"{name}_waiting_users"] = len(users)
+                result[f"{name}_admitted"] = self._admitted[priority]
+                result[f"{name}_wait_p95_ms"] = round(waits[int(0.95 * (len(waits) - 1))] * 1000, 1) if waits else 0.0
+            return result
+
+
+_scheduler = LLMScheduler()
+
+
+def get_scheduler() -> LLMScheduler:
+    return _scheduler
+
+
+def configure_scheduler(tokens_per_minute=None, requests_per_minute=None, max_concurrency=None):
+    """Sets the process-wide budgets; reconfigures only when the values change."""
+    current = (_scheduler.limiter.tokens_per_minute, _scheduler.limiter.requests_per_minute, _scheduler.max_concurrency)
+    wanted = (tokens_per_minute or None, requests_per_minute or None, max_concurrency or None)
+    if current != wanted:
+        _scheduler.configure(*wanted)
@@ -0,0 +1,201 @@
+"""Deterministic parser for slide outlines written in markdown or plain text.
+
+Brainstorm output is usually already slide-by-slide. When it is, ``parse_outline``
+turns it into the ``SlideDeck`` structure directly, so no LLM call is needed. It
+understands:
+
+* ``Title:`` / ``Subtitle:`` lines, or a single top-level ``#`` heading as the title
+* slides introduced by ``Slide 3: Topic`` (optionally bold or as a heading) or by headings
+* ``-``, ``*``, ``+`` and numbered bullets; nested bullets are folded into their parent
+* fenced code blocks with an optional language
+* markdown images, which become image blocks
+
+Anything that does not look like a complete outline returns ``None``, and the caller
+falls back to the LLM.
+"""
+import re
+
+_TITLE = re.compile(r"^\s*(?:#{1,6}\s*)?\**title\**\s*:\s*(.+?)\s*$", re.IGNORECASE)
+_SUBTITLE = re.compile(r"^\s*(?:#{1,6}\s*)?\**subtitle\**\s*:\s*(.+?)\s*$", re.IGNORECASE)
+_SLIDE = re.compile(r"^\s*(?:#{1,6}\s*)?\**\s*slide\s*(\d+)\s*(?:[:.)\-–—]\s*(.*?))?\s*\**\s*$", re.IGNORECASE)
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_BULLET = re.compile(r"^(\s*)(?:[-*+•]|\d+[.)])\s+(.+?)\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)\s*([\w+#.-]*)")
+_IMAGE = re.compile(r"^\s*!\[([^\]]*)\]\(([^)\s]+)[^)]*\)\s*$")
+_RULE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+
+# Share of non-empty lines that must end up on a slide (the rest is preamble or chatter).
+MIN_COVERAGE = 0.8
+MIN_SLIDES = 2
+
+
+def _strip_emphasis(text: str) -> str:
+    text = text.strip()
+    while len(text) > 4 and text[:2] in ("**", "__") and text[-2:] == text[:2]:
+        text = text[2:-2].strip()
+    return text
+
+
+def _slide_level(lines: list[str]) -> tuple[int | None, int | None]:
+    """(title heading level, slide heading level) for outlines structured by headings."""
+    levels = []
+    in_code = False
+    for line in lines:
+        if _FENCE.match(line):
+            in_code = not in_code
+        elif not in_code and (match := _HEADING.match(line)):
+            levels.append(len(match.group(1)))
+    if not levels:
+        return None, None
+    top = min(levels)
+    deeper = [level for level in levels if level > top]
+    # A single top heading above several deeper ones is the deck title.
+    if levels.count(top) == 1 and levels[0] == top and deeper:
+        return top, min(deeper)
+    return None, top
+
+
+class _Slide:
+    def __init__(self, title: str):
+        self.title = title
+        self.blocks = []
+        self._paragraph = []
+        self._bullet_indent = None
+
+    def add_bullet(self, indent: int, text: str):
+        self.flush_paragraph()
+        last = self.blocks[-1] if self.blocks else None
+        if self._bullet_indent is not None and indent > self._bullet_indent and last and last["type"] == "text":
+            depth = 1 if indent - self._bullet_indent <= 4 else 2
+            last["body"] += "\n" + "    " * depth + "- " + text
+            return
+        self._bullet_indent = indent
+        self.blocks.append({"type": "text", "body": text})
+
+    def add_text(self, text: str):
+        self._bullet_indent = None
+        self._paragraph.append(text.strip())
+
+    def add_block(self, block: dict):
+        self.flush_paragraph()
+        self._bullet_indent = None
+        self.blocks.append(block)
+
+    def flush_paragraph(self):
+        if self._paragraph:
+            self.blocks.append({"type": "text", "body": " ".join(self._paragraph)})
+            self._paragraph = []
+
+
+def parse_outline(text: str, default_title: str | None = None) -> dict | None:
+    """Parses an outline into a SlideDeck-shaped dict, or returns None if it is not one."""
+    if not text or not text.strip():
+        return None
+    lines = text.strip().splitlines()
+    has_slide_markers = any(_SLIDE.match(line) and not _BULLET.match(line) for line in lines)
+    title_level, slide_level = (None, None) if has_slide_markers else _slide_level(lines)
+    if not has_slide_markers and slide_level is None:
+        return None
+
+    title, subtitle = None, ""
+    slides = []
+    current = None
+    consumed = 0
+    total = 0
+    code_fence, code_language, code_lines = None, "", []
+
+    for line in lines:
+        if code_fence:
+            if line.strip().startswith(code_fence):
+                current.add_block({"type": "code", "language": code_language or "text", "body": "\n".join(code_lines)})
+                code_fence = None
+                consumed += 1
+            else:
+                code_lines.append(line)
+            consumed += 1
+            total += 1
+            continue
+        if not line.strip():
+            if current:
+                current.flush_paragraph()
+            continue
+        total += 1
+        if _RULE.match(line):
+            consumed += 1
+            continue
+        if not slides and (match := _SUBTITLE.match(line)):
+            subtitle = _strip_emphasis(match.group(1))
+            consumed += 1
+            continue
+        if not slides and title is None and (match := _TITLE.match(line)):
+            title = _strip_emphasis(match.group(1))
+            consumed += 1
+            continue
+        heading = _HEADING.match(line)
+        if has_slide_markers:
+            slide_match = _SLIDE.match(line) if not _BULLET.match(line) else None
+            if slide_match:
+                current = _Slide(_strip_emphasis(slide_match.group(2) or "").strip("* ") or f"Slide {slide_match.group(1)}")
+                slides.append(current)
+                consumed += 1
+                continue
+            if heading and not slides and title is None:
+                title = _strip_emphasis(heading.group(2))
+                consumed += 1
+                continue
+        elif heading:
+            level = len(heading.group(1))
+            heading_text = _strip_emphasis(heading.group(2))
+            if level == title_level and title is None:
+                title = heading_text
+                consumed += 1
+                continue
+            if level == slide_level:
+                current = _Slide(heading_text)
+                slides.append(current)
+                consumed += 1
+                continue
+            if current and level > slide_level:
+                # A sub-heading inside a slide is shown as a line of text.
+                current.add_block({"type": "text", "body": heading_text})
+                consumed += 1
+                continue
+        if current is None:
+            continue
+        if match := _FENCE.match(line):
+            code_fence, code_language, code_lines = match.group(1), match.group(2), []
+            consumed += 1
+            continue
+        if match := _IMAGE.match(line):
+            caption = match.group(1).strip()
+            current.add_block({"type": "image", "query": caption or match.group(2), "caption": caption})
+            consumed += 1
+            continue
+        if match := _BULLET.match(line):
+            current.add_bullet(len(match.group(1).expandtabs(4)), _strip_emphasis(match.group(2)))
+            consumed += 1
+            continue
+        current.add_text(line)
+        consumed += 1
+
+    if code_fence:
+        # An unterminated fence means the text was cut off; let the LLM handle it.
+        return None
+    for slide in slides:
+        slide.flush_paragraph()
+    if len(slides) < MIN_SLIDES or any(not slide.title or not slide.blocks for slide in slides):
+        return None
+    if total == 0 or consumed / total < MIN_COVERAGE:
+        return None
+    title = title or default_title
+    if not title:
+        return None
+    return {
+        "title": title,
+        "subtitle": subtitle,
+        "slides": [
+            {"id": f"slide{i}", "title": slide.title, "content_blocks": slide.blocks}
+            for i, slide in enumerate(slides, 1)
+        ],
+        "user_message": f"Created {len(slides)} slides from the outline.",
+    }
@@ -12,6 +12,12 @@ from pptx.util import Cm
 import requests
 from io import BytesIO
 
+from utils.slide_deck import normalize_deck
+from utils.telemetry import traced
+
+# Part of the artifact store key for rendered decks; bump it whenever rendering output changes.
+RENDERER_VERSION = 1
+
 
 def set_slide_background_picture(slide, prs, image_path: str):
     fill = slide.background.fill
@@ -97,7 +103,7 @@ def create_content_side(prs, slide_data,logo_path):
     title_shape = shapes.title
     body_shape = shapes.placeholders[1]
 
-    title_shape.text = slide_data.get('title', 'Slide')
+    title_shape.text = slide_data.title or 'Slide'
     # Set blue background for title
     title_shape.fill.solid()
     title_shape.fill.fore_color.rgb = RGBColor(0, 51, 153)  # dark blue
@@ -112,9 +118,9 @@ def create_content_side(prs, slide_data,logo_path):
     tf.auto_size = MSO_AUTO_SIZE.TEXT_TO_FIT_SHAPE
 
     first_para_used = False
-    for block in slide_data.get('content_blocks', []):
-        btype = str(block.get('type', '')).strip().lower()
-        text = block.get('body', '')
+    for block in slide_data.content_blocks:
+        btype = block.type
+        text = block.body
 
         if btype == 'text':
             for line in text.splitlines():
@@ -139,18 +145,21 @@ def create_content_side(prs, slide_data,logo_path):
 
         elif btype == 'image':
             # Placeholder: image handling not implemented yet
-            print(f"TODO: Image block not implemented yet. query: {block.get('query')} ")
+            print(f"TODO: Image block not implemented yet. query: {block.query} ")
 
     add_logo(slide, prs, logo_path)
     
     
+@traced("render.pptx", kind="render")
 def create_one_presentation(slide_json, theme, output_fname):
+    """Renders a deck (Deck, dict or stored JSON of any schema version) to output/<output_fname>."""
+    deck = normalize_deck(slide_json)
     prs = Presentation()
-    print(f"DEBUG DE:\n\n{slide_json=}\n\n")
+    print(f"DEBUG DE:\n\n{deck=}\n\n")
     logo_path = str(pathlib.Path(__file__).parents[1] / "assets" / "logos" / "logoPro.png")
     
-    create_title_slide(prs, slide_json['title'], slide_json.get('subtitle', ''),logo_path)
-    for slide_data in slide_json['slides']:
+    create_title_slide(prs, deck.title, deck.subtitle,logo_path)
+    for slide_data in deck.slides:
         create_content_side(prs, slide_data,logo_path)
     output_path = os.path.join("output", output_fname)
     prs.save(output_path)
@@ -16,6 +16,9 @@ import traceback
 from io import BytesIO
 import requests
 
+from utils.outline_parser import parse_outline
+from utils.slide_deck import DeckBlock, normalize_deck
+
 # Constants
 ASSETS_DIR = Path(__file__).parent.parent / 'assets'
 TEMPLATE_DIR = ASSETS_DIR / 'templates'
@@ -53,7 +56,7 @@ class PresentationError(Exception):
     pass
 
 
-def _fetch_image(block: dict) -> BytesIO | None:
+def _fetch_image(block: DeckBlock) -> BytesIO | None:
     """Retrieve an image for an image content block.
 
     The block may specify either a direct ``url`` or a ``query`` to search for a
@@ -70,8 +73,8 @@ def _fetch_image(block: dict) -> BytesIO | None:
     BytesIO | None
         Image data as a stream if retrieval succeeds, otherwise ``None``.
     """
-    url = block.get("url")
-    if not url and (query := block.get("query")):
+    url = block.url
+    if not url and (query := block.query):
         url = f"https://source.unsplash.com/1600x900/?{requests.utils.quote(query)}"
     if not url:
         return None
@@ -85,7 +88,9 @@ def _fetch_image(block: dict) -> BytesIO | None:
 def _parse_slide_deck_prompt(prompt: str) -> dict | None:
     """Parse a user prompt that already describes a slide deck.
 
-    The supported format is a simple text outline for a presentation:
+    Delegates to :func:`utils.outline_parser.parse_outline`, which also accepts
+    markdown headings, nested bullets and fenced code. The simplest supported
+    format is a text outline:
 
     ```
     Title: My Presentation
@@ -109,57 +114,13 @@ def _parse_slide_deck_prompt(prompt: str) -> dict | None:
         application, or ``None`` if the prompt does not match the expected
         outline format.
     """
-    lines = [line.rstrip() for line in prompt.strip().splitlines() if line.strip()]
-
-    title = None
-    subtitle = None
-    slides = []
-    current_title = None
-    bullets: list[str] = []
-
-    for line in lines:
-        if match := re.match(r"^Title:\s*(.+)", line, re.IGNORECASE):
-            title = match.group(1).strip()
-            continue
-        if match := re.match(r"^Subtitle:\s*(.+)", line, re.IGNORECASE):
-            subtitle = match.group(1).strip()
-            continue
-        if match := re.match(r"^Slide\s*\d+:\s*(.+)", line, re.IGNORECASE):
-            if current_title and bullets:
-                slides.append(
-                    {
-                        "id": f"slide{len(slides)+1}",
-                        "title": current_title,
-                        "content_blocks": [
-                            {"type": "text", "body": b} for b in bullets
-                        ],
-                    }
-                )
-            current_title = match.group(1).strip()
-            bullets = []
-            continue
-        if current_title and (
-            match := re.match(r"^(?:[-*]|\d+[.)])\s+(.*)", line)
-        ):
-            bullets.append(match.group(1).strip())
-
-    if current_title and bullets:
-        slides.append(
-            {
-                "id": f"slide{len(slides)+1}",
-                "title": current_title,
-                "content_blocks": [
-                    {"type": "text", "body": b} for b in bullets
-                ],
-            }
-        )
-
-    if title and slides:
-        content = {"title": title, "slides": slides}
-        if subtitle:
-            content["subtitle"] = subtitle
-        return content
-    return None
+    content = parse_outline(prompt)
+    if content is None:
+        return None
+    content.pop("user_message", None)
+    if not content.get("subtitle"):
+        content.pop("subtitle", None)
+    return content
 
 
 def _code_font_size(code: str) -> Pt:
@@ -193,8 +154,8 @@ def _add_code_paragraph(tf, code: str, language: str, theme: dict) -> None:
             r, g, b = (int(color[i:i+2], 16) for i in (0, 2, 4))
             run.font.color.rgb = RGBColor(r, g, b)
 
-def create_one_presentation(content: dict, theme_name: str, output_file: str):
-    """Create a PowerPoint presentation from the generated content."""
+def create_one_presentation(content, theme_name: str, output_file: str):
+    """Create a PowerPoint presentation from the generated content (a Deck or any stored deck shape)."""
     if theme_name not in THEMES:
         raise ValueError(f"Theme '{theme_name}' not found")
     
@@ -204,6 +165,7 @@ def create_one_presentation(content: dict, theme_name: str, output_file: str):
     if not template_file.exists():
         raise FileNotFoundError(f"Template file not found: {template_file}")
     
+    deck = normalize_deck(content)
     try:
         prs = Presentation(template_file)
         
@@ -235,13 +197,13 @@ def create_one_presentation(content: dict, theme_name: str, output_file: str):
         title_frame.word_wrap = True
         
         title_para = title_frame.add_paragraph()
-        title_para.text = content['title']
+        title_para.text = deck.title
         title_para.font.size = Pt(44)
         title_para.font.name = theme['font']
         title_para.alignment = 1  # Center align
         
         # Add subtitle
-        if 'subtitle' in content:
+        if deck.subtitle:
             top = int(prs.slide_height * 0.7)  # 70% from top
             height = int(prs.slide_height * 0.1)  # 10% of slide height
             
@@ -251,13 +213,13 @@ def create_one_presentation(content: dict, theme_name: str, output_file: str):
             subtitle_frame.word_wrap = True
             
             subtitle_para = subtitle_frame.add_paragraph()
-            subtitle_para.text = content['subtitle']
+            subtitle_para.text = deck.subtitle
             subtitle_para.font.size = Pt(32)
             subtitle_para.font.name = theme['font']
             subtitle_para.alignment = 1  # Center align
         
         # Create content slides
-        for slide_data in content['slides']:
+        for slide_data in deck.slides:
             slide = prs.slides.add_slide(content_layout)
             
             # Add title
@@ -271,10 +233,10 @@ def create_one_presentation(content: dict, theme_name: str, output_file: str):
                     body_shape = shape
             
             if title_shape:
-                title_shape.text = slide_data['title']
+                title_shape.text = slide_data.title
             
             if body_shape:
-                has_image = any(block.get('type') == 'image' for block in slide_data['content_blocks'])
+                has_image = any(block.type == 'image' for block in slide_data.content_blocks)
                 if has_image:
                     body_shape.width = int(prs.slide_width * 0.6)
 
@@ -283,17 +245,17 @@ def create_one_presentation(content: dict, theme_name: str, output_file: str):
 
                 image_top = int(prs.slide_height * 0.25)
 
-                for block in slide_data['content_blocks']:
-                    if block['type'] == 'text':
+                for block in slide_data.content_blocks:
+                    if block.type == 'text':
                         p = tf.add_paragraph()
-                        p.text = block['body']
+                        p.text = block.body
                         p.font.name = theme['font']
                         p.font.size = Pt(24)
-                    elif block['type'] == 'code':
+                    elif block.type == 'code':
                         _add_code_paragraph(
-                            tf, block['body'], block.get('language', 'python'), theme
+                            tf, block.body, block.language or 'python', theme
                         )
-                    elif block['type'] == 'image':
+                    elif block.type == 'image':
                         img_stream = _fetch_image(block)
                         if img_stream:
                             pic = slide.shapes.add_picture(
@@ -311,25 +273,26 @@ def create_one_presentation(content: dict, theme_name: str, output_file: str):
     except Exception as e:
         raise PresentationError(f"Error creating presentation: {str(e)}")
 
-def generate_teacher_guide(content: dict) -> str:
+def generate_teacher_guide(content) -> str:
     """Generate a teacher guide from the presentation content."""
-    guide = f"# Teacher Guide: {content['title']}\n\n"
+    deck = normalize_deck(content)
+    guide = f"# Teacher Guide: {deck.title}\n\n"
     
-    if 'subtitle' in content:
-        guide += f"## {content['subtitle']}\n\n"
+    if deck.subtitle:
+        guide += f"## {deck.subtitle}\n\n"
     
     guide += "## Slide-by-Slide Notes\n\n"
     
-    for i, slide in enumerate(content['slides'], 1):
-        guide += f"### Slide {i}: {slide['title']}\n\n"
+    for i, slide in enumerate(deck.slides, 1):
+        guide += f"### Slide {i}: {slide.title}\n\n"
         
-        for block in slide['content_blocks']:
-            if block['type'] == 'text':
-                guide += f"- {block['body']}\n"
-            elif block['type'] == 'code':
-                guide += f"\nCode example ({block.get('language', 'code')}):\n```{block.get('language', '')}\n{block['body']}\n```\n"
-            elif block['type'] == 'image':
-                desc = block.get('caption') or block.get('query') or block.get('url', '')
+        for block in slide.content_blocks:
+            if block.type == 'text':
+                guide += f"- {block.body}\n"
+            elif block.type == 'code':
+                guide += f"\nCode example ({block.language or 'code'}):\n```{block.language}\n{block.body}\n```\n"
+            elif block.type == 'image':
+                desc = block.caption or block.query or block.url
                 guide += f"Image: {desc}\n"
         
         guide += "\n"
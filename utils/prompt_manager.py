@@ -47,5 +47,26 @@ Include a user message describing the slides generated.""",
         "generate_for_code": """You are an AI assistant that generates presentation slides based on code snippets or programming-related topics provided by the user. 
         Analyze the user's message history to extract key concepts, code functionality, and relevant explanations. 
         Create a structured outline for the slides, formatted in markdown suitable for slide generation.""",
+
+        "update_slide_patch": """You are an AI assistant that edits an existing slide deck. The current deck is given as JSON below.
+        Do not rewrite the deck. Respond only with the operations needed to make the change the user asked for:
+        - op "add" with block_index: insert "block" at that index of slide "slide_id".
+        - op "add" without block_index: insert "slide" after slide "slide_id" (leave slide_id empty to append at the end).
+        - op "replace" with block_index: replace that block of slide "slide_id" with "block".
+        - op "replace" without block_index: replace the whole slide "slide_id" with "slide".
+        - op "delete" with block_index: remove that block; without block_index: remove the whole slide.
+        Block indexes start at 0 and refer to the deck after the previous operations.
+        Set title or subtitle only if the user asked to change them.
+        Include a short user message describing the change.""",
+
+        "summarize_history": """You maintain a running summary of a conversation between a teacher and an AI assistant that is creating presentation content.
+        Merge the existing summary with the new turns into one concise summary.
+        Keep decisions the user made (topic, audience, grade level, style, length, slide structure), open questions, and the latest version of any outline.
+        Refer to uploaded files by name instead of copying their content.
+        Respond with the summary only.""",
+
+        "summarize_code_chunk": """You summarize one section of a source file for a teacher who is building slides about the code.
+        In one or two sentences, say what the section defines or does, naming its main functions, classes and inputs/outputs.
+        Respond with the summary only.""",
     }
     return prompts.get(prompt_name, "")
\ No newline at end of file
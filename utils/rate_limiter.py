@@ -0,0 +1,64 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """Thread-safe token-per-minute and request-per-minute limiter.
+
+    Both budgets are token buckets that refill continuously. ``acquire`` blocks
+    the calling thread until there is room for the request.
+    """
+
+    def __init__(self, tokens_per_minute: int | None = None, requests_per_minute: int | None = None):
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_per_minute = requests_per_minute
+        self._tokens = float(tokens_per_minute or 0)
+        self._requests = float(requests_per_minute or 0)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last
+        self._last = now
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60.0)
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60.0)
+
+    def _wait_time(self, tokens: int) -> float:
+        """Seconds until ``tokens`` and one request fit in the buckets (0 if they fit now)."""
+        wait = 0.0
+        if self.tokens_per_minute:
+            # A single request larger than the whole budget is let through once the bucket is full.
+            needed = min(tokens, self.tokens_per_minute)
+            if self._tokens < needed:
+                wait = max(wait, (needed - self._tokens) * 60.0 / self.tokens_per_minute)
+        if self.requests_per_minute and self._requests < 1:
+            wait = max(wait, (1 - self._requests) * 60.0 / self.requests_per_minute)
+        return wait
+
+    def try_acquire(self, tokens: int = 0) -> float:
+        """Take budget for a request if available. Returns 0 on success, else the seconds to wait."""
+        with self._lock:
+            self._refill()
+            wait = self._wait_time(tokens)
+            if wait > 0:
+                return wait
+            if self.tokens_per_minute:
+                self._tokens -= min(tokens, self.tokens_per_minute)
+            if self.requests_per_minute:
+                self._requests -= 1
+            return 0.0
+
+    def acquire(self, tokens: int = 0):
+        """Block until the request fits in the budget."""
+        while (wait := self.try_acquire(tokens)) > 0:
+            time.sleep(wait)
+
+    def refund(self, tokens: int):
+        """Return unused token budget, e.g. when the estimate was higher than actual usage."""
+        if not self.tokens_per_minute or tokens <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self.tokens_per_minute, self._tokens + tokens)
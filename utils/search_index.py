@@ -0,0 +1,178 @@
+"""Local full-text search over brainstorms and their slides.
+
+Titles, contents and slide text (slide titles, text and code bodies, image captions)
+are indexed in a SQLite FTS5 table with the Porter stemmer. Results are ranked by
+BM25 with matches in the title weighted highest. Saves update the index one row at a
+time through ``upsert_row``. ``sync`` catches up with rows written elsewhere and
+re-indexes only rows whose fingerprint changed.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+
+from utils.slide_deck import decode_deck
+
+DEFAULT_SEARCH_INDEX_PATH = os.path.join("data", "search_index.sqlite")
+# BM25 weights for the title, content and slides columns.
+COLUMN_WEIGHTS = (10.0, 1.0, 2.0)
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class SearchHit:
+    doc_id: object
+    title: str
+    snippet: str
+    score: float
+
+
+def slide_text(slide_json) -> str:
+    """Searchable text of a stored deck; empty for missing or unreadable decks."""
+    if not slide_json or slide_json in ("{}", "null"):
+        return ""
+    try:
+        deck = decode_deck(slide_json)
+    except Exception:
+        return ""
+    parts = [deck.title, deck.subtitle]
+    for slide in deck.slides:
+        parts.append(slide.title)
+        for block in slide.content_blocks:
+            parts.append(block.body if block.type != "image" else f"{block.caption} {block.query}")
+    return "\n".join(p for p in parts if p)
+
+
+def to_fts_query(text: str) -> str:
+    """Turns free text into an FTS5 query: every term must match, the last one as a prefix."""
+    terms = _TERM.findall(text)
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _fingerprint(title: str, content: str, slide_json) -> str:
+    return hashlib.sha1(f"{title}\0{content}\0{slide_json or ''}".encode("utf-8", errors="replace")).hexdigest()
+
+
+class SearchIndex:
+    def __init__(self, path: str = DEFAULT_SEARCH_INDEX_PATH):
+        self.path = path
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(title, content, slides, tokenize='porter unicode61');
+            CREATE TABLE IF NOT EXISTS doc_meta (doc_id PRIMARY KEY, fingerprint TEXT NOT NULL);
+            """
+        )
+        self._fingerprints = dict(self._db.execute("SELECT doc_id, fingerprint FROM doc_meta"))
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def _rowid(self, doc_id):
+        row = self._db.execute("SELECT rowid FROM doc_meta WHERE doc_id = ?", (doc_id,)).fetchone()
+        return row[0] if row else None
+
+    def _upsert(self, doc_id, title: str, content: str, slide_json) -> bool:
+        fingerprint = _fingerprint(title, content, slide_json)
+        if self._fingerprints.get(doc_id) == fingerprint:
+            return False
+        # doc_meta's rowid doubles as the docs rowid, so any id type works as doc_id.
+        self._db.execute(
+            "INSERT INTO doc_meta (doc_id, fingerprint) VALUES (?, ?) ON CONFLICT (doc_id) DO UPDATE SET fingerprint = excluded.fingerprint",
+            (doc_id, fingerprint),
+        )
+        rowid = self._rowid(doc_id)
+        self._db.execute("DELETE FROM docs WHERE rowid = ?", (rowid,))
+        self._db.execute("INSERT INTO docs (rowid, title, content, slides) VALUES (?, ?, ?, ?)", (rowid, title, content, slide_text(slide_json)))
+        self._fingerprints[doc_id] = fingerprint
+        return True
+
+    def upsert_row(self, row: dict) -> bool:
+        """Indexes one saved brainstorm. Fields missing from a partial row keep their indexed values."""
+        doc_id = row.get("id")
+        if doc_id is None:
+            return False
+        with self._lock:
+            if not {"title", "content"} <= row.keys() and doc_id in self._fingerprints:
+                stored = self._db.execute(
+                    "SELECT title, content FROM docs WHERE rowid = ?", (self._rowid(doc_id),)
+                ).fetchone() or ("", "")
+                row = {"title": stored[0], "content": stored[1], **row}
+            changed = self._upsert(doc_id, row.get("title") or "", row.get("content") or "", row.get("slide_json"))
+            self._db.commit()
+            return changed
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+            self._db.commit()
+
+    def _remove(self, doc_id):
+        rowid = self._rowid(doc_id)
+        if rowid is not None:
+            self._db.execute("DELETE FROM docs WHERE rowid = ?", (rowid,))
+            self._db.execute("DELETE FROM doc_meta WHERE rowid = ?", (rowid,))
+        self._fingerprints.pop(doc_id, None)
+
+    def sync(self, rows: list[dict]) -> int:
+        """Brings the index in line with ``rows``; returns how many documents changed."""
+        with self._lock:
+            changed = 0
+            live = set()
+            for row in rows:
+                live.add(row.get("id"))
+                changed += self._upsert(row.get("id"), row.get("title") or "", row.get("content") or "", row.get("slide_json"))
+            for doc_id in [d for d in self._fingerprints if d not in live]:
+                self._remove(doc_id)
+                changed += 1
+            self._db.commit()
+            return changed
+
+    def search(self, text: str, limit: int = 20) -> list[SearchHit]:
+        query = to_fts_query(text)
+        if not query:
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                f"""
+                SELECT doc_meta.doc_id, docs.title, snippet(docs, -1, '**', '**', ' … ', 16), bm25(docs, {', '.join(map(str, COLUMN_WEIGHTS))}) AS rank
+                FROM docs JOIN doc_meta ON doc_meta.rowid = docs.rowid
+                WHERE docs MATCH ?
+                ORDER BY rank
+                LIMIT ?
+                """,
+                (query, limit),
+            ).fetchall()
+        # bm25() is lower-is-better; flip the sign so higher scores rank first.
+        return [SearchHit(doc_id, title, " ".join(snippet.split()), -rank) for doc_id, title, snippet, rank in rows]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index(path: str = DEFAULT_SEARCH_INDEX_PATH) -> SearchIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SearchIndex(path)
+        return _index
+
+
+def index_saved_brainstorm(row: dict):
+    """Write hook: keeps search current after a save without failing the save itself."""
+    try:
+        get_search_index().upsert_row(row)
+    except Exception as e:
+        print(f"SEARCH-INDEX: could not index brainstorm {row.get('id')}: {e}")
@@ -0,0 +1,211 @@
+"""Local near-duplicate search over saved brainstorms.
+
+Each brainstorm is indexed as three TF-IDF vectors: its title, the text of its slides
+(slide titles, bullets and other blocks), and title, content and slides together. A
+small normalizing tokenizer drops stop words, ordinal suffixes and plural "s", so
+"Intro to Python loops for grade 7" and "Python loops, 7th grade intro" get the same
+terms. Nothing leaves the process. The index is kept in memory and persisted as JSON.
+``sync`` re-tokenizes only rows whose title, content or slides changed. Normalized
+vectors are built when documents are added and re-weighted after each sync that
+changed the corpus, so a search only scores.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+from utils.search_index import slide_text
+
+DEFAULT_INDEX_PATH = os.path.join("data", "similarity_index.json")
+# Scores are cosine similarities in [0, 1].
+DEFAULT_OFFER_THRESHOLD = 0.5
+DEFAULT_REUSE_THRESHOLD = 0.85
+# Only the start of long brainstorms is indexed; it carries the topic.
+MAX_CONTENT_CHARS = 4000
+
+_WORD = re.compile(r"[a-z0-9]+")
+_ORDINAL = re.compile(r"^(\d+)(st|nd|rd|th)$")
+_STOP_WORDS = frozenset(
+    "a an and are as at be by for from how in into is it of on or the this to with about "
+    "what who why your you we our intro introduction lesson deck slides slide presentation create make".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    terms = []
+    for word in _WORD.findall(text.lower()):
+        if match := _ORDINAL.match(word):
+            word = match.group(1)
+        if word in _STOP_WORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+@dataclass
+class Match:
+    doc_id: object
+    title: str
+    score: float
+    has_slides: bool
+
+
+def _fingerprint(title: str, content: str, slide_json) -> str:
+    return hashlib.sha1(f"{title}\0{content[:MAX_CONTENT_CHARS]}\0{slide_json or ''}".encode("utf-8", errors="replace")).hexdigest()
+
+
+def _has_slides(slide_json) -> bool:
+    return bool(slide_json) and slide_json not in ("{}", "null")
+
+
+class SimilarityIndex:
+    def __init__(self, path: str | None = DEFAULT_INDEX_PATH):
+        self.path = path
+        self._docs = {}
+        self._df = Counter()
+        # key -> normalized (title, slides, body) vectors; rebuilt from the term counts, never persisted.
+        self._vectors = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"SIMILARITY: ignoring unreadable index {self.path}: {e}")
+            return
+        for key, doc in data.get("docs", {}).items():
+            self._add(key, doc)
+        self._reweight()
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {"docs": dict(self._docs)}
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def _add(self, key: str, doc: dict):
+        self._docs[key] = doc
+        self._df.update(set(doc["body"]))
+        self._vectors[key] = self._doc_vectors(doc)
+
+    def _remove(self, key: str):
+        doc = self._docs.pop(key, None)
+        self._vectors.pop(key, None)
+        if doc:
+            self._df.subtract(set(doc["body"]))
+
+    def _doc_vectors(self, doc: dict) -> tuple[dict, dict, dict]:
+        return self._vector(doc["title_tf"]), self._vector(doc.get("slides_tf", {})), self._vector(doc["body"])
+
+    def _reweight(self):
+        """Recomputes every stored vector against the current document frequencies."""
+        with self._lock:
+            self._vectors = {key: self._doc_vectors(doc) for key, doc in self._docs.items()}
+
+    def upsert(self, doc_id, title: str, content: str, slide_json=None) -> bool:
+        """Indexes a brainstorm and its slides; returns False if it was already indexed unchanged.
+
+        Other documents keep their weights until the next ``sync`` re-weights the index.
+        """
+        key = str(doc_id)
+        fingerprint = _fingerprint(title or "", content or "", slide_json)
+        with self._lock:
+            if self._docs.get(key, {}).get("fingerprint") == fingerprint:
+                return False
+        # Decoding a deck can be slow; do it outside the lock.
+        title_terms = tokenize(title or "")
+        slide_terms = tokenize(slide_text(slide_json)[:MAX_CONTENT_CHARS])
+        doc = {
+            "id": doc_id,
+            "title": title or "",
+            "has_slides": _has_slides(slide_json),
+            "fingerprint": fingerprint,
+            "title_tf": dict(Counter(title_terms)),
+            "slides_tf": dict(Counter(slide_terms)),
+            "body": dict(Counter(title_terms + tokenize((content or "")[:MAX_CONTENT_CHARS]) + slide_terms)),
+        }
+        with self._lock:
+            self._remove(key)
+            self._add(key, doc)
+        return True
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(str(doc_id))
+
+    def sync(self, rows: list[dict]) -> int:
+        """Brings the index in line with brainstorm rows (id, title, content, slide_json); saves if changed."""
+        changed = 0
+        for row in rows:
+            changed += self.upsert(row.get("id"), row.get("title", ""), row.get("content", ""), row.get("slide_json"))
+        live = {str(row.get("id")) for row in rows}
+        with self._lock:
+            stale = [key for key in self._docs if key not in live]
+            for key in stale:
+                self._remove(key)
+        if changed or stale:
+            self._reweight()
+            self.save()
+        return changed + len(stale)
+
+    def _vector(self, tf: dict) -> dict:
+        if not tf:
+            return {}
+        n = len(self._docs) + 1
+        vector = {term: (1 + math.log(count)) * math.log((n + 1) / (self._df.get(term, 0) + 1) + 1) for term, count in tf.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        return {term: w / norm for term, w in vector.items()}
+
+    @staticmethod
+    def _cosine(a: dict, b: dict) -> float:
+        if len(a) > len(b):
+            a, b = b, a
+        return sum(w * b.get(term, 0.0) for term, w in a.items())
+
+    def search(self, text: str, k: int = 3, threshold: float = 0.0, require_slides: bool = False, exclude_id=None) -> list[Match]:
+        """Best matches for ``text`` scored against each title, slide text and whole document, best first."""
+        query_tf = Counter(tokenize(text[:MAX_CONTENT_CHARS]))
+        if not query_tf:
+            return []
+        with self._lock:
+            query = self._vector(query_tf)
+            matches = []
+            for key, doc in self._docs.items():
+                if (require_slides and not doc["has_slides"]) or (exclude_id is not None and key == str(exclude_id)):
+                    continue
+                score = max(self._cosine(query, vector) for vector in self._vectors[key])
+                if score > 0 and score >= threshold:
+                    matches.append(Match(doc["id"], doc["title"], round(score, 3), doc["has_slides"]))
+        matches.sort(key=lambda m: m.score, reverse=True)
+        return matches[:k]
+
+    def __len__(self):
+        return len(self._docs)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index(path: str | None = DEFAULT_INDEX_PATH) -> SimilarityIndex:
+    """Process-wide index, loaded from ``path`` on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SimilarityIndex(path)
+        return _index
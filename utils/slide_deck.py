@@ -0,0 +1,294 @@
+"""Canonical slide deck representation shared by the graph, the Supabase layer and the renderers.
+
+There are two layers:
+
+* The pydantic models (``SlideDeck`` and friends) are the schema given to the LLM for
+  structured output.
+* The ``Deck`` / ``DeckSlide`` / ``DeckBlock`` records are what the rest of the code
+  works with. They are plain ``__slots__`` objects, cheap to build and to walk.
+
+Stored ``slide_json`` is compact JSON with a ``schema_version`` field. Decks larger
+than ``COMPRESS_MIN_CHARS`` are stored zlib-compressed as ``z1:<base64>`` by
+``encode_deck_for_storage``. ``decode_deck`` reads both forms transparently and takes
+the fast path for current-version data. Anything else (older rows,
+pretty-printed JSON, camelCase keys, bare bullet strings, upper-case block types)
+goes through ``normalize_deck``. ``encode_deck_binary`` gives a smaller msgpack
+encoding when ``msgpack`` is installed.
+"""
+import base64
+import binascii
+import json
+import zlib
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional speedup; the stdlib json module is used otherwise
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional; binary encoding falls back to UTF-8 JSON
+    msgpack = None
+
+SCHEMA_VERSION = 1
+COMPRESSED_PREFIX = "z1:"
+# Below this size compression saves too little to be worth the opaque column value.
+COMPRESS_MIN_CHARS = 2048
+
+
+class SlideContentBlockText(BaseModel):
+    type: str = "text"
+    body: str
+
+class SlideContentBlockCode(BaseModel):
+    type: str = "code"
+    language: str = "python"
+    body: str
+
+class SlideContentBlockImage(BaseModel):
+    type: str = "image"
+    query: str
+    caption: str = ""
+
+class Slide(BaseModel):
+    id: str
+    title: str
+    content_blocks: list[SlideContentBlockText | SlideContentBlockCode | SlideContentBlockImage]
+
+class SlideDeck(BaseModel):
+    title: str
+    subtitle: str = ""
+    slides: list[Slide]
+    user_message: str = ""
+
+
+class DeckBlock:
+    __slots__ = ("type", "body", "language", "query", "caption", "url")
+
+    def __init__(self, type="text", body="", language="", query="", caption="", url=""):
+        self.type = type
+        self.body = body
+        self.language = language
+        self.query = query
+        self.caption = caption
+        self.url = url
+
+    def to_dict(self) -> dict:
+        if self.type == "code":
+            return {"type": "code", "language": self.language or "python", "body": self.body}
+        if self.type == "image":
+            block = {"type": "image", "query": self.query, "caption": self.caption}
+            if self.url:
+                block["url"] = self.url
+            return block
+        return {"type": self.type, "body": self.body}
+
+    def __repr__(self):
+        return f"DeckBlock({self.to_dict()!r})"
+
+
+class DeckSlide:
+    __slots__ = ("id", "title", "content_blocks")
+
+    def __init__(self, id, title, content_blocks=None):
+        self.id = id
+        self.title = title
+        self.content_blocks = content_blocks if content_blocks is not None else []
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "title": self.title, "content_blocks": [b.to_dict() for b in self.content_blocks]}
+
+    def __repr__(self):
+        return f"DeckSlide(id={self.id!r}, title={self.title!r}, blocks={len(self.content_blocks)})"
+
+
+class Deck:
+    __slots__ = ("title", "subtitle", "slides", "user_message")
+
+    def __init__(self, title="", subtitle="", slides=None, user_message=""):
+        self.title = title
+        self.subtitle = subtitle
+        self.slides = slides if slides is not None else []
+        self.user_message = user_message
+
+    def to_dict(self) -> dict:
+        return {
+            "schema_version": SCHEMA_VERSION,
+            "title": self.title,
+            "subtitle": self.subtitle,
+            "slides": [s.to_dict() for s in self.slides],
+            "user_message": self.user_message,
+        }
+
+    def __bool__(self):
+        return bool(self.title or self.slides)
+
+    def __repr__(self):
+        return f"Deck(title={self.title!r}, slides={len(self.slides)})"
+
+
+def _get(d: dict, *keys, default=""):
+    for key in keys:
+        value = d.get(key)
+        if value is not None:
+            return value
+    return default
+
+
+def _normalize_block(raw) -> DeckBlock | None:
+    if isinstance(raw, str):
+        return DeckBlock("text", raw) if raw.strip() else None
+    if not isinstance(raw, dict):
+        return None
+    btype = str(_get(raw, "type", "kind", default="")).strip().lower()
+    if not btype:
+        btype = "code" if "code" in raw or "language" in raw else "image" if ("query" in raw or "url" in raw) else "text"
+    if btype in ("bullet", "bullets", "paragraph", "markdown"):
+        btype = "text"
+    if btype == "code":
+        return DeckBlock("code", str(_get(raw, "body", "code", "text", "content")), language=str(_get(raw, "language", "lang", default="python")).lower())
+    if btype == "image":
+        return DeckBlock("image", query=str(_get(raw, "query", "prompt", "alt")), caption=str(_get(raw, "caption")), url=str(_get(raw, "url", "src")))
+    return DeckBlock(btype, str(_get(raw, "body", "text", "content")))
+
+
+def _normalize_slide(raw, index: int) -> DeckSlide:
+    if isinstance(raw, str):
+        return DeckSlide(f"slide{index}", raw)
+    title = str(_get(raw, "title", "Title", "heading"))
+    blocks_raw = _get(raw, "content_blocks", "contentBlocks", "blocks", default=None)
+    if blocks_raw is None and str(raw.get("type", "")).lower() in ("text", "code", "image"):
+        # Some early decks stored each slide as a single block.
+        blocks_raw = [raw]
+        body = str(raw.get("body", ""))
+        if not title and str(raw.get("type", "")).lower() == "text" and "\n" in body:
+            title, rest = body.split("\n", 1)
+            blocks_raw = [{"type": "text", "body": rest}]
+    elif blocks_raw is None:
+        # Older decks kept a list of bullets (or a single content string) on the slide.
+        bullets = _get(raw, "bullets", "points", "content", "body", default=[])
+        blocks_raw = [bullets] if isinstance(bullets, str) else bullets
+    blocks = [b for b in (_normalize_block(r) for r in blocks_raw) if b is not None]
+    return DeckSlide(str(_get(raw, "id", "slide_id", "slideId", default="") or f"slide{index}"), title.strip(), blocks)
+
+
+def normalize_deck(raw) -> Deck:
+    """Builds a Deck from any deck shape this app has produced (dict, JSON text, model, Deck)."""
+    if isinstance(raw, Deck):
+        return raw
+    if raw is None:
+        return Deck()
+    if isinstance(raw, BaseModel):
+        raw = raw.model_dump()
+    elif isinstance(raw, (str, bytes, bytearray)):
+        raw = _loads_stored(raw) if raw else {}
+    if isinstance(raw, list):
+        raw = {"slides": raw}
+    if not isinstance(raw, dict):
+        raise ValueError(f"Unrecognized slide deck of type {type(raw).__name__}")
+    if "deck" in raw and isinstance(raw["deck"], dict):
+        raw = raw["deck"]
+    slides = [_normalize_slide(s, i) for i, s in enumerate(_get(raw, "slides", "Slides", default=[]) or [], 1)]
+    # Ids must be unique for slide patches to address slides.
+    seen = set()
+    for i, slide in enumerate(slides, 1):
+        if slide.id in seen:
+            slide.id = f"slide{i}"
+            while slide.id in seen:
+                slide.id += "_"
+        seen.add(slide.id)
+    return Deck(
+        str(_get(raw, "title", "Title")),
+        str(_get(raw, "subtitle", "subTitle", "Subtitle")),
+        slides,
+        str(_get(raw, "user_message", "userMessage")),
+    )
+
+
+def _from_current(raw: dict) -> Deck:
+    """Fast path for data written by ``encode_deck`` at the current schema version."""
+    slides = []
+    for s in raw["slides"]:
+        blocks = []
+        for b in s["content_blocks"]:
+            btype = b["type"]
+            if btype == "code":
+                blocks.append(DeckBlock("code", b["body"], language=b.get("language", "python")))
+            elif btype == "image":
+                blocks.append(DeckBlock("image", query=b.get("query", ""), caption=b.get("caption", ""), url=b.get("url", "")))
+            else:
+                blocks.append(DeckBlock(btype, b["body"]))
+        slides.append(DeckSlide(s["id"], s["title"], blocks))
+    return Deck(raw["title"], raw.get("subtitle", ""), slides, raw.get("user_message", ""))
+
+
+def _loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _loads_stored(data):
+    """``_loads`` that also accepts the compressed storage form."""
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode("utf-8")
+    if data.startswith(COMPRESSED_PREFIX):
+        try:
+            data = zlib.decompress(base64.b64decode(data[len(COMPRESSED_PREFIX):], validate=True))
+        except (binascii.Error, zlib.error) as e:
+            raise ValueError(f"Corrupt compressed slide deck: {e}") from e
+    return _loads(data)
+
+
+def _dumps(data: dict) -> str:
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def encode_deck(deck) -> str:
+    """Compact JSON text for storage (e.g. the ``slide_json`` column)."""
+    return _dumps(normalize_deck(deck).to_dict())
+
+
+def encode_deck_for_storage(deck, compress_min_chars: int = COMPRESS_MIN_CHARS) -> str:
+    """``encode_deck``, compressed when that makes the stored value smaller."""
+    text = encode_deck(deck)
+    if len(text) < compress_min_chars:
+        return text
+    packed = COMPRESSED_PREFIX + base64.b64encode(zlib.compress(text.encode("utf-8"), 9)).decode("ascii")
+    return packed if len(packed) < len(text) else text
+
+
+def decode_deck(data) -> Deck:
+    """Parses stored deck data of any version, compressed or not; an empty value gives an empty Deck."""
+    if isinstance(data, Deck):
+        return data
+    raw = _loads_stored(data) if isinstance(data, (str, bytes, bytearray)) and data else data
+    if isinstance(raw, dict) and raw.get("schema_version") == SCHEMA_VERSION:
+        try:
+            return _from_current(raw)
+        except (KeyError, TypeError):
+            pass
+    return normalize_deck(raw)
+
+
+def encode_deck_binary(deck) -> bytes:
+    """msgpack encoding (prefixed ``M``) when available, else UTF-8 JSON (prefixed ``J``)."""
+    data = normalize_deck(deck).to_dict()
+    if msgpack is not None:
+        return b"M" + msgpack.packb(data, use_bin_type=True)
+    return b"J" + _dumps(data).encode("utf-8")
+
+
+def decode_deck_binary(data: bytes) -> Deck:
+    tag, payload = data[:1], data[1:]
+    if tag == b"M":
+        if msgpack is None:
+            raise ValueError("msgpack is required to decode this slide deck")
+        return decode_deck(msgpack.unpackb(payload, raw=False))
+    if tag == b"J":
+        return decode_deck(payload)
+    raise ValueError("Unrecognized binary slide deck encoding")
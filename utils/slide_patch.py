@@ -0,0 +1,123 @@
+"""Apply structured edit operations to slide content without regenerating the deck.
+
+A patch is a list of operations applied in order to a deck dict
+(``{"title", "subtitle", "slides": [{"id", "title", "content_blocks"}]}``):
+
+* ``add``     with ``block_index`` -> insert ``block`` at that index of slide ``slide_id``
+* ``add``     without it           -> insert ``slide`` after slide ``slide_id`` (at the end if empty)
+* ``replace`` with ``block_index`` -> replace that block of slide ``slide_id`` with ``block``
+* ``replace`` without it           -> replace slide ``slide_id`` with ``slide``
+* ``delete``  with ``block_index`` -> remove that block of slide ``slide_id``
+* ``delete``  without it           -> remove slide ``slide_id``
+
+Block indexes refer to the deck as it is after the previous operations.
+"""
+import copy
+
+VALID_OPS = ("add", "replace", "delete")
+
+
+class SlidePatchError(ValueError):
+    """Raised when a patch operation cannot be applied to the current deck."""
+    pass
+
+
+def _as_dict(value):
+    if value is None:
+        return None
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return dict(value)
+
+
+def _find_slide(slides: list[dict], slide_id: str) -> int:
+    for i, slide in enumerate(slides):
+        if str(slide.get("id")) == str(slide_id):
+            return i
+    raise SlidePatchError(f"Unknown slide id: {slide_id!r}")
+
+
+def _unique_slide_id(slides: list[dict], wanted: str | None) -> str:
+    taken = {str(s.get("id")) for s in slides}
+    if wanted and wanted not in taken:
+        return wanted
+    n = len(slides) + 1
+    while f"slide{n}" in taken:
+        n += 1
+    return f"slide{n}"
+
+
+def _apply_block_op(slide: dict, op: str, index: int, block):
+    blocks = slide.setdefault("content_blocks", [])
+    if op == "add":
+        if block is None:
+            raise SlidePatchError(f"'add' on slide {slide.get('id')!r} needs a block")
+        blocks.insert(max(0, min(index, len(blocks))), block)
+        return
+    if not 0 <= index < len(blocks):
+        raise SlidePatchError(f"Block index {index} out of range for slide {slide.get('id')!r} ({len(blocks)} blocks)")
+    if op == "replace":
+        if block is None:
+            raise SlidePatchError(f"'replace' on slide {slide.get('id')!r} needs a block")
+        blocks[index] = block
+    else:
+        del blocks[index]
+
+
+def _apply_slide_op(slides: list[dict], op: str, slide_id: str, slide):
+    if op == "add":
+        if slide is None:
+            raise SlidePatchError("'add' without a block index needs a slide")
+        position = _find_slide(slides, slide_id) + 1 if slide_id else len(slides)
+        slide["id"] = _unique_slide_id(slides, slide.get("id"))
+        slides.insert(position, slide)
+        return
+    index = _find_slide(slides, slide_id)
+    if op == "replace":
+        if slide is None:
+            raise SlidePatchError(f"'replace' on slide {slide_id!r} needs a slide")
+        slide["id"] = slides[index].get("id")
+        slides[index] = slide
+    else:
+        del slides[index]
+
+
+def apply_slide_patch(slide_content: dict, patch) -> dict:
+    """Returns a new deck dict with ``patch`` applied; ``slide_content`` is not modified.
+
+    ``patch`` may be a ``SlidePatch`` model or an equivalent dict.
+    """
+    patch = _as_dict(patch)
+    deck = copy.deepcopy(slide_content)
+    slides = deck.setdefault("slides", [])
+    if patch.get("title"):
+        deck["title"] = patch["title"]
+    if patch.get("subtitle"):
+        deck["subtitle"] = patch["subtitle"]
+
+    for n, raw in enumerate(patch.get("operations", []), 1):
+        operation = _as_dict(raw)
+        op = str(operation.get("op", "")).lower()
+        if op not in VALID_OPS:
+            raise SlidePatchError(f"Operation {n}: unknown op {operation.get('op')!r}")
+        slide_id = operation.get("slide_id") or ""
+        block_index = operation.get("block_index")
+        if block_index is None:
+            _apply_slide_op(slides, op, slide_id, _as_dict(operation.get("slide")))
+        else:
+            slide = slides[_find_slide(slides, slide_id)]
+            _apply_block_op(slide, op, int(block_index), _as_dict(operation.get("block")))
+    return deck
+
+
+def describe_slide_patch(patch) -> str:
+    """One line per operation, for showing the user what changed."""
+    patch = _as_dict(patch)
+    lines = []
+    for raw in patch.get("operations", []):
+        operation = _as_dict(raw)
+        target = f"slide {operation.get('slide_id') or '(end)'}"
+        if operation.get("block_index") is not None:
+            target += f", block {operation['block_index']}"
+        lines.append(f"- {operation.get('op')} {target}")
+    return "\n".join(lines)
@@ -0,0 +1,266 @@
+"""Latency, token and cost telemetry for graph nodes, model calls, Supabase and rendering.
+
+Every unit of work is recorded as a span::
+
+    with record_span("supabase.get_all_brainstorms", kind="db"):
+        ...
+
+Spans nest through a context variable. Token usage reported by the model callback is
+added to the innermost open span and all of its parents, so a node span carries the
+tokens of the model calls it made. Finished spans are kept in a rolling window per name
+(for p50/p95 on the admin page) and appended to a local JSONL file by a background
+exporter, so recording a span never waits on disk.
+"""
+import contextvars
+import functools
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import asdict, dataclass, field
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from utils.tracing import BatchExporter, FileSink
+
+DEFAULT_SINK_PATH = os.path.join("logs", "telemetry.jsonl")
+ROLLING_WINDOW = 500
+
+# USD per million (prompt, completion) tokens; matched by longest model-name prefix.
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-5-nano": (0.05, 0.40),
+    "gpt-5-mini": (0.25, 2.00),
+    "gpt-5": (1.25, 10.00),
+    "o4-mini": (1.10, 4.40),
+    "o3": (2.00, 8.00),
+}
+
+
+def estimate_cost(model: str | None, prompt_tokens: int, completion_tokens: int) -> float:
+    if not model:
+        return 0.0
+    matches = [name for name in MODEL_PRICES if model.startswith(name)]
+    if not matches:
+        return 0.0
+    prompt_price, completion_price = MODEL_PRICES[max(matches, key=len)]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+@dataclass
+class Span:
+    name: str
+    kind: str = "internal"
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    parent_id: str | None = None
+    trace_id: str | None = None
+    start_time: float = field(default_factory=time.time)
+    wall_ms: float = 0.0
+    queue_ms: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    model: str | None = None
+    error: str | None = None
+    attributes: dict = field(default_factory=dict)
+
+    def add_usage(self, model, prompt_tokens, completion_tokens):
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cost_usd += estimate_cost(model, prompt_tokens, completion_tokens)
+        self.model = self.model or model
+
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class Telemetry:
+    def __init__(self, sink_path: str | None = DEFAULT_SINK_PATH, window: int = ROLLING_WINDOW):
+        self.sink_path = sink_path
+        self.window = window
+        self._spans = {}
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._exporter = None
+
+    def record(self, span: Span):
+        with self._lock:
+            self._spans.setdefault(span.name, deque(maxlen=self.window)).append(span)
+            self._recent.append(span)
+        self._write(span)
+
+    def _write(self, span: Span):
+        if not self.sink_path:
+            return
+        if self._exporter is None:
+            with self._lock:
+                if self._exporter is None:
+                    self._exporter = BatchExporter(FileSink(self.sink_path))
+        self._exporter.export(asdict(span))
+
+    def summary(self) -> list[dict]:
+        """Rolling per-name statistics over the last ``window`` spans."""
+        with self._lock:
+            groups = {name: list(spans) for name, spans in self._spans.items()}
+        rows = []
+        for name, spans in sorted(groups.items()):
+            wall = sorted(s.wall_ms for s in spans)
+            queue = sorted(s.queue_ms for s in spans)
+            rows.append({
+                "name": name,
+                "kind": spans[-1].kind,
+                "count": len(spans),
+                "errors": sum(1 for s in spans if s.error),
+                "p50_ms": round(_percentile(wall, 0.50), 1),
+                "p95_ms": round(_percentile(wall, 0.95), 1),
+                "queue_p95_ms": round(_percentile(queue, 0.95), 1),
+                "avg_prompt_tokens": round(sum(s.prompt_tokens for s in spans) / len(spans), 1),
+                "avg_completion_tokens": round(sum(s.completion_tokens for s in spans) / len(spans), 1),
+                "cost_usd": round(sum(s.cost_usd for s in spans), 4),
+            })
+        return rows
+
+    def recent(self, limit: int = 100) -> list[dict]:
+        with self._lock:
+            spans = list(self._recent)[-limit:]
+        return [asdict(s) for s in reversed(spans)]
+
+
+_telemetry = Telemetry()
+
+
+def get_telemetry() -> Telemetry:
+    return _telemetry
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+class record_span:
+    """Context manager that times a block and records it as a span.
+
+    ``enqueued_at`` (a ``time.monotonic()`` value) sets the span's queue time, e.g. the
+    time a request spent waiting for a rate-limit slot before the block started.
+    """
+
+    def __init__(self, name: str, kind: str = "internal", enqueued_at: float | None = None, **attributes):
+        parent = _current_span.get()
+        self.span = Span(
+            name=name,
+            kind=kind,
+            parent_id=parent.span_id if parent else None,
+            attributes=attributes,
+        )
+        self.span.trace_id = parent.trace_id if parent else self.span.span_id
+        self.enqueued_at = enqueued_at
+
+    def __enter__(self) -> Span:
+        self._started = time.monotonic()
+        if self.enqueued_at is not None:
+            self.span.queue_ms = (self._started - self.enqueued_at) * 1000
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.wall_ms = (time.monotonic() - self._started) * 1000
+        if exc is not None:
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        parent = _current_span.get()
+        if parent is not None:
+            parent.prompt_tokens += self.span.prompt_tokens
+            parent.completion_tokens += self.span.completion_tokens
+            parent.cost_usd += self.span.cost_usd
+        _telemetry.record(self.span)
+        return False
+
+
+def traced(name: str, kind: str = "internal"):
+    """Decorator form of ``record_span``."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with record_span(name, kind=kind):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _usage_from_result(response):
+    """(model, prompt_tokens, completion_tokens) from an LLMResult."""
+    llm_output = response.llm_output or {}
+    model = llm_output.get("model_name")
+    usage = llm_output.get("token_usage") or {}
+    prompt_tokens = usage.get("prompt_tokens", 0) or 0
+    completion_tokens = usage.get("completion_tokens", 0) or 0
+    if not (prompt_tokens or completion_tokens):
+        for generations in response.generations:
+            for gen in generations:
+                message = getattr(gen, "message", None)
+                metadata = getattr(message, "usage_metadata", None) or {}
+                prompt_tokens += metadata.get("input_tokens", 0)
+                completion_tokens += metadata.get("output_tokens", 0)
+                model = model or (getattr(message, "response_metadata", {}) or {}).get("model_name")
+    return model, prompt_tokens, completion_tokens
+
+
+class TelemetryCallbackHandler(BaseCallbackHandler):
+    """Records one ``llm`` span per model call and rolls its tokens into the enclosing span."""
+
+    def __init__(self):
+        self._starts = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        model = (kwargs.get("invocation_params") or {}).get("model") or (kwargs.get("metadata") or {}).get("ls_model_name")
+        self._starts[run_id] = (time.monotonic(), model)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._starts[run_id] = (time.monotonic(), (kwargs.get("invocation_params") or {}).get("model"))
+
+    def _finish(self, run_id, model=None, prompt_tokens=0, completion_tokens=0, error=None):
+        started, start_model = self._starts.pop(run_id, (None, None))
+        if started is None:
+            return
+        model = model or start_model
+        parent = _current_span.get()
+        span = Span(
+            name="llm",
+            kind="llm",
+            parent_id=parent.span_id if parent else None,
+            trace_id=parent.trace_id if parent else None,
+            wall_ms=(time.monotonic() - started) * 1000,
+            error=error,
+        )
+        span.add_usage(model, prompt_tokens, completion_tokens)
+        # Streamed calls finish after the enclosing span may have closed; only live spans get the usage.
+        if parent is not None:
+            parent.add_usage(model, prompt_tokens, completion_tokens)
+        _telemetry.record(span)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        model, prompt_tokens, completion_tokens = _usage_from_result(response)
+        self._finish(run_id, model, prompt_tokens, completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=f"{type(error).__name__}: {error}")
+
+
+_callback_handler = TelemetryCallbackHandler()
+
+
+def get_telemetry_callback() -> TelemetryCallbackHandler:
+    return _callback_handler
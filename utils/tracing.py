@@ -0,0 +1,188 @@
+"""LangChain run tracing that never blocks the request path.
+
+``TRACING_MODE`` in the secrets selects one of:
+
+* ``off``       - no tracing at all,
+* ``local``     - runs are buffered in memory and written in batches by a background
+                  thread to a JSONL file or POSTed to a collector URL (``TRACE_SINK``),
+* ``langsmith`` - the previous behaviour, remote LangSmith tracing.
+
+``TRACE_SAMPLE_RATE`` (0..1) is a head-sampling rate: each browser session is either
+traced completely or not at all, decided when the session starts.
+"""
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+
+from langchain_core.tracers.base import BaseTracer
+from langchain_core.tracers.context import register_configure_hook
+
+DEFAULT_TRACE_SINK = os.path.join("logs", "traces.jsonl")
+MAX_FIELD_CHARS = 4000
+
+
+class FileSink:
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, records: list[dict]):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + "\n")
+
+
+class HttpSink:
+    """POSTs each batch as a JSON array to a local collector."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def write(self, records: list[dict]):
+        body = json.dumps(records, default=str).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+def make_sink(target: str):
+    if target.startswith("http://") or target.startswith("https://"):
+        return HttpSink(target)
+    return FileSink(target)
+
+
+class BatchExporter:
+    """Bounded in-memory buffer drained by a daemon thread.
+
+    ``export`` never blocks: when the buffer is full (the sink is slow or down) the
+    record is dropped and counted instead.
+    """
+
+    def __init__(self, sink, max_queue: int = 10000, batch_size: int = 200, flush_interval: float = 2.0):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.exported = 0
+        self.dropped = 0
+        self.failed_batches = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, record: dict):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self.sink.write(batch)
+                self.exported += len(batch)
+            except Exception as e:
+                self.failed_batches += 1
+                self.dropped += len(batch)
+                print(f"TRACING: dropping {len(batch)} records, sink failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failed_batches": self.failed_batches,
+        }
+
+
+def _clip(value):
+    text = json.dumps(value, default=str)
+    if len(text) <= MAX_FIELD_CHARS:
+        return value
+    return text[:MAX_FIELD_CHARS] + "...[clipped]"
+
+
+class LocalTracer(BaseTracer):
+    """Hands every finished run tree to a BatchExporter as flat records."""
+
+    name = "local_tracer"
+
+    def __init__(self, exporter: BatchExporter, **kwargs):
+        super().__init__(**kwargs)
+        self.exporter = exporter
+
+    def _persist_run(self, run):
+        stack = [run]
+        while stack:
+            r = stack.pop()
+            stack.extend(r.child_runs)
+            self.exporter.export({
+                "id": str(r.id),
+                "trace_id": str(getattr(r, "trace_id", "") or run.id),
+                "parent_run_id": str(r.parent_run_id) if r.parent_run_id else None,
+                "name": r.name,
+                "run_type": r.run_type,
+                "start_time": r.start_time.isoformat() if r.start_time else None,
+                "end_time": r.end_time.isoformat() if r.end_time else None,
+                "error": r.error,
+                "tags": r.tags,
+                "inputs": _clip(r.inputs),
+                "outputs": _clip(r.outputs),
+            })
+
+
+_session_tracer = contextvars.ContextVar("local_session_tracer", default=None)
+register_configure_hook(_session_tracer, inheritable=True)
+
+_config = {"mode": "off", "sample_rate": 1.0, "exporter": None}
+_config_lock = threading.Lock()
+
+
+def configure_tracing(mode: str = "off", sample_rate: float = 1.0, sink: str = DEFAULT_TRACE_SINK, langsmith_api_key=None, langsmith_project=None):
+    """Applies the process-wide tracing mode. Safe to call on every rerun."""
+    mode = (mode or "off").lower()
+    with _config_lock:
+        _config["mode"] = mode
+        _config["sample_rate"] = max(0.0, min(1.0, float(sample_rate)))
+        if mode == "langsmith":
+            os.environ["LANGCHAIN_TRACING_V2"] = "true"
+            os.environ["LANGCHAIN_API_KEY"] = langsmith_api_key or ""
+            os.environ["LANGCHAIN_PROJECT"] = langsmith_project or "Curiculum_GeneratorV2"
+            os.environ["LANGCHAIN_ENDPOINT"] = "https://api.smith.langchain.com"
+            os.environ["LANGSMITH_TRACING_SAMPLING_RATE"] = str(_config["sample_rate"])
+            return
+        os.environ["LANGCHAIN_TRACING_V2"] = "false"
+        if mode == "local" and _config["exporter"] is None:
+            _config["exporter"] = BatchExporter(make_sink(sink))
+
+
+def start_session_tracing(session_state):
+    """Head sampling: decides once per session whether it is traced, then enables it for this run."""
+    if "trace_sampled" not in session_state:
+        session_state["trace_sampled"] = random.random() < _config["sample_rate"]
+    exporter = _config["exporter"]
+    if _config["mode"] == "local" and exporter is not None and session_state["trace_sampled"]:
+        _session_tracer.set(LocalTracer(exporter))
+    else:
+        _session_tracer.set(None)
+
+
+def get_exporter_stats() -> dict | None:
+    exporter = _config["exporter"]
+    return exporter.stats() if exporter else None